@@ -0,0 +1,17 @@
+// Fetch the pre-encoded prediction: abi.encode(uint256 volatility * 1e6, uint256 candle time)
+const volatilityResponse = await Functions.makeHttpRequest({
+    url: "http://13.51.85.232:8000/predict/abi",
+    method: "GET",
+    params: {
+        days: args[0] || "30",
+        format: "raw"
+    },
+    responseType: "arraybuffer"
+});
+
+if (volatilityResponse.error) {
+    throw Error("Volatility request failed");
+}
+
+// Already ABI encoded, hand the bytes straight to fulfillRequest()
+return new Uint8Array(volatilityResponse.data);
@@ -0,0 +1,204 @@
+import os
+import threading
+from collections import deque
+from typing import Dict, Optional
+
+import numpy as np
+
+from model_outputs import VOLATILITY_LEVELS
+
+# Forecast horizon in candles, and candle length, of the served model
+FORECAST_HORIZON = 5
+CANDLE_SECONDS = 24 * 60 * 60
+
+# Matured forecasts in the rolling window
+ACCURACY_WINDOW = int(os.environ.get('ACCURACY_WINDOW', 60))
+
+# Alarm when rolling MAE exceeds this multiple of the reference MAE
+DRIFT_RATIO = float(os.environ.get('ACCURACY_DRIFT_RATIO', 1.5))
+
+# Reference MAE (e.g. from walk-forward validation); the all-time MAE when unset
+BASELINE_MAE = os.environ.get('ACCURACY_BASELINE_MAE')
+
+# Alarm when the rolling mean error is this many standard errors from zero
+BIAS_T_STAT = 3.0
+
+# Matured forecasts needed before any alarm
+MIN_SAMPLES = 20
+
+class RollingErrorStats:
+    """
+    Error statistics over the last `window` matured forecasts in O(1) per update
+
+    Running sums are adjusted by the value entering and the value leaving
+    the window, so no update rescans earlier forecasts. All-time sums are
+    kept alongside as the long-run reference.
+    """
+
+    def __init__(self, window: int = ACCURACY_WINDOW):
+        self.window = window
+        self._errors = deque()
+        self._sums = np.zeros(4)      # error, error^2, |error|, level hit
+        self.count = 0
+        self.total_abs_error = 0.0
+        self.last_candle_timestamp = None
+
+    def add(self, predicted: float, realized: float, candle_timestamp: int):
+        error = predicted - realized
+        hit = float(np.digitize(predicted, VOLATILITY_LEVELS) == np.digitize(realized, VOLATILITY_LEVELS))
+        values = np.array([error, error ** 2, abs(error), hit])
+
+        self._errors.append(values)
+        self._sums += values
+        if len(self._errors) > self.window:
+            self._sums -= self._errors.popleft()
+
+        self.count += 1
+        self.total_abs_error += abs(error)
+        self.last_candle_timestamp = candle_timestamp
+
+    def snapshot(self, baseline_mae: Optional[float] = None,
+                 drift_ratio: float = DRIFT_RATIO) -> Dict:
+        """Rolling metrics and drift flags"""
+        n = len(self._errors)
+        if n == 0:
+            return {'samples': 0, 'matured_total': self.count, 'drift': False}
+
+        mean_error, mean_sq, mae, hit_rate = self._sums / n
+        std = np.sqrt(max(mean_sq - mean_error ** 2, 0.0) * n / max(n - 1, 1))
+        reference = baseline_mae if baseline_mae is not None else self.total_abs_error / self.count
+
+        mae_drift = n >= MIN_SAMPLES and mae > drift_ratio * reference
+        bias_drift = (n >= MIN_SAMPLES and std > 0
+                      and abs(mean_error) / (std / np.sqrt(n)) > BIAS_T_STAT)
+        return {
+            'samples': n,
+            'matured_total': self.count,
+            'mae': float(mae),
+            'rmse': float(np.sqrt(mean_sq)),
+            'bias': float(mean_error),
+            'level_hit_rate': float(hit_rate),
+            'reference_mae': float(reference),
+            'mae_drift': bool(mae_drift),
+            'bias_drift': bool(bias_drift),
+            'drift': bool(mae_drift or bias_drift),
+            'last_matured_candle': self.last_candle_timestamp,
+        }
+
+class AccuracyMonitor:
+    """
+    Joins forecasts with the realized volatility they predicted, as it arrives
+
+    record_prediction() keeps the latest forecast per (pair, candle). The
+    realized_vol of candle t is the target of the forecast made on candle
+    t - horizon, which is then scored and dropped. observe_realized() scores
+    from one new candle; mature() looks every pending target up in a stored
+    feature table, so candles written by another process (a trainer, another
+    worker) are scored as well.
+    """
+
+    def __init__(self, horizon: int = FORECAST_HORIZON,
+                 candle_seconds: int = CANDLE_SECONDS,
+                 window: int = ACCURACY_WINDOW,
+                 drift_ratio: float = DRIFT_RATIO,
+                 baseline_mae: Optional[float] = None):
+        """
+        Args:
+            horizon: Candles between a forecast and its realized value
+            candle_seconds: Candle length
+            window: Matured forecasts in the rolling statistics
+            drift_ratio: Rolling MAE / reference MAE that raises the alarm
+            baseline_mae: Reference MAE (default ACCURACY_BASELINE_MAE, else all-time MAE)
+        """
+        self.horizon = horizon
+        self.candle_seconds = candle_seconds
+        self.window = window
+        self.drift_ratio = drift_ratio
+        if baseline_mae is None and BASELINE_MAE:
+            baseline_mae = float(BASELINE_MAE)
+        self.baseline_mae = baseline_mae
+        self._pending: Dict[str, Dict[int, float]] = {}
+        self._stats: Dict[str, RollingErrorStats] = {}
+        self._lock = threading.Lock()
+
+    def record_prediction(self, pair: str, candle_timestamp: int, predicted_vol: float):
+        """Remember the forecast made from a candle's features"""
+        with self._lock:
+            self._pending.setdefault(pair, {})[int(candle_timestamp)] = float(predicted_vol)
+
+    def observe_realized(self, pair: str, candle_timestamp: int, realized_vol: float) -> bool:
+        """
+        Score the forecast whose target is this candle's realized volatility
+
+        Returns:
+            True if a pending forecast matured
+        """
+        if not np.isfinite(realized_vol):
+            return False
+        target_of = int(candle_timestamp) - self.horizon * self.candle_seconds
+        with self._lock:
+            pending = self._pending.get(pair, {})
+            predicted = pending.pop(target_of, None)
+
+            # Forecasts for candles that can no longer mature are dropped
+            for stale in [t for t in pending if t < target_of]:
+                del pending[stale]
+
+            if predicted is None:
+                return False
+            stats = self._stats.setdefault(pair, RollingErrorStats(self.window))
+            stats.add(predicted, float(realized_vol), int(candle_timestamp))
+            return True
+
+    def mature(self, pair: str, timestamps: np.ndarray, realized_vol: np.ndarray) -> int:
+        """
+        Score every pending forecast whose target candle is in a feature table
+
+        Forecasts whose target falls inside the table but has no finite
+        realized_vol there (a gap, warm-up rows) can never mature and are
+        dropped; targets after the table's last candle stay pending.
+
+        Args:
+            pair: Trading pair
+            timestamps: Candle open times of the table (unix seconds, ascending)
+            realized_vol: realized_vol of each candle
+
+        Returns:
+            Number of forecasts scored
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        realized_vol = np.asarray(realized_vol, dtype=np.float64)
+        if not len(timestamps):
+            return 0
+
+        scored = 0
+        with self._lock:
+            pending = self._pending.get(pair, {})
+            for candle_timestamp in sorted(pending):
+                target = candle_timestamp + self.horizon * self.candle_seconds
+                if target > timestamps[-1]:
+                    break
+                predicted = pending.pop(candle_timestamp)
+                k = int(np.searchsorted(timestamps, target))
+                if k < len(timestamps) and timestamps[k] == target and np.isfinite(realized_vol[k]):
+                    stats = self._stats.setdefault(pair, RollingErrorStats(self.window))
+                    stats.add(predicted, float(realized_vol[k]), target)
+                    scored += 1
+        return scored
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Rolling metrics per pair"""
+        with self._lock:
+            out = {}
+            for pair, stats in self._stats.items():
+                out[pair] = stats.snapshot(self.baseline_mae, self.drift_ratio)
+                out[pair]['pending'] = len(self._pending.get(pair, {}))
+            for pair, pending in self._pending.items():
+                if pair not in out:
+                    out[pair] = {'samples': 0, 'matured_total': 0, 'drift': False,
+                                 'pending': len(pending)}
+            return out
+
+    def drifting(self) -> bool:
+        """True if any pair raises a drift alarm"""
+        return any(m['drift'] for m in self.metrics().values())
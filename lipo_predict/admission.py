@@ -0,0 +1,152 @@
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+# Requests doing work at once, and requests allowed to wait for a slot
+ADMISSION_CONCURRENCY = int(os.environ.get('ADMISSION_CONCURRENCY', 8))
+ADMISSION_QUEUE = int(os.environ.get('ADMISSION_QUEUE', 16))
+
+# Longest a queued request waits for a slot before it is turned away
+ADMISSION_QUEUE_SECONDS = float(os.environ.get('ADMISSION_QUEUE_SECONDS', 2.0))
+
+# Time budget of an admitted request, from arrival to response. Keep it
+# below the caller's own timeout (Chainlink Functions / Lambda) so an
+# overloaded service answers 503 instead of leaving the caller to time out.
+REQUEST_DEADLINE_SECONDS = float(os.environ.get('REQUEST_DEADLINE_SECONDS', 8.0))
+
+class Overloaded(Exception):
+    """Raised when a request is turned away; the client should retry later"""
+
+class DeadlineExceeded(Overloaded):
+    """Raised when a request runs out of its time budget"""
+
+class Deadline:
+    """
+    Absolute time budget of one request, passed down to every blocking step
+
+    Each step asks for its timeout with timeout(), which never exceeds the
+    time left, so a request stops waiting once its budget is spent rather
+    than stacking one full timeout per fallback.
+    """
+
+    def __init__(self, seconds: float = REQUEST_DEADLINE_SECONDS):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Seconds left (0 when expired)"""
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires
+
+    def check(self, stage: str):
+        """Raise DeadlineExceeded if the budget is spent before a stage"""
+        if self.expired:
+            raise DeadlineExceeded(f"Request deadline of {self.seconds:.1f}s exceeded before {stage}")
+
+    def timeout(self, limit: float, stage: str) -> float:
+        """Timeout for a blocking call: its usual limit, capped at the time left"""
+        self.check(stage)
+        return min(limit, self.remaining())
+
+class AdmissionController:
+    """
+    Bounded concurrency with a bounded wait queue
+
+    Up to max_concurrent requests run at once. Up to max_queue more wait
+    for a slot, each for at most queue_seconds (or its deadline, if
+    sooner); anything beyond that is rejected immediately with Overloaded,
+    so a burst gets fast 503s instead of piling threads onto Binance.
+    Service times are tracked to suggest a Retry-After.
+    """
+
+    def __init__(self, max_concurrent: int = ADMISSION_CONCURRENCY,
+                 max_queue: int = ADMISSION_QUEUE,
+                 queue_seconds: float = ADMISSION_QUEUE_SECONDS,
+                 deadline_seconds: float = REQUEST_DEADLINE_SECONDS):
+        """
+        Args:
+            max_concurrent: Requests running at once
+            max_queue: Requests waiting for a slot
+            queue_seconds: Longest wait for a slot
+            deadline_seconds: Time budget of each admitted request
+        """
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_seconds = queue_seconds
+        self.deadline_seconds = deadline_seconds
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._service_seconds = 1.0   # moving average of request duration
+
+    def retry_after(self) -> int:
+        """Seconds for the current backlog to drain, at least 1"""
+        backlog = self.running + self.waiting
+        return max(1, math.ceil(self._service_seconds * backlog / self.max_concurrent))
+
+    def _reject(self, reason: str):
+        with self._lock:
+            self.rejected += 1
+        raise Overloaded(reason)
+
+    @contextmanager
+    def admit(self, deadline_seconds: Optional[float] = None) -> Iterator[Deadline]:
+        """
+        Hold a slot for the duration of a request
+
+        Yields:
+            The request's Deadline, started on arrival (queueing counts against it)
+
+        Raises:
+            Overloaded: The queue is full or no slot freed up in time
+        """
+        deadline = Deadline(deadline_seconds or self.deadline_seconds)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                full = self.waiting >= self.max_queue
+                if not full:
+                    self.waiting += 1
+            if full:
+                self._reject(f"Server busy ({self.running} running, {self.waiting} queued)")
+            try:
+                acquired = self._slots.acquire(timeout=min(self.queue_seconds, deadline.remaining()))
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if not acquired:
+                self._reject(f"No free slot within {self.queue_seconds:.1f}s")
+
+        with self._lock:
+            self.running += 1
+            self.admitted += 1
+        started = time.monotonic()
+        try:
+            yield deadline
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self.running -= 1
+                self._service_seconds = 0.9 * self._service_seconds + 0.1 * elapsed
+            self._slots.release()
+
+    def stats(self) -> Dict:
+        """Current load and totals"""
+        return {
+            'running': self.running,
+            'waiting': self.waiting,
+            'max_concurrent': self.max_concurrent,
+            'max_queue': self.max_queue,
+            'admitted': self.admitted,
+            'rejected': self.rejected,
+            'mean_service_seconds': self._service_seconds,
+        }
@@ -0,0 +1,190 @@
+import numpy as np
+from typing import Tuple
+
+# RiskMetrics decay for daily returns
+RISKMETRICS_LAMBDA = 0.94
+
+def ewma_variance(returns: np.ndarray, lam: float = RISKMETRICS_LAMBDA) -> np.ndarray:
+    """
+    RiskMetrics variance forecast for the period after the last return
+
+    Zero-mean EWMA with weights normalised over the available history.
+    Works column-wise on a (time x pairs) array.
+    """
+    r = np.asarray(returns, dtype=np.float64)
+    weights = lam ** np.arange(len(r) - 1, -1, -1)
+    weights /= weights.sum()
+    return np.tensordot(weights, r ** 2, axes=(0, 0))
+
+def ewma_variance_series(returns: np.ndarray, lam: float = RISKMETRICS_LAMBDA,
+                         warmup: int = 20) -> np.ndarray:
+    """
+    One-step-ahead EWMA variance forecast made after each return
+
+    Element t is the forecast for period t + 1. The recursion is seeded with
+    the mean squared return of the first `warmup` periods.
+    """
+    r2 = np.asarray(returns, dtype=np.float64) ** 2
+    out = np.empty_like(r2)
+    var = r2[:warmup].mean(axis=0)
+    for t in range(len(r2)):
+        var = lam * var + (1 - lam) * r2[t]
+        out[t] = var
+    return out
+
+def _garch_nll(r2: np.ndarray, omega: np.ndarray, alpha: np.ndarray,
+               beta: np.ndarray, var0: float) -> np.ndarray:
+    """
+    Gaussian negative log-likelihood of GARCH(1,1) for many parameter sets at once
+    """
+    h = np.full(np.shape(omega), var0)
+    nll = np.zeros(np.shape(omega))
+    for x in r2:
+        nll += np.log(h) + x / h
+        h = omega + alpha * x + beta * h
+    return 0.5 * nll
+
+def fit_garch(returns: np.ndarray, grid: int = 30,
+              refinements: int = 2) -> Tuple[float, float, float]:
+    """
+    Fit GARCH(1,1) by maximum likelihood with variance targeting
+
+    omega is tied to the sample variance (omega = var * (1 - alpha - beta)),
+    leaving alpha and persistence alpha + beta. All candidates on a grid
+    are evaluated in one vectorised pass over the returns. The grid is then
+    narrowed around the best point `refinements` times.
+
+    Returns:
+        (omega, alpha, beta)
+    """
+    r = np.asarray(returns, dtype=np.float64)
+    r = r - r.mean()
+    r2 = r ** 2
+    var = r2.mean()
+
+    a_lo, a_hi = 0.01, 0.30
+    p_lo, p_hi = 0.80, 0.999
+    for _ in range(refinements + 1):
+        alpha, persistence = np.meshgrid(np.linspace(a_lo, a_hi, grid),
+                                         np.linspace(p_lo, p_hi, grid))
+        alpha, persistence = alpha.ravel(), persistence.ravel()
+        ok = alpha < persistence
+        alpha, persistence = alpha[ok], persistence[ok]
+
+        nll = _garch_nll(r2, var * (1 - persistence), alpha, persistence - alpha, var)
+        best = np.argmin(nll)
+        best_alpha, best_persistence = alpha[best], persistence[best]
+
+        a_step = (a_hi - a_lo) / (grid - 1)
+        p_step = (p_hi - p_lo) / (grid - 1)
+        a_lo, a_hi = max(1e-4, best_alpha - a_step), best_alpha + a_step
+        p_lo, p_hi = best_persistence - p_step, min(0.9999, best_persistence + p_step)
+
+    omega = var * (1 - best_persistence)
+    return float(omega), float(best_alpha), float(best_persistence - best_alpha)
+
+def garch_variance_forecast(returns: np.ndarray, params: Tuple[float, float, float],
+                            horizon: int = 5) -> np.ndarray:
+    """
+    GARCH(1,1) variance forecasts for the next 1..horizon periods
+    """
+    omega, alpha, beta = params
+    r = np.asarray(returns, dtype=np.float64)
+    r = r - r.mean()
+    h = r.var()
+    for x in r:
+        h = omega + alpha * x ** 2 + beta * h
+    # h is now the one-step forecast; further steps revert to the long-run level
+    persistence = alpha + beta
+    long_run = omega / (1 - persistence)
+    steps = np.arange(horizon)
+    return long_run + persistence ** steps * (h - long_run)
+
+def garch_variance_series(returns: np.ndarray, params: Tuple[float, float, float],
+                          horizon: int = 1) -> np.ndarray:
+    """
+    GARCH(1,1) variance forecast made after each return, averaged over horizon periods
+
+    Element t is the mean forecast variance for periods t + 1 .. t + horizon.
+    """
+    omega, alpha, beta = params
+    r = np.asarray(returns, dtype=np.float64)
+    r = r - r.mean()
+    one_step = np.empty_like(r)
+    h = r.var()
+    for t, x in enumerate(r):
+        h = omega + alpha * x ** 2 + beta * h
+        one_step[t] = h
+
+    persistence = alpha + beta
+    long_run = omega / (1 - persistence)
+    decay = np.mean(persistence ** np.arange(horizon))
+    return long_run + decay * (one_step - long_run)
+
+def _rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling mean down axis 0 via cumulative sums, NaN for the first window - 1 rows"""
+    values = np.asarray(values, dtype=np.float64)
+    c = np.concatenate([np.zeros((1,) + values.shape[1:]), np.cumsum(values, axis=0)])
+    out = np.full(values.shape, np.nan)
+    out[window - 1:] = (c[window:] - c[:-window]) / window
+    return out
+
+def parkinson_volatility(high: np.ndarray, low: np.ndarray, window: int = 5) -> np.ndarray:
+    """
+    Rolling Parkinson high-low volatility, in percent per candle
+    """
+    hl = np.log(np.asarray(high, dtype=np.float64) / np.asarray(low, dtype=np.float64))
+    var = _rolling_mean(hl ** 2, window) / (4 * np.log(2))
+    return 100 * np.sqrt(var)
+
+def garman_klass_volatility(open_: np.ndarray, high: np.ndarray, low: np.ndarray,
+                            close: np.ndarray, window: int = 5) -> np.ndarray:
+    """
+    Rolling Garman-Klass OHLC volatility, in percent per candle
+    """
+    hl = np.log(np.asarray(high, dtype=np.float64) / np.asarray(low, dtype=np.float64))
+    co = np.log(np.asarray(close, dtype=np.float64) / np.asarray(open_, dtype=np.float64))
+    var = _rolling_mean(0.5 * hl ** 2 - (2 * np.log(2) - 1) * co ** 2, window)
+    return 100 * np.sqrt(np.maximum(var, 0.0))
+
+def pair_range_volatility(base_vol: np.ndarray, quote_vol: np.ndarray,
+                          base_returns: np.ndarray, quote_returns: np.ndarray,
+                          window: int = 5) -> np.ndarray:
+    """
+    Volatility of a price ratio from the range-based volatility of each leg
+
+    var(base / quote) = var_base + var_quote - 2 * rho * vol_base * vol_quote,
+    with rho the rolling correlation of the legs' returns.
+    """
+    a = np.asarray(base_returns, dtype=np.float64)
+    b = np.asarray(quote_returns, dtype=np.float64)
+    mean_a, mean_b = _rolling_mean(a, window), _rolling_mean(b, window)
+    cov = _rolling_mean(a * b, window) - mean_a * mean_b
+    var_a = _rolling_mean(a ** 2, window) - mean_a ** 2
+    var_b = _rolling_mean(b ** 2, window) - mean_b ** 2
+    rho = np.clip(cov / np.sqrt(np.maximum(var_a * var_b, 1e-12)), -1.0, 1.0)
+
+    var = base_vol ** 2 + quote_vol ** 2 - 2 * rho * base_vol * quote_vol
+    return np.sqrt(np.maximum(var, 0.0))
+
+def fallback_volatility(returns: np.ndarray, method: str = "ewma",
+                        horizon: int = 5) -> float:
+    """
+    Closed-form volatility forecast (percent) used when the ONNX model is unavailable
+
+    Args:
+        returns: Recent percentage returns of the pair, oldest first
+        method: 'ewma' (RiskMetrics) or 'garch' (fits GARCH(1,1) on the returns)
+        horizon: Periods averaged for the forecast
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    returns = returns[np.isfinite(returns)]
+    if len(returns) < 5:
+        raise ValueError(f"Insufficient returns for {method} estimate: {len(returns)}")
+
+    if method == "ewma":
+        return float(np.sqrt(ewma_variance(returns)))
+    if method == "garch":
+        params = fit_garch(returns, grid=15, refinements=1)
+        return float(np.sqrt(garch_variance_forecast(returns, params, horizon).mean()))
+    raise ValueError(f"Unknown fallback method: {method}")
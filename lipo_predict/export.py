@@ -0,0 +1,250 @@
+import csv
+import datetime
+import io
+import json
+import math
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from feature_store import FEATURE_COLUMNS, FeatureStore
+from prediction_log import PredictionLogReader
+
+# Arrow IPC output is optional
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+EXPORT_MIMETYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+    'arrow': 'application/vnd.apache.arrow.stream',
+}
+
+# Records per CSV write / Arrow record batch
+EXPORT_CHUNK_SIZE = 1000
+
+# Flat (CSV / Arrow) columns of each kind and their types. Nested dicts
+# become dotted columns; predicted_volatility holds one value per model
+# horizon, which varies between models, so it is kept as a JSON string.
+EXPORT_COLUMNS: Dict[str, List[Tuple[str, str]]] = {
+    'predictions': [
+        ('predicted_volatility_5d', 'float'),
+        ('predicted_volatility', 'json'),
+        ('annualized_volatility', 'float'),
+        ('volatility_level', 'str'),
+        ('trading_pair', 'str'),
+        ('features.realized_vol', 'float'),
+        ('features.returns_squared', 'float'),
+        ('timestamp', 'str'),
+        ('data_source', 'str'),
+        ('engine', 'str'),
+        ('degraded', 'bool'),
+        ('candle_timestamp', 'int'),
+        ('model_version', 'str'),
+        ('latency_ms.fetch', 'float'),
+        ('latency_ms.features', 'float'),
+        ('latency_ms.inference', 'float'),
+        ('latency_ms.total', 'float'),
+    ],
+    'features': [
+        ('date', 'str'),
+        ('pair', 'str'),
+        ('price', 'float'),
+        *[(column, 'float') for column in FEATURE_COLUMNS],
+    ],
+}
+
+def prediction_records(rows: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Logged predictions in the make_prediction() result shape
+    """
+    for row in rows:
+        vol = row['predicted_vol']
+        yield {
+            'predicted_volatility_5d': vol,
+            'predicted_volatility': json.loads(row['predicted_json'] or '{}'),
+            'annualized_volatility': None if vol is None else vol * np.sqrt(252),
+            'volatility_level': row['volatility_level'],
+            'trading_pair': row['pair'],
+            'features': {
+                'realized_vol': row['realized_vol'],
+                'returns_squared': row['returns_squared']
+            },
+            'timestamp': datetime.datetime.fromtimestamp(row['timestamp']).isoformat(),
+            'data_source': 'Binance API',
+            'engine': row['engine'],
+            'degraded': bool(row['degraded']),
+            'candle_timestamp': row['candle_timestamp'],
+            'model_version': row['model_version'],
+            'latency_ms': {
+                'fetch': row['fetch_ms'],
+                'features': row['features_ms'],
+                'inference': row['inference_ms'],
+                'total': row['total_ms']
+            }
+        }
+
+def feature_records(chunks: Iterable[pd.DataFrame], pair: str) -> Iterator[Dict]:
+    """Stored feature rows (FeatureStore.iter_chunks()) as records"""
+    for chunk in chunks:
+        dates = chunk['Date'].dt.strftime('%Y-%m-%dT%H:%M:%S').tolist()
+        values = chunk[['price'] + FEATURE_COLUMNS].to_numpy().tolist()
+        for date, row in zip(dates, values):
+            yield {'date': date, 'pair': pair, 'price': row[0],
+                   **dict(zip(FEATURE_COLUMNS, row[1:]))}
+
+def json_safe(value):
+    """NaN and +-inf (anywhere in nested dicts / lists) as None, which JSON has no literal for"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [json_safe(item) for item in value]
+    return value
+
+def flatten(record: Dict, columns: List[Tuple[str, str]]) -> Dict:
+    """
+    A record as one value per column of a fixed schema
+
+    Dotted columns reach into nested dicts ('features.realized_vol'), 'json'
+    columns are encoded as JSON text, and missing or non-finite values are
+    None.
+    """
+    out = {}
+    for column, kind in columns:
+        value = record
+        for key in column.split('.'):
+            value = value.get(key) if isinstance(value, dict) else None
+        value = json_safe(value)
+        if kind == 'json' and value is not None:
+            value = json.dumps(value, allow_nan=False)
+        out[column] = value
+    return out
+
+def _chunks(records: Iterable[Dict], size: int) -> Iterator[list]:
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def stream_ndjson(records: Iterable[Dict]) -> Iterator[str]:
+    """One JSON document per line, non-finite numbers as null"""
+    for record in records:
+        yield json.dumps(json_safe(record), allow_nan=False) + '\n'
+
+def stream_csv(records: Iterable[Dict], columns: List[Tuple[str, str]],
+               chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """CSV with a header row of the given columns (empty cells for missing values)"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=[column for column, _ in columns])
+    writer.writeheader()
+    for chunk in _chunks(records, chunk_size):
+        writer.writerows(flatten(record, columns) for record in chunk)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only for an empty range
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def arrow_schema(columns: List[Tuple[str, str]]):
+    """Arrow schema of export columns"""
+    types = {'float': pa.float64(), 'int': pa.int64(), 'bool': pa.bool_(),
+             'str': pa.string(), 'json': pa.string()}
+    return pa.schema([(column, types[kind]) for column, kind in columns])
+
+def stream_arrow(records: Iterable[Dict], columns: List[Tuple[str, str]],
+                 chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[bytes]:
+    """Arrow IPC stream with the schema of the given columns, one record batch per chunk"""
+    if pa is None:
+        raise ValueError("Arrow export needs pyarrow (pip install pyarrow)")
+
+    schema = arrow_schema(columns)
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+    for chunk in _chunks(records, chunk_size):
+        writer.write_batch(pa.RecordBatch.from_pylist(
+            [flatten(record, columns) for record in chunk], schema=schema))
+
+        # Hand each batch on as soon as it is encoded
+        yield sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+
+    writer.close()
+    yield sink.getvalue()
+
+def stream_export(records: Iterable[Dict], fmt: str, kind: str = 'predictions') -> Iterator:
+    """Encode records of a kind ('predictions' or 'features') as 'ndjson', 'csv' or 'arrow' chunks"""
+    if kind not in EXPORT_COLUMNS:
+        raise ValueError(f"Unknown export kind: {kind}")
+    if fmt == 'ndjson':
+        return stream_ndjson(records)
+    if fmt == 'csv':
+        return stream_csv(records, EXPORT_COLUMNS[kind])
+    if fmt == 'arrow':
+        if pa is None:
+            raise ValueError("Arrow export needs pyarrow (pip install pyarrow)")
+        return stream_arrow(records, EXPORT_COLUMNS[kind])
+    raise ValueError(f"Unknown export format: {fmt}")
+
+def export_records(kind: str, log: Optional[PredictionLogReader] = None,
+                   store: Optional[FeatureStore] = None,
+                   pair: Optional[str] = None,
+                   since: Optional[float] = None,
+                   until: Optional[float] = None) -> Iterator[Dict]:
+    """
+    Records of a prediction or feature range, read lazily
+
+    Args:
+        kind: 'predictions' (SQLite log) or 'features' (feature store, needs pair)
+        log, store: Sources (created with defaults when None; the log
+                    is then opened read-only, without a writer thread)
+        pair: Trading pair filter
+        since, until: Unix-second bounds (inclusive, exclusive)
+    """
+    if kind == 'predictions':
+        log = log or PredictionLogReader()
+        return prediction_records(log.iter_rows(since, until, pair))
+    if kind == 'features':
+        if not pair:
+            raise ValueError("Feature export needs a pair")
+        store = store or FeatureStore()
+        bound = lambda t: None if t is None else pd.Timestamp(t, unit='s')
+        return feature_records(store.iter_chunks(pair, '1d', bound(since), bound(until)), pair)
+    raise ValueError(f"Unknown export kind: {kind}")
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream predictions or features to a file")
+    parser.add_argument('--kind', choices=['predictions', 'features'], default='predictions')
+    parser.add_argument('--format', choices=list(EXPORT_MIMETYPES), default='ndjson')
+    parser.add_argument('--pair', help="e.g. LINKUSDT/ETHUSDT")
+    parser.add_argument('--since', type=float, help="unix seconds")
+    parser.add_argument('--until', type=float, help="unix seconds")
+    parser.add_argument('--output', help="output file (default stdout)")
+    args = parser.parse_args()
+
+    chunks = stream_export(export_records(args.kind, pair=args.pair, since=args.since,
+                                          until=args.until), args.format, args.kind)
+    binary = args.format == 'arrow'
+    if args.output:
+        out = open(args.output, 'wb' if binary else 'w', newline='' if not binary else None)
+    else:
+        out = sys.stdout.buffer if binary else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if args.output:
+            out.close()
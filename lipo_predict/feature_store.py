@@ -0,0 +1,321 @@
+import fcntl
+import os
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Returns in the rolling realized volatility window
+FEATURE_WINDOW = 5
+
+# Model input columns, in order
+FEATURE_COLUMNS = ['realized_vol', 'returns_squared']
+
+DEFAULT_STORE_DIR = os.environ.get(
+    'FEATURE_STORE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'feature_store')
+)
+
+def rolling_std(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Rolling sample standard deviation (ddof=1) down axis 0
+
+    Uses cumulative sums, so the cost is O(rows) whatever the window.
+    The first window - 1 rows are NaN, matching pandas rolling().std().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    missing = np.isnan(values)
+
+    # Centre columns first to keep the sum-of-squares difference stable;
+    # work in place on one buffer to keep temporaries to a minimum
+    centred = values - np.nanmean(values, axis=0)
+    centred[missing] = 0.0
+
+    c1 = np.zeros((len(values) + 1,) + values.shape[1:])
+    np.cumsum(centred, axis=0, out=c1[1:])
+    np.square(centred, out=centred)
+    c2 = np.zeros_like(c1)
+    np.cumsum(centred, axis=0, out=c2[1:])
+    del centred
+
+    s1 = c1[window:] - c1[:-window]
+    var = c2[window:] - c2[:-window]
+    del c1, c2
+    np.square(s1, out=s1)
+    s1 /= window
+    var -= s1
+    var /= (window - 1)
+    del s1
+
+    # Any NaN inside the window makes the result NaN, like pandas
+    cn = np.zeros((len(values) + 1,) + values.shape[1:], dtype=np.int64)
+    np.cumsum(missing, axis=0, out=cn[1:])
+    var[(cn[window:] - cn[:-window]) > 0] = np.nan
+
+    out = np.full(values.shape, np.nan)
+    np.sqrt(np.maximum(var, 0.0, out=var), out=out[window - 1:])
+    return out
+
+def features_from_returns(returns: np.ndarray, window: int = FEATURE_WINDOW) -> np.ndarray:
+    """
+    Model features from percentage returns (row t uses returns up to t)
+
+    The first window - 1 rows are NaN. Works column-wise on a
+    (returns x pairs) array as well.
+    """
+    returns = np.asarray(returns, dtype=np.float64)
+    features = np.empty(returns.shape[:1] + (len(FEATURE_COLUMNS),) + returns.shape[1:])
+    features[:, 0] = rolling_std(returns, window)
+    features[:, 1] = returns ** 2
+    return features
+
+def compute_features(price: np.ndarray, window: int = FEATURE_WINDOW) -> np.ndarray:
+    """
+    Model features for every candle of an ETH / CRYPTO price ratio series
+
+    This is the single definition used by training and serving. Row t holds
+    realized_vol (rolling std of the last `window` percentage returns) and
+    returns_squared (latest return squared), both as of candle t. The first
+    `window` rows are NaN.
+
+    Works column-wise on a (candles x pairs) array as well.
+    """
+    price = np.asarray(price, dtype=np.float64)
+    features = np.full(price.shape[:1] + (len(FEATURE_COLUMNS),) + price.shape[1:], np.nan)
+    if len(price) < 2:
+        return features
+
+    features[1:] = features_from_returns(100 * (price[1:] / price[:-1] - 1), window)
+    return features
+
+def pair_returns(prices: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Percentage returns of every pair ratio of N price series at once
+
+    Pair (i, j) with i < j is the ratio prices[:, j] / prices[:, i], the
+    orientation of trading_pair 'CRYPTO/ETH' (an ETH / CRYPTO price). Its
+    log return is the difference of the legs' log returns, so all
+    N * (N - 1) / 2 series come from one matrix of N log-return columns.
+
+    Args:
+        prices: (candles x N) prices aligned on time
+
+    Returns:
+        i, j: leg indices of each pair
+        returns: (candles - 1 x pairs) percentage returns
+    """
+    log_returns = np.diff(np.log(np.asarray(prices, dtype=np.float64)), axis=0)
+    i, j = np.triu_indices(log_returns.shape[1], k=1)
+    return i, j, 100 * np.expm1(log_returns[:, j] - log_returns[:, i])
+
+def features_by_segment(dates: np.ndarray, price: np.ndarray,
+                        step: Optional[np.timedelta64],
+                        window: int = FEATURE_WINDOW) -> np.ndarray:
+    """
+    compute_features() over each run of consecutive candles separately
+
+    A rolling window never spans missing candles: after a gap the first
+    `window` rows are NaN again, exactly as at the start of the series.
+
+    Args:
+        dates: Candle dates, ascending
+        price: Price of each candle
+        step: Candle length (None: treat the series as contiguous)
+        window: Returns in the rolling window
+    """
+    price = np.asarray(price, dtype=np.float64)
+    if step is None or len(price) < 2:
+        return compute_features(price, window)
+    breaks = np.nonzero(np.diff(np.asarray(dates, dtype='datetime64[ns]')) != step)[0] + 1
+    bounds = np.concatenate([[0], breaks, [len(price)]])
+    features = np.empty((len(price), len(FEATURE_COLUMNS)))
+    for a, b in zip(bounds[:-1], bounds[1:]):
+        features[a:b] = compute_features(price[a:b], window)
+    return features
+
+# Binance interval units with a fixed length ('1M' months vary)
+INTERVAL_UNITS = {'m': 'min', 'h': 'h', 'd': 'D', 'w': 'W'}
+
+def _interval_step(interval: str) -> Optional[np.timedelta64]:
+    """Candle length of a Binance interval ('1d', '4h', '15m', ...), None if not fixed"""
+    unit = INTERVAL_UNITS.get(interval[-1:])
+    if unit is None or not interval[:-1].isdigit():
+        return None
+    return pd.Timedelta(int(interval[:-1]), unit=unit).to_timedelta64()
+
+def _key_path(root: str, pair: str, interval: str) -> str:
+    safe_pair = pair.replace('/', '_')
+    return os.path.join(root, f"{safe_pair}_{interval}.csv")
+
+class FeatureStore:
+    """
+    Per pair and interval feature table, extended once per new candle
+
+    Each (pair, interval) lives in a CSV of Date, price and FEATURE_COLUMNS.
+    update() upserts candles by date and recomputes features only from the
+    earliest new or changed candle on, so a candle's features are computed
+    once and then reused by every reader. Backfilled history merges in
+    front of what is stored, and rolling windows never span missing
+    candles. Writes are serialised across threads and processes with a
+    lock file; pure appends extend the CSV, anything else rewrites it
+    atomically.
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR, window: int = FEATURE_WINDOW):
+        self.root = root
+        self.window = window
+        self._cache: Dict[str, Tuple[float, pd.DataFrame]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _read(self, path: str) -> pd.DataFrame:
+        """Stored table, re-read only when the file changed"""
+        if not os.path.exists(path):
+            return pd.DataFrame(columns=['Date', 'price'] + FEATURE_COLUMNS)
+        mtime = os.path.getmtime(path)
+        cached = self._cache.get(path)
+        if cached is None or cached[0] != mtime:
+            df = pd.read_csv(path, parse_dates=['Date'])
+            self._cache[path] = (mtime, df)
+            return df
+        return cached[1]
+
+    def update(self, pair: str, interval: str, dates, price) -> int:
+        """
+        Upsert candles by date and refresh the features they affect
+
+        Candles may be older than, overlap or follow the stored ones; a
+        stored candle whose price differs is replaced. Features are
+        recomputed from the earliest new or changed candle to the end,
+        with `window` stored prices before it as context.
+
+        Args:
+            pair: Pair name, e.g. 'LINKUSDT/ETHUSDT'
+            interval: Candle interval, e.g. '1d'
+            dates: Candle dates
+            price: ETH / CRYPTO price ratio for each date
+
+        Returns:
+            Number of candles added (dates not stored before)
+        """
+        path = _key_path(self.root, pair, interval)
+        incoming = pd.DataFrame({
+            'Date': pd.to_datetime(pd.Series(dates)).to_numpy(),
+            'price': np.asarray(price, dtype=np.float64),
+        }).dropna()
+
+        with self._lock, open(path + '.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                stored = self._read(path)
+                if len(stored):
+                    merged = pd.concat([stored[['Date', 'price']], incoming], ignore_index=True)
+                else:
+                    merged = incoming
+                merged = (merged.drop_duplicates('Date', keep='last')
+                          .sort_values('Date', kind='stable').reset_index(drop=True))
+
+                # Candles that are new or whose price changed
+                previous = merged['Date'].map(stored.set_index('Date')['price']).to_numpy(dtype=np.float64)
+                new = np.isnan(previous)
+                changed = new | ~np.isclose(merged['price'].to_numpy(), previous, rtol=1e-12, atol=0.0)
+                if not changed.any():
+                    return 0
+
+                # Rows before `first` are unchanged stored rows at the same positions
+                first = int(np.argmax(changed))
+                start = max(0, first - self.window)
+                features = features_by_segment(
+                    merged['Date'].to_numpy()[start:], merged['price'].to_numpy()[start:],
+                    _interval_step(interval), self.window
+                )[first - start:]
+
+                table = merged
+                for k, column in enumerate(FEATURE_COLUMNS):
+                    values = np.empty(len(table))
+                    values[:first] = stored[column].to_numpy()[:first]
+                    values[first:] = features[:, k]
+                    table[column] = values
+
+                if first == len(stored):
+                    # Only newer candles: append them
+                    table.iloc[first:].to_csv(path, mode='a', header=not len(stored), index=False)
+                else:
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    table.to_csv(tmp_path, index=False)
+                    os.replace(tmp_path, path)
+                self._cache[path] = (os.path.getmtime(path), table)
+                return int(new.sum())
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def read(self, pair: str, interval: str = '1d') -> pd.DataFrame:
+        """Full stored table of a pair"""
+        with self._lock:
+            return self._read(_key_path(self.root, pair, interval))
+
+    def iter_chunks(self, pair: str, interval: str = '1d',
+                    since: Optional[pd.Timestamp] = None,
+                    until: Optional[pd.Timestamp] = None,
+                    chunk_size: int = 10000) -> Iterator[pd.DataFrame]:
+        """
+        Stored rows in [since, until) read chunk_size rows at a time
+        """
+        path = _key_path(self.root, pair, interval)
+        if not os.path.exists(path):
+            return
+        for chunk in pd.read_csv(path, parse_dates=['Date'], chunksize=chunk_size):
+            if since is not None:
+                chunk = chunk[chunk['Date'] >= since]
+            if until is not None:
+                if len(chunk) and chunk['Date'].iloc[0] >= until:
+                    return
+                chunk = chunk[chunk['Date'] < until]
+            if len(chunk):
+                yield chunk
+
+    def latest(self, pair: str, interval: str = '1d') -> Tuple[pd.Timestamp, np.ndarray]:
+        """
+        Date and (1, n_features) float32 feature row of the newest candle
+        """
+        df = self.read(pair, interval)
+        if df.empty:
+            raise ValueError(f"No features stored for {pair} {interval}")
+        row = df.iloc[-1]
+        features = row[FEATURE_COLUMNS].to_numpy(dtype=np.float32).reshape(1, -1)
+        if not np.isfinite(features).all():
+            raise ValueError(f"Insufficient history for {pair} {interval} features")
+        return row['Date'], features
+
+    def training_arrays(self, pair: str, interval: str = '1d',
+                        horizon: int = 5) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Feature matrix and target (realized_vol `horizon` candles ahead)
+
+        The target is joined by date (date + horizon candles), so across a
+        gap in the stored candles a row gets no label rather than one from
+        further ahead; rows without a target are dropped.
+
+        Returns:
+            X: float32 (n_samples, n_features)
+            Y: float32 (n_samples,)
+            dates: datetime64 (n_samples,)
+        """
+        df = self.read(pair, interval)
+        X = df[FEATURE_COLUMNS].to_numpy(dtype=np.float32)
+        dates = df['Date'].to_numpy(dtype='datetime64[ns]')
+        target = np.full(len(df), np.nan, dtype=np.float32)
+        step = _interval_step(interval)
+        if step is None:
+            # Intervals without a fixed length ('1M') shift by rows
+            if len(df) > horizon:
+                target[:-horizon] = X[horizon:, 0]
+        else:
+            k = np.searchsorted(dates, dates + horizon * step)
+            found = k < len(dates)
+            found[found] = dates[k[found]] == dates[found] + horizon * step
+            target[found] = X[k[found], 0]
+
+        valid = np.isfinite(X).all(axis=1) & np.isfinite(target)
+        return (np.ascontiguousarray(X[valid]), target[valid], dates[valid])
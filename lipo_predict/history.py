@@ -0,0 +1,184 @@
+import atexit
+import fcntl
+import os
+import threading
+import time
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+HISTORY_CAPACITY = int(os.environ.get('HISTORY_CAPACITY', 10000))
+
+# Seconds between snapshots of the buffer to disk
+HISTORY_PERSIST_SECONDS = float(os.environ.get('HISTORY_PERSIST_SECONDS', 60))
+
+DEFAULT_HISTORY_PATH = os.environ.get(
+    'HISTORY_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prediction_history.npz')
+)
+
+# One row per prediction
+HISTORY_DTYPE = np.dtype([
+    ('timestamp', 'f8'),          # unix seconds the prediction was made
+    ('candle_timestamp', 'i8'),   # open time of the candle the features come from
+    ('pair', 'U24'),
+    ('predicted_vol', 'f4'),      # 5-day forecast, percent
+    ('realized_vol', 'f4'),       # features
+    ('returns_squared', 'f4'),
+    ('engine', 'U8'),             # 'onnx' or the fallback estimator
+    ('model_version', 'U16'),
+])
+
+class PredictionHistory:
+    """
+    Fixed-capacity ring buffer of recent predictions in one structured array
+
+    Appends overwrite the oldest row once the buffer is full. Queries find
+    their window by binary search and copy only the matching rows (at most
+    two segments, when the range wraps around the end) while holding the
+    lock, so a concurrent append never changes rows being served.
+
+    The buffer is saved to path at most every persist_seconds (and at exit)
+    and reloaded on start. The buffer is per process: with several service
+    workers, the first to start takes an exclusive lock on the snapshot and
+    is the only one that writes it; the others load it once and keep their
+    own history in memory only.
+    """
+
+    def __init__(self, capacity: int = HISTORY_CAPACITY,
+                 path: Optional[str] = DEFAULT_HISTORY_PATH,
+                 persist_seconds: float = HISTORY_PERSIST_SECONDS):
+        """
+        Args:
+            capacity: Rows kept
+            path: npz snapshot file, None to keep history in memory only
+            persist_seconds: Minimum seconds between snapshots
+        """
+        self.capacity = capacity
+        self.path = path
+        self.persist_seconds = persist_seconds
+        self._rows = np.zeros(capacity, dtype=HISTORY_DTYPE)
+        self._next = 0      # total rows ever appended; next slot is _next % capacity
+        self._saved_at = time.time()
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._owner_file = None
+        self._owner_pid = None
+
+        if path and os.path.exists(path):
+            self._load()
+        if path and self._claim_snapshot():
+            atexit.register(self.persist)
+
+    def _claim_snapshot(self) -> bool:
+        """Become the one process that writes the snapshot, if no other is"""
+        lock_file = open(self.path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            print(f"History snapshot {self.path} is written by another process; "
+                  f"keeping this process's history in memory")
+            return False
+        # Held (and the lock kept) for the life of the process; children
+        # forked later inherit the lock but not the ownership
+        self._owner_file = lock_file
+        self._owner_pid = os.getpid()
+        return True
+
+    def __len__(self) -> int:
+        return min(self._next, self.capacity)
+
+    def _load(self):
+        """Restore the newest rows of a snapshot (capacity may have changed)"""
+        try:
+            with np.load(self.path) as snapshot:
+                rows = snapshot['rows']
+        except Exception as e:
+            print(f"Ignoring unreadable history snapshot {self.path}: {e}")
+            return
+        rows = rows[-self.capacity:]
+        self._rows[:len(rows)] = rows.astype(HISTORY_DTYPE)
+        self._next = len(rows)
+
+    def append(self, record: Dict):
+        """
+        Add one prediction (keys as in HISTORY_DTYPE; missing fields stay empty)
+        """
+        row = tuple(record.get(name, 0 if HISTORY_DTYPE[name].kind in 'fi' else '')
+                    for name in HISTORY_DTYPE.names)
+        with self._lock:
+            self._rows[self._next % self.capacity] = row
+            self._next += 1
+            self._dirty = True
+            due = time.time() - self._saved_at >= self.persist_seconds
+        if due:
+            self.persist()
+
+    def _segments(self) -> List[np.ndarray]:
+        """Stored rows oldest first, as views (only valid under the lock)"""
+        if self._next <= self.capacity:
+            return [self._rows[:self._next]]
+        head = self._next % self.capacity
+        return [self._rows[head:], self._rows[:head]]
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              pair: Optional[str] = None, limit: Optional[int] = None) -> List[np.ndarray]:
+        """
+        Rows in a time window, oldest first, as a list of array segments
+
+        Timestamps only grow, so the window is found by binary search in
+        each segment; only the rows returned are copied.
+
+        Args:
+            since, until: Unix-second bounds on timestamp (inclusive, exclusive)
+            pair: Only rows of this trading pair
+            limit: Keep only the newest `limit` rows
+        """
+        out = []
+        with self._lock:
+            for segment in self._segments():
+                lo = 0 if since is None else int(np.searchsorted(segment['timestamp'], since, 'left'))
+                hi = len(segment) if until is None else int(np.searchsorted(segment['timestamp'], until, 'left'))
+                part = segment[lo:hi]
+                if pair is not None:
+                    part = part[part['pair'] == pair]
+                out.append(part)
+            if limit is not None:
+                out = _keep_newest(out, limit)
+            # Pair-filtered parts are copies already
+            return [part if pair is not None else part.copy() for part in out if len(part)]
+
+    def persist(self):
+        """Write the buffer (oldest first) to path if it changed and this process owns it"""
+        if not self.path or self._owner_pid != os.getpid():
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            rows = np.concatenate(self._segments())
+            self._dirty = False
+            self._saved_at = time.time()
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp.npz"
+        np.savez(tmp_path, rows=rows)
+        os.replace(tmp_path, self.path)
+
+def _keep_newest(segments: List[np.ndarray], limit: int) -> List[np.ndarray]:
+    """Drop rows from the oldest end until at most limit remain (without copying)"""
+    out = list(segments)
+    excess = sum(len(part) for part in out) - limit
+    while excess > 0 and out:
+        if len(out[0]) <= excess:
+            excess -= len(out[0])
+            out.pop(0)
+        else:
+            out[0] = out[0][excess:]
+            excess = 0
+    return out
+
+def iter_records(segments: List[np.ndarray]) -> Iterator[Dict]:
+    """Rows of query() segments as JSON-ready dicts"""
+    for segment in segments:
+        for row in segment.tolist():
+            yield dict(zip(HISTORY_DTYPE.names, row))
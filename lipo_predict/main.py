@@ -1,3 +1,4 @@
+import hashlib
 import json
 import numpy as np
 import pandas as pd
@@ -5,9 +6,26 @@ import onnxruntime as ort
 import requests
 import time
 import datetime
-from typing import Dict, Tuple
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 import os
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
+from rate_limit import BinanceRateGovernor, KLINES_WEIGHT, SERVING
+from admission import AdmissionController, Deadline, DeadlineExceeded, Overloaded
+from closed_form import ewma_variance, fallback_volatility
+from feature_store import FEATURE_WINDOW, FeatureStore, compute_features, features_from_returns, pair_returns
+from ranges import DEFAULT_WIDTH_SIGMAS, recommend_ranges, tick_spacing_for, tick_to_price
+from il_simulator import simulate_impermanent_loss
+from history import PredictionHistory, iter_records
+from accuracy_monitor import AccuracyMonitor, FORECAST_HORIZON
+from model_outputs import classify_volatility, parse_output_horizons
+from prediction_log import PredictionLog
+from export import EXPORT_MIMETYPES, export_records, stream_export
+from publish_policy import (
+    ConfirmationRejected, PublishPolicy, abi_encode_uint256, scale_volatility, verify_confirmation
+)
 
 # Initialize Flask app
 app = Flask(__name__)
@@ -16,10 +34,68 @@ app = Flask(__name__)
 session = None
 input_name = None
 output_name = None
+output_horizons = {}  # ONNX output name -> horizon label, e.g. 'vol_14d' -> '14d'
+model_version = 'none'  # short hash of the loaded model file
+
+# Closed-form estimator used when the ONNX model is missing or fails ('ewma' or 'garch')
+FALLBACK_METHOD = os.environ.get('FALLBACK_METHOD', 'ewma')
+
+# Features persisted per pair and candle, shared with training
+feature_store = FeatureStore()
+
+# Recent predictions, served by /history
+history = PredictionHistory()
+
+# Scores forecasts against realized volatility as candles arrive; forecasts
+# still waiting for their target are recovered from the history buffer
+accuracy_monitor = AccuracyMonitor()
+for _segment in history.query(since=time.time() - (FORECAST_HORIZON + 2) * 24 * 60 * 60):
+    for _row in _segment:
+        accuracy_monitor.record_prediction(str(_row['pair']), int(_row['candle_timestamp']),
+                                           float(_row['predicted_vol']))
+
+# Every prediction with its inputs and latency, written in the background
+prediction_log = PredictionLog()
+
+# Deviation/heartbeat policy for on-chain updates
+publish_policy = PublishPolicy()
+
+# Default symbol universe of /volatility/matrix and its size limit
+MATRIX_SYMBOLS = ["ETHUSDT", "LINKUSDT", "UNIUSDT", "AAVEUSDT", "SUSHIUSDT", "1INCHUSDT"]
+MAX_MATRIX_SYMBOLS = int(os.environ.get('MAX_MATRIX_SYMBOLS', 30))
+
+# Monte Carlo limits of /ranges/simulate
+MAX_IL_PATHS = int(os.environ.get('MAX_IL_PATHS', 50000))
+IL_WORKERS = int(os.environ.get('IL_WORKERS', 1))
+
+# Candle length of the served features, and the pre-encoded /predict/abi
+# responses, valid until the next candle opens
+CANDLE_SECONDS = 24 * 60 * 60
+# Degraded (closed-form) responses are only reused briefly, so the model
+# answer replaces them as soon as it is available again
+ABI_FALLBACK_CACHE_SECONDS = float(os.environ.get('ABI_FALLBACK_CACHE_SECONDS', 60))
+# Distinct days values kept in the /predict/abi cache
+ABI_CACHE_SIZE = 16
+# days -> (body, candle_timestamp, expires); entries are replaced as a
+# whole so readers need no lock
+abi_cache = {}
+abi_cache_lock = threading.Lock()
+
+# Host-wide Binance weight budget, shared with the trainer and predictor
+governor = BinanceRateGovernor(priority=SERVING)
+
+# Concurrency limit, wait queue and per-request deadline of the routes that
+# fetch from Binance (ADMISSION_* / REQUEST_DEADLINE_SECONDS env vars)
+admission = AdmissionController()
+
+# Per-request Binance timeout, capped by what is left of the request deadline
+FETCH_TIMEOUT_SECONDS = 10
+# Bytes read between deadline checks while a response body streams in
+FETCH_CHUNK_BYTES = 16 * 1024
 
 def initialize_model(model_path: str = None):
     """Initialize ONNX model (called once at startup)"""
-    global session, input_name, output_name
+    global session, input_name, output_name, output_horizons, model_version
     
     if session is not None:
         return  # Already initialized
@@ -34,16 +110,38 @@ def initialize_model(model_path: str = None):
             raise FileNotFoundError(f"Model file not found: {model_path}")
         
         session = ort.InferenceSession(model_path)
+        with open(model_path, 'rb') as f:
+            model_version = hashlib.sha256(f.read()).hexdigest()[:12]
         input_name = session.get_inputs()[0].name
         output_name = session.get_outputs()[0].name
-        print(f"Model loaded successfully from {model_path}")
+        output_horizons = parse_output_horizons([o.name for o in session.get_outputs()])
+        print(f"Model {model_version} loaded successfully from {model_path} "
+              f"(horizons: {', '.join(output_horizons.values())})")
         
     except Exception as e:
         print(f"Failed to load model: {e}")
         raise
 
-def get_crypto_data(symbol: str, days: int = 30) -> pd.DataFrame:
-    """Get recent data from Binance API"""
+def read_body(response: requests.Response, deadline: Optional[Deadline], stage: str) -> bytes:
+    """
+    Body of a streamed response, abandoned once the deadline has passed
+    
+    requests' timeout bounds each connect and socket read, not the whole
+    download, so a slowly trickling body could outlast the deadline; reading
+    it in chunks puts a bound of one read timeout on the overrun.
+    """
+    chunks = []
+    try:
+        for chunk in response.iter_content(FETCH_CHUNK_BYTES):
+            chunks.append(chunk)
+            if deadline is not None:
+                deadline.check(stage)
+    finally:
+        response.close()
+    return b''.join(chunks)
+
+def get_crypto_data(symbol: str, days: int = 30, deadline: Optional[Deadline] = None) -> pd.DataFrame:
+    """Get recent data from Binance API (waiting no longer than the deadline allows)"""
     base_url = "https://api.binance.com/api/v3/klines"
     
     # Calculate time range
@@ -58,10 +156,21 @@ def get_crypto_data(symbol: str, days: int = 30) -> pd.DataFrame:
         'limit': 1000
     }
     
+    stage = f"fetching {symbol}"
+    timeout = FETCH_TIMEOUT_SECONDS
+    if deadline is not None:
+        timeout = deadline.timeout(timeout, stage)
+    
     try:
-        response = requests.get(base_url, params=params, timeout=10)
+        # Waiting for weight and the request share one budget: the HTTP
+        # timeout is sized by what is left after the wait
+        governor.acquire(KLINES_WEIGHT, max_wait=timeout)
+        if deadline is not None:
+            timeout = deadline.timeout(FETCH_TIMEOUT_SECONDS, stage)
+        response = governor.request(base_url, params=params, timeout=timeout, stream=True)
+        body = read_body(response, deadline, stage)
         response.raise_for_status()
-        data = response.json()
+        data = json.loads(body)
         
         if not data:
             raise ValueError(f"No data returned for {symbol}")
@@ -82,11 +191,13 @@ def get_crypto_data(symbol: str, days: int = 30) -> pd.DataFrame:
         
         return df
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise Exception(f"Failed to fetch {symbol}: {str(e)}")
 
-def get_crypto_pair_data(days: int = 30) -> Tuple[pd.DataFrame, pd.DataFrame, str]:
-    """Get crypto pair data with fallback options"""
+def get_crypto_pair_data(days: int = 30, deadline: Optional[Deadline] = None) -> Tuple[pd.DataFrame, pd.DataFrame, str]:
+    """Get crypto pair data with fallback options, all within one deadline"""
     crypto_symbols = ["LINKUSDT", "UNIUSDT", "AAVEUSDT", "SUSHIUSDT", "1INCHUSDT"]
     eth_symbol = "ETHUSDT"
     
@@ -96,9 +207,11 @@ def get_crypto_pair_data(days: int = 30) -> Tuple[pd.DataFrame, pd.DataFrame, st
     # Try crypto symbols in order
     for symbol in crypto_symbols:
         try:
-            crypto_data = get_crypto_data(symbol, days)
+            crypto_data = get_crypto_data(symbol, days, deadline)
             crypto_symbol = symbol
             break
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             print(f"{symbol} failed: {e}")
             continue
@@ -108,15 +221,17 @@ def get_crypto_pair_data(days: int = 30) -> Tuple[pd.DataFrame, pd.DataFrame, st
     
     # Get ETH data
     try:
-        eth_data = get_crypto_data(eth_symbol, days)
+        eth_data = get_crypto_data(eth_symbol, days, deadline)
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         raise Exception(f"ETH data fetch failed: {e}")
     
     trading_pair = f"{crypto_symbol}/ETHUSDT"
     return crypto_data, eth_data, trading_pair
 
-def prepare_features(crypto_data: pd.DataFrame, eth_data: pd.DataFrame) -> np.ndarray:
-    """Prepare features for prediction"""
+def get_pair_prices(crypto_data: pd.DataFrame, eth_data: pd.DataFrame) -> pd.DataFrame:
+    """Date and ETH / CRYPTO price ratio for the dates both legs have"""
     # Merge data
     crypto_clean = crypto_data[['Date', 'Open']].rename(columns={'Open': 'CRYPTO'})
     eth_clean = eth_data[['Date', 'Open']].rename(columns={'Open': 'ETH'})
@@ -129,52 +244,42 @@ def prepare_features(crypto_data: pd.DataFrame, eth_data: pd.DataFrame) -> np.nd
     
     # Calculate price ratio
     df['price'] = df['ETH'] / df['CRYPTO']
+    return df[['Date', 'price']].reset_index(drop=True)
+
+def get_pair_returns(crypto_data: pd.DataFrame, eth_data: pd.DataFrame) -> pd.Series:
+    """Percentage returns of the ETH / CRYPTO price ratio"""
+    prices = get_pair_prices(crypto_data, eth_data)
+    return 100 * prices['price'].pct_change().dropna()
+
+def prepare_features(crypto_data: pd.DataFrame, eth_data: pd.DataFrame) -> np.ndarray:
+    """Prepare features for prediction (without going through the feature store)"""
+    prices = get_pair_prices(crypto_data, eth_data)
     
-    # Calculate returns
-    returns = 100 * df['price'].pct_change().dropna()
-    
-    if len(returns) < 10:
-        raise ValueError("Insufficient returns data for calculation")
-    
-    # Calculate features (last 5 days)
-    recent_returns = returns.tail(10)
-    
-    realized_vol = recent_returns.rolling(5).std().iloc[-1]
-    returns_squared = recent_returns.iloc[-1] ** 2
+    # Same feature definition as training
+    features = compute_features(prices['price'].to_numpy())[-1:]
     
-    if pd.isna(realized_vol) or pd.isna(returns_squared):
+    if not np.isfinite(features).all():
         raise ValueError("NaN values in calculated features")
     
-    features = np.array([[realized_vol, returns_squared]], dtype=np.float32)
-    
-    return features
-
-def classify_volatility(vol: float) -> str:
-    """Classify volatility level"""
-    if vol < 2:
-        return "LOW"
-    elif vol < 5:
-        return "MODERATE" 
-    elif vol < 10:
-        return "HIGH"
-    else:
-        return "EXTREME"
+    return features.astype(np.float32)
 
 def make_prediction(features: np.ndarray, trading_pair: str) -> Dict:
     """Make volatility prediction using ONNX model"""
-    global session, input_name, output_name
+    global session, input_name, output_horizons
     
     if session is None:
         raise Exception("Model not initialized")
     
     try:
-        # Run prediction
-        prediction = session.run(
-            [output_name], 
-            {input_name: features}
-        )[0]
+        # Run prediction (all horizons of a multi-horizon model in one call)
+        names = list(output_horizons)
+        outputs = session.run(names, {input_name: features})
+        horizon_vols = {
+            output_horizons[name]: float(value[0][0])
+            for name, value in zip(names, outputs)
+        }
         
-        predicted_vol = float(prediction[0][0])
+        predicted_vol = horizon_vols.get('5d', float(outputs[0][0][0]))
         
         # Calculate additional metrics
         annual_vol = predicted_vol * np.sqrt(252)
@@ -182,6 +287,7 @@ def make_prediction(features: np.ndarray, trading_pair: str) -> Dict:
         
         result = {
             'predicted_volatility_5d': predicted_vol,
+            'predicted_volatility': horizon_vols,
             'annualized_volatility': annual_vol,
             'volatility_level': vol_level,
             'trading_pair': trading_pair,
@@ -190,7 +296,8 @@ def make_prediction(features: np.ndarray, trading_pair: str) -> Dict:
                 'returns_squared': float(features[0][1])
             },
             'timestamp': datetime.datetime.now().isoformat(),
-            'data_source': 'Binance API'
+            'data_source': 'Binance API',
+            'engine': 'onnx'
         }
         
         return result
@@ -198,6 +305,223 @@ def make_prediction(features: np.ndarray, trading_pair: str) -> Dict:
     except Exception as e:
         raise Exception(f"Prediction failed: {str(e)}")
 
+def make_fallback_prediction(returns: pd.Series, features: np.ndarray,
+                             trading_pair: str, reason: str) -> Dict:
+    """Closed-form prediction in the make_prediction() result shape (degraded mode)"""
+    predicted_vol = fallback_volatility(returns.to_numpy(), FALLBACK_METHOD)
+    
+    return {
+        'predicted_volatility_5d': predicted_vol,
+        'predicted_volatility': {'5d': predicted_vol},
+        'annualized_volatility': predicted_vol * np.sqrt(252),
+        'volatility_level': classify_volatility(predicted_vol),
+        'trading_pair': trading_pair,
+        'features': {
+            'realized_vol': float(features[0][0]),
+            'returns_squared': float(features[0][1])
+        },
+        'timestamp': datetime.datetime.now().isoformat(),
+        'data_source': 'Binance API',
+        'engine': FALLBACK_METHOD,
+        'degraded': True,
+        'fallback_reason': reason
+    }
+
+def run_prediction(days: int, deadline: Optional[Deadline] = None) -> Dict:
+    """
+    Fetch data, build features and predict, falling back to the closed-form estimator
+    
+    Args:
+        days: Days of candles to fetch
+        deadline: Time budget for the fetches (None: no limit); once it is
+                  spent, inference falls back to the closed-form estimator
+    """
+    print(f"Starting volatility prediction (last {days} days)")
+    started = time.perf_counter()
+    
+    # Get latest crypto data
+    crypto_data, eth_data, trading_pair = get_crypto_pair_data(days, deadline)
+    print(f"Fetched data for {trading_pair}")
+    fetched = time.perf_counter()
+    
+    # Features for new candles are computed once and stored; read the latest
+    prices = get_pair_prices(crypto_data, eth_data)
+    returns = 100 * prices['price'].pct_change().dropna()
+    added = feature_store.update(trading_pair, '1d', prices['Date'], prices['price'])
+    candle_date, features = feature_store.latest(trading_pair, '1d')
+    print(f"Features ready for {candle_date.date()} ({added} new candles stored)")
+    
+    # Stored candles carry the realized volatility earlier forecasts targeted,
+    # whichever process (this one, another worker, the trainer) wrote them
+    table = feature_store.read(trading_pair, '1d')
+    accuracy_monitor.mature(trading_pair,
+                            table['Date'].to_numpy().astype('datetime64[s]').astype(np.int64),
+                            table['realized_vol'].to_numpy())
+    featurized = time.perf_counter()
+    
+    # Make prediction, never letting the ML path stall the caller: with the
+    # deadline spent, answer from the data in hand instead of failing
+    if deadline is not None and deadline.expired:
+        print(f"Deadline spent before inference, using {FALLBACK_METHOD} estimator")
+        result = make_fallback_prediction(returns, features, trading_pair, 'deadline')
+    else:
+        try:
+            result = make_prediction(features, trading_pair)
+        except Exception as e:
+            print(f"Model unavailable ({e}), using {FALLBACK_METHOD} estimator")
+            result = make_fallback_prediction(returns, features, trading_pair, str(e))
+    finished = time.perf_counter()
+    result['latency_ms'] = {
+        'fetch': 1000 * (fetched - started),
+        'features': 1000 * (featurized - fetched),
+        'inference': 1000 * (finished - featurized),
+        'total': 1000 * (finished - started)
+    }
+    result['candle_timestamp'] = int(candle_date.timestamp())
+    result['model_version'] = model_version if result['engine'] == 'onnx' else result['engine']
+    print(f"Prediction complete: {result['volatility_level']} volatility")
+    
+    now = time.time()
+    prediction_log.log(result, now)
+    accuracy_monitor.record_prediction(trading_pair, result['candle_timestamp'],
+                                       result['predicted_volatility_5d'])
+    history.append({
+        'timestamp': now,
+        'candle_timestamp': result['candle_timestamp'],
+        'pair': trading_pair,
+        'predicted_vol': result['predicted_volatility_5d'],
+        'realized_vol': result['features']['realized_vol'],
+        'returns_squared': result['features']['returns_squared'],
+        'engine': result['engine'],
+        'model_version': result['model_version']
+    })
+    
+    return result
+
+def volatility_matrix(symbols, days: int = 30, deadline: Optional[Deadline] = None) -> Dict:
+    """
+    Realized and predicted volatility of every pair ratio of a symbol universe
+    
+    Each symbol is fetched once. Pair returns for all N * (N - 1) / 2 ratios
+    come from one matrix operation on the legs' log returns (see
+    pair_returns()), features from one column-wise pass, and every pair goes
+    through the model in a single batched call. Like run_prediction(), it
+    falls back to the EWMA estimate when the model is missing or fails, or
+    the deadline is spent before inference.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not 2 <= len(symbols) <= MAX_MATRIX_SYMBOLS:
+        raise ValueError(f"Need between 2 and {MAX_MATRIX_SYMBOLS} symbols, got {len(symbols)}")
+    
+    # N fetches, concurrently; the governor keeps them within the weight budget
+    with ThreadPoolExecutor(max_workers=min(8, len(symbols))) as pool:
+        futures = {sym: pool.submit(get_crypto_data, sym, days, deadline) for sym in symbols}
+    frames, failed = {}, {}
+    for sym, future in futures.items():
+        try:
+            frames[sym] = future.result().set_index('Date')['Open']
+        except Exception as e:
+            failed[sym] = str(e)
+    
+    symbols = [sym for sym in symbols if sym in frames]
+    if len(symbols) < 2:
+        if deadline is not None:
+            deadline.check('pair features')
+        raise ValueError(f"Not enough symbols fetched: {failed}")
+    
+    prices = pd.concat(frames, axis=1, join='inner').sort_index()[symbols]
+    if len(prices) < FEATURE_WINDOW + 2:
+        raise ValueError(f"Insufficient overlapping data: {len(prices)} points")
+    
+    i, j, returns = pair_returns(prices.to_numpy())
+    latest = features_from_returns(returns)[-1]            # (n_features, n_pairs)
+    features = np.ascontiguousarray(latest.T, dtype=np.float32)
+    pairs = [f"{symbols[a]}/{symbols[b]}" for a, b in zip(i, j)]
+    
+    predicted, fallback_reason = None, None
+    if deadline is not None and deadline.expired:
+        fallback_reason = 'deadline'
+    elif session is None:
+        fallback_reason = 'Model not initialized'
+    else:
+        try:
+            names = list(output_horizons)
+            outputs = session.run(names, {input_name: features})
+            predicted = {output_horizons[name]: value[:, 0] for name, value in zip(names, outputs)}
+        except Exception as e:
+            fallback_reason = f"Prediction failed: {str(e)}"
+    
+    if predicted is None:
+        print(f"Matrix model unavailable ({fallback_reason}), using EWMA estimator")
+        predicted = {'5d': np.sqrt(ewma_variance(returns))}
+        engine = 'ewma'
+    else:
+        engine = 'onnx'
+    main_vol = predicted['5d'] if '5d' in predicted else next(iter(predicted.values()))
+    
+    # Symmetric N x N views (diagonal: a symbol against itself)
+    n = len(symbols)
+    realized_matrix = np.zeros((n, n))
+    predicted_matrix = np.zeros((n, n))
+    realized_matrix[i, j] = realized_matrix[j, i] = features[:, 0]
+    predicted_matrix[i, j] = predicted_matrix[j, i] = main_vol
+    
+    return {
+        'symbols': symbols,
+        'failed_symbols': failed,
+        'as_of': prices.index[-1].isoformat(),
+        'engine': engine,
+        'degraded': engine != 'onnx',
+        'fallback_reason': fallback_reason,
+        'pairs': [
+            {
+                'pair': pair,
+                'realized_volatility': float(features[k, 0]),
+                'predicted_volatility_5d': float(main_vol[k]),
+                'predicted_volatility': {h: float(v[k]) for h, v in predicted.items()},
+                'volatility_level': classify_volatility(float(main_vol[k]))
+            }
+            for k, pair in enumerate(pairs)
+        ],
+        'realized_matrix': realized_matrix.tolist(),
+        'predicted_matrix': predicted_matrix.tolist(),
+        'timestamp': datetime.datetime.now().isoformat()
+    }
+
+def finite_list(values) -> list:
+    """Float array as a JSON-safe list: NaN and +-inf become None (null)"""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), values, None).tolist()
+
+def overloaded_response(e: Overloaded):
+    """503 telling the client when to retry"""
+    response = jsonify({
+        'success': False,
+        'error': str(e),
+        'message': 'Service overloaded, retry later'
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(admission.retry_after())
+    return response
+
+def admitted(view):
+    """
+    Run a route under admission control
+    
+    Requests beyond the concurrency limit and wait queue get an immediate
+    503; admitted ones find their Deadline in flask.g.deadline.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            with admission.admit() as deadline:
+                g.deadline = deadline
+                return view(*args, **kwargs)
+        except Overloaded as e:
+            print(f"Request rejected: {str(e)}")
+            return overloaded_response(e)
+    return wrapper
+
 # Flask API Routes
 @app.route('/', methods=['GET'])
 def health_check():
@@ -206,10 +530,14 @@ def health_check():
         'status': 'healthy',
         'service': 'Crypto Volatility Prediction API',
         'model_loaded': session is not None,
+        'engine': 'onnx' if session is not None else FALLBACK_METHOD,
+        'accuracy_drift': accuracy_monitor.drifting(),
+        'admission': admission.stats(),
         'timestamp': datetime.datetime.now().isoformat()
     })
 
 @app.route('/predict', methods=['POST'])
+@admitted
 def predict():
     """Main prediction endpoint"""
     try:
@@ -217,19 +545,7 @@ def predict():
         data = request.get_json() if request.is_json else {}
         days = data.get('days', 30)
         
-        print(f"Starting volatility prediction (last {days} days)")
-        
-        # Get latest crypto data
-        crypto_data, eth_data, trading_pair = get_crypto_pair_data(days)
-        print(f"Fetched data for {trading_pair}")
-        
-        # Prepare features
-        features = prepare_features(crypto_data, eth_data)
-        print(f"Features prepared")
-        
-        # Make prediction
-        result = make_prediction(features, trading_pair)
-        print(f"Prediction complete: {result['volatility_level']} volatility")
+        result = run_prediction(days, g.deadline)
         
         return jsonify({
             'success': True,
@@ -237,6 +553,9 @@ def predict():
             'message': 'Volatility prediction completed successfully'
         })
         
+    except Overloaded as e:
+        print(f"Prediction failed: {str(e)}")
+        return overloaded_response(e)
     except Exception as e:
         print(f"Prediction failed: {str(e)}")
         return jsonify({
@@ -246,24 +565,13 @@ def predict():
         }), 500
 
 @app.route('/predict', methods=['GET'])
+@admitted
 def predict_get():
     """GET endpoint for prediction (with query params)"""
     try:
         days = int(request.args.get('days', 30))
         
-        print(f"Starting volatility prediction (last {days} days)")
-        
-        # Get latest crypto data
-        crypto_data, eth_data, trading_pair = get_crypto_pair_data(days)
-        print(f"Fetched data for {trading_pair}")
-        
-        # Prepare features
-        features = prepare_features(crypto_data, eth_data)
-        print(f"Features prepared")
-        
-        # Make prediction
-        result = make_prediction(features, trading_pair)
-        print(f"Prediction complete: {result['volatility_level']} volatility")
+        result = run_prediction(days, g.deadline)
         
         return jsonify({
             'success': True,
@@ -271,6 +579,9 @@ def predict_get():
             'message': 'Volatility prediction completed successfully'
         })
         
+    except Overloaded as e:
+        print(f"Prediction failed: {str(e)}")
+        return overloaded_response(e)
     except Exception as e:
         print(f"Prediction failed: {str(e)}")
         return jsonify({
@@ -279,11 +590,442 @@ def predict_get():
             'message': 'Volatility prediction failed'
         }), 500
 
+@app.route('/volatility/matrix', methods=['GET', 'POST'])
+@admitted
+def volatility_matrix_endpoint():
+    """Pairwise volatility for a symbol universe (symbols=ETHUSDT,LINKUSDT,...)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        symbols = data.get('symbols') or request.args.get('symbols')
+        if isinstance(symbols, str):
+            symbols = [sym.strip().upper() for sym in symbols.split(',') if sym.strip()]
+        days = int(data.get('days', request.args.get('days', 30)))
+        
+        result = volatility_matrix(symbols or MATRIX_SYMBOLS, days, g.deadline)
+        
+        return jsonify({
+            'success': True,
+            'matrix': result,
+            'message': f"Volatility computed for {len(result['pairs'])} pairs"
+        })
+        
+    except Overloaded as e:
+        print(f"Volatility matrix failed: {str(e)}")
+        return overloaded_response(e)
+    except Exception as e:
+        print(f"Volatility matrix failed: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Volatility matrix failed'
+        }), 500
+
+@app.route('/ranges', methods=['POST'])
+@admitted
+def ranges():
+    """
+    Uniswap V3 tick ranges for a batch of positions
+    
+    Body: {"positions": [{"price": ..., "fee_tier": 3000, "horizon_days": 5}, ...]}
+    (or the same fields as parallel lists). Each position may carry its own
+    predicted_volatility or tick_spacing; positions without a volatility use
+    the service's current 5-day prediction.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        positions = pd.DataFrame(data.get('positions', []))
+        if positions.empty or 'price' not in positions:
+            raise ValueError("positions with a price are required")
+        
+        vol = positions.get('predicted_volatility')
+        prediction = None
+        if vol is None or vol.isna().any():
+            prediction = run_prediction(int(data.get('days', 30)), g.deadline)
+            default_vol = prediction['predicted_volatility_5d']
+            vol = default_vol if vol is None else vol.fillna(default_vol)
+        
+        # Explicit tick spacing wins, otherwise it follows from the fee tier
+        spacing = positions.get('tick_spacing', pd.Series(np.nan, index=positions.index)).copy()
+        missing = spacing.isna()
+        if missing.any():
+            if 'fee_tier' not in positions or positions.loc[missing, 'fee_tier'].isna().any():
+                raise ValueError("Each position needs a fee_tier or tick_spacing")
+            spacing[missing] = tick_spacing_for(positions.loc[missing, 'fee_tier'].to_numpy())
+        horizon = positions.get('horizon_days', pd.Series(np.nan, index=positions.index)).fillna(5)
+        
+        result = recommend_ranges(
+            positions['price'].to_numpy(),
+            np.asarray(vol, dtype=np.float64),
+            horizon.to_numpy(),
+            tick_spacing=spacing.to_numpy(),
+            width_sigmas=float(data.get('width_sigmas', DEFAULT_WIDTH_SIGMAS))
+        )
+        
+        return jsonify({
+            'success': True,
+            'ranges': {name: values.tolist() for name, values in result.items()},
+            'count': len(positions),
+            'prediction': prediction,
+            'message': f"Ranges computed for {len(positions)} positions"
+        })
+        
+    except Overloaded as e:
+        print(f"Range recommendation failed: {str(e)}")
+        return overloaded_response(e)
+    except Exception as e:
+        print(f"Range recommendation failed: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Range recommendation failed'
+        }), 500
+
+@app.route('/ranges/simulate', methods=['POST'])
+@admitted
+def simulate_ranges():
+    """
+    Expected impermanent loss and fee break-even of candidate ranges
+    
+    Body: {"positions": [{"price": ..., "price_lower": ..., "price_upper": ...,
+    "daily_fee_pct": 0.2}, ...], "horizon_days": 5, "n_paths": 10000}.
+    Ranges may be given as tick_lower / tick_upper instead of prices.
+    Positions without their own predicted_volatility use the service's
+    current 5-day prediction.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        positions = pd.DataFrame(data.get('positions', []))
+        if positions.empty or 'price' not in positions:
+            raise ValueError("positions with a price are required")
+        
+        if 'price_lower' not in positions and 'tick_lower' in positions:
+            positions['price_lower'] = tick_to_price(positions['tick_lower'].to_numpy())
+            positions['price_upper'] = tick_to_price(positions['tick_upper'].to_numpy())
+        if 'price_lower' not in positions or 'price_upper' not in positions:
+            raise ValueError("positions need price_lower/price_upper or tick_lower/tick_upper")
+        
+        vol = positions.get('predicted_volatility')
+        prediction = None
+        if vol is None or vol.isna().any():
+            prediction = run_prediction(int(data.get('days', 30)), g.deadline)
+            default_vol = prediction['predicted_volatility_5d']
+            vol = default_vol if vol is None else vol.fillna(default_vol)
+        
+        fees = positions.get('daily_fee_pct', data.get('daily_fee_pct'))
+        g.deadline.check('simulation')
+        n_paths = min(int(data.get('n_paths', 10000)), MAX_IL_PATHS)
+        
+        result = simulate_impermanent_loss(
+            positions['price'].to_numpy(),
+            positions['price_lower'].to_numpy(),
+            positions['price_upper'].to_numpy(),
+            np.asarray(vol, dtype=np.float64),
+            horizon_days=float(data.get('horizon_days', 5)),
+            daily_fee_pct=None if fees is None else np.asarray(fees, dtype=np.float64),
+            n_paths=n_paths,
+            seed=data.get('seed', 0),
+            max_workers=IL_WORKERS
+        )
+        
+        return jsonify({
+            'success': True,
+            'simulation': {name: finite_list(values) for name, values in result.items()},
+            'count': len(positions),
+            'n_paths': n_paths,
+            'prediction': prediction,
+            'message': f"Simulated {n_paths} paths for {len(positions)} positions"
+        })
+        
+    except Overloaded as e:
+        print(f"IL simulation failed: {str(e)}")
+        return overloaded_response(e)
+    except Exception as e:
+        print(f"IL simulation failed: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'IL simulation failed'
+        }), 500
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """
+    Rolling forecast accuracy per pair (format=prometheus for text exposition)
+    """
+    pair_metrics = accuracy_monitor.metrics()
+    
+    if request.args.get('format') == 'prometheus':
+        lines = []
+        for pair, values in pair_metrics.items():
+            for name, value in values.items():
+                if isinstance(value, (bool, int, float)):
+                    lines.append(f'lipo_forecast_{name}{{pair="{pair}"}} {float(value)}')
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain')
+    
+    return jsonify({
+        'success': True,
+        'metrics': pair_metrics,
+        'drift': any(values['drift'] for values in pair_metrics.values()),
+        'horizon_candles': accuracy_monitor.horizon,
+        'window': accuracy_monitor.window,
+        'timestamp': datetime.datetime.now().isoformat()
+    })
+
+@app.route('/predictions', methods=['GET'])
+def get_predictions():
+    """
+    Logged predictions from SQLite (newest first)
+    
+    Query params: pair, since / until (unix seconds), limit (default 1000),
+    bucket (seconds) to return per-bucket aggregates instead of rows
+    """
+    try:
+        since = request.args.get('since', type=float)
+        until = request.args.get('until', type=float)
+        pair = request.args.get('pair')
+        bucket = request.args.get('bucket', type=int)
+        
+        if bucket:
+            rows = prediction_log.aggregate(since, until, pair, bucket)
+        else:
+            rows = prediction_log.query(since, until, pair,
+                                        request.args.get('limit', default=1000, type=int))
+        
+        return jsonify({
+            'success': True,
+            'predictions': rows,
+            'count': len(rows),
+            'log_written': prediction_log.written,
+            'log_dropped': prediction_log.dropped
+        })
+        
+    except Exception as e:
+        print(f"Prediction log query failed: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Prediction log query failed'
+        }), 500
+
+@app.route('/export', methods=['GET'])
+def export():
+    """
+    Stream logged predictions or stored features in bulk
+    
+    Query params: kind ('predictions' or 'features'), format ('ndjson',
+    'csv' or 'arrow'), pair (required for features), since / until (unix
+    seconds). Rows are read and encoded chunk by chunk, so the response
+    is sent with chunked transfer encoding and memory stays flat however
+    long the range is.
+    """
+    try:
+        fmt = request.args.get('format', 'ndjson')
+        if fmt not in EXPORT_MIMETYPES:
+            raise ValueError(f"format must be one of {sorted(EXPORT_MIMETYPES)}")
+        
+        kind = request.args.get('kind', 'predictions')
+        records = export_records(kind, log=prediction_log, store=feature_store,
+                                 pair=request.args.get('pair'),
+                                 since=request.args.get('since', type=float),
+                                 until=request.args.get('until', type=float))
+        chunks = stream_export(records, fmt, kind)
+        
+        return Response(stream_with_context(chunks), mimetype=EXPORT_MIMETYPES[fmt])
+        
+    except Exception as e:
+        print(f"Export failed: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Export failed'
+        }), 500
+
+@app.route('/history', methods=['GET'])
+def get_history():
+    """
+    Recent predictions, oldest first
+    
+    Query params: pair, since / until (unix seconds), limit (default 100)
+    """
+    try:
+        since = request.args.get('since', type=float)
+        until = request.args.get('until', type=float)
+        limit = request.args.get('limit', default=100, type=int)
+        
+        segments = history.query(since=since, until=until,
+                                 pair=request.args.get('pair'), limit=limit)
+        records = list(iter_records(segments))
+        
+        return jsonify({
+            'success': True,
+            'history': records,
+            'count': len(records),
+            'capacity': history.capacity,
+            'stored': len(history)
+        })
+        
+    except Exception as e:
+        print(f"History query failed: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'History query failed'
+        }), 500
+
+@app.route('/predict/abi', methods=['GET'])
+def predict_abi():
+    """
+    abi.encode(uint256 volatility * 1e6, uint256 candle open time) for Chainlink Functions
+    
+    The first word is what LipoVolatilityPredictor.fulfillRequest() decodes;
+    the second is the open time (unix seconds) of the candle the features
+    come from. The body is built once per candle and days value and served
+    from memory until the next candle opens; a degraded (fallback) answer
+    is kept for ABI_FALLBACK_CACHE_SECONDS only. format=raw returns the 64 bytes instead of
+    0x-prefixed hex. Cache hits skip admission control; only a refresh
+    takes a slot, and requests waiting on it give up at their deadline.
+    """
+    try:
+        days = int(request.args.get('days', 30))
+        now = time.time()
+        
+        body, candle_timestamp, expires = abi_cache.get(days, (None, None, 0.0))
+        if body is None or now >= expires:
+            with admission.admit() as deadline:
+                if not abi_cache_lock.acquire(timeout=deadline.remaining()):
+                    raise DeadlineExceeded("Request deadline exceeded waiting for the ABI cache refresh")
+                try:
+                    # Another request may have refreshed it while this one waited
+                    body, candle_timestamp, expires = abi_cache.get(days, (None, None, 0.0))
+                    if body is None or now >= expires:
+                        result = run_prediction(days, deadline)
+                        candle_timestamp = result['candle_timestamp']
+                        body = abi_encode_uint256(
+                            scale_volatility(result['predicted_volatility_5d']), candle_timestamp
+                        )
+                        if result.get('degraded'):
+                            expires = now + ABI_FALLBACK_CACHE_SECONDS
+                        else:
+                            # A candle that is already over (exchange lagging) is retried shortly
+                            expires = max(candle_timestamp + CANDLE_SECONDS, now + 60)
+                        
+                        # Drop expired entries, then the soonest to expire beyond the size limit
+                        for key, entry in list(abi_cache.items()):
+                            if entry[2] <= now:
+                                abi_cache.pop(key, None)
+                        while len(abi_cache) >= ABI_CACHE_SIZE:
+                            abi_cache.pop(min(abi_cache, key=lambda k: abi_cache[k][2]), None)
+                        abi_cache[days] = (body, candle_timestamp, expires)
+                finally:
+                    abi_cache_lock.release()
+        max_age = int(expires - now)
+        
+        if request.args.get('format') == 'raw':
+            response = Response(body, mimetype='application/octet-stream')
+        else:
+            response = Response('0x' + body.hex(), mimetype='text/plain')
+        response.headers['Cache-Control'] = f'public, max-age={max_age}'
+        response.headers['X-Candle-Timestamp'] = str(candle_timestamp)
+        return response
+        
+    except Overloaded as e:
+        print(f"ABI prediction failed: {str(e)}")
+        return Response(f"error: {str(e)}", status=503, mimetype='text/plain',
+                        headers={'Retry-After': str(admission.retry_after())})
+    except Exception as e:
+        print(f"ABI prediction failed: {str(e)}")
+        return Response(f"error: {str(e)}", status=500, mimetype='text/plain')
+
+@app.route('/publish', methods=['GET', 'POST'])
+@admitted
+def publish():
+    """
+    Predict and decide whether the on-chain value needs an update
+    
+    Returns the ABI payload only when the 5-day volatility moved by the
+    deviation threshold or the heartbeat expired. Unless dry_run is set the
+    payload is marked pending; POST /publish/confirm records it once the
+    transaction is confirmed on chain.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        days = int(data.get('days', request.args.get('days', 30)))
+        dry_run = str(data.get('dry_run', request.args.get('dry_run', ''))).lower() in ('1', 'true')
+        
+        result = run_prediction(days, g.deadline)
+        vol = result['predicted_volatility_5d']
+        
+        if dry_run:
+            decision = publish_policy.should_publish(vol)
+        else:
+            decision = publish_policy.propose(vol)
+        print(f"Publish decision: {decision['reason']}")
+        
+        return jsonify({
+            'success': True,
+            **decision,
+            'predicted_volatility_5d': vol,
+            'trading_pair': result['trading_pair'],
+            'engine': result['engine'],
+            'deviation_threshold_bps': publish_policy.deviation_bps,
+            'heartbeat_seconds': publish_policy.heartbeat
+        })
+        
+    except Overloaded as e:
+        print(f"Publish check failed: {str(e)}")
+        return overloaded_response(e)
+    except Exception as e:
+        print(f"Publish check failed: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Publish check failed'
+        }), 500
+
+@app.route('/publish/confirm', methods=['POST'])
+def publish_confirm():
+    """
+    Record a published value once its transaction is confirmed on chain
+    
+    Expects JSON {"scaled_volatility": <uint256 stored by the contract>,
+    "timestamp": <unix seconds>}, signed by the relayer that sent the
+    transaction: header X-Signature is the hex HMAC-SHA256 of the raw body
+    with PUBLISH_CONFIRM_SECRET. Unsigned, wrongly signed or stale
+    confirmations get 401, so nobody else can move the publish baseline.
+    """
+    try:
+        data = verify_confirmation(request.get_data(), request.headers.get('X-Signature'))
+        state = publish_policy.confirm(int(data['scaled_volatility']))
+        print(f"Publish confirmed: {state['scaled_volatility']}")
+        
+        return jsonify({
+            'success': True,
+            **state
+        })
+        
+    except ConfirmationRejected as e:
+        print(f"Publish confirmation rejected: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Publish confirmation rejected'
+        }), 401
+    except Exception as e:
+        print(f"Publish confirmation failed: {str(e)}")
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'message': 'Publish confirmation failed'
+        }), 500
+
 if __name__ == '__main__':
     # Initialize model at startup
     print("Initializing crypto volatility prediction model...")
-    initialize_model()
-    print("Model initialized successfully!")
+    try:
+        initialize_model()
+        print("Model initialized successfully!")
+    except Exception as e:
+        print(f"Serving in degraded mode with the {FALLBACK_METHOD} estimator: {e}")
     
     # Run Flask app
     print("Starting Flask API server...")
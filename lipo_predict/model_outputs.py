@@ -0,0 +1,37 @@
+import re
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+# Upper bounds (percent) of the LOW / MODERATE / HIGH levels, anything above is EXTREME
+VOLATILITY_LEVELS = np.array([2.0, 5.0, 10.0])
+LEVEL_NAMES = np.array(["LOW", "MODERATE", "HIGH", "EXTREME"])
+
+# Multi-horizon models name their outputs vol_1d, vol_5d, ...
+HORIZON_OUTPUT = re.compile(r'vol_(\d+d)')
+
+def classify_volatility(vol: float) -> str:
+    """Classify volatility level"""
+    return str(LEVEL_NAMES[np.digitize(vol, VOLATILITY_LEVELS)])
+
+def volatility_levels(vol: np.ndarray) -> np.ndarray:
+    """Level name of every value of an array"""
+    return LEVEL_NAMES[np.digitize(vol, VOLATILITY_LEVELS)]
+
+def horizon_output_names(horizons: Sequence[int]) -> List[str]:
+    """
+    ONNX output names for each horizon, e.g. (1, 5) -> ['vol_1d', 'vol_5d']
+    """
+    return [f"vol_{h}d" for h in horizons]
+
+def parse_output_horizons(names: Sequence[str]) -> Dict[str, str]:
+    """Map model output names to horizons ('vol_14d' -> '14d', a single 'output' -> '5d')"""
+    horizons = {}
+    for name in names:
+        match = HORIZON_OUTPUT.fullmatch(name)
+        if match:
+            horizons[name] = match.group(1)
+    if not horizons:
+        # Single-output model trained on the 5-day target
+        horizons = {names[0]: '5d'}
+    return horizons
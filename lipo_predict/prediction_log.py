@@ -0,0 +1,264 @@
+import atexit
+import json
+import os
+import pathlib
+import queue
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Dict, Iterator, List, Optional
+
+DEFAULT_LOG_PATH = os.environ.get(
+    'PREDICTION_LOG_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'predictions.db')
+)
+
+# Rows per transaction, longest a row waits before being written, and
+# rows buffered before new ones are dropped rather than blocking requests
+LOG_BATCH_SIZE = 200
+LOG_FLUSH_SECONDS = 1.0
+LOG_QUEUE_SIZE = 10000
+
+# Column order of the predictions table
+LOG_COLUMNS = [
+    'timestamp', 'candle_timestamp', 'pair', 'predicted_vol', 'predicted_json',
+    'realized_vol', 'returns_squared', 'volatility_level', 'engine',
+    'model_version', 'degraded', 'fetch_ms', 'features_ms', 'inference_ms', 'total_ms',
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY,
+    timestamp REAL NOT NULL,
+    candle_timestamp INTEGER,
+    pair TEXT NOT NULL,
+    predicted_vol REAL,
+    predicted_json TEXT,
+    realized_vol REAL,
+    returns_squared REAL,
+    volatility_level TEXT,
+    engine TEXT,
+    model_version TEXT,
+    degraded INTEGER,
+    fetch_ms REAL,
+    features_ms REAL,
+    inference_ms REAL,
+    total_ms REAL
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_timestamp ON predictions (timestamp);
+CREATE INDEX IF NOT EXISTS idx_predictions_pair_timestamp ON predictions (pair, timestamp);
+"""
+
+def prediction_row(result: Dict, timestamp: float) -> tuple:
+    """Table row (LOG_COLUMNS order) of a make_prediction() result"""
+    latency = result.get('latency_ms', {})
+    features = result.get('features', {})
+    return (
+        timestamp,
+        result.get('candle_timestamp'),
+        result.get('trading_pair'),
+        result.get('predicted_volatility_5d'),
+        json.dumps(result.get('predicted_volatility', {})),
+        features.get('realized_vol'),
+        features.get('returns_squared'),
+        result.get('volatility_level'),
+        result.get('engine'),
+        result.get('model_version'),
+        int(bool(result.get('degraded', False))),
+        latency.get('fetch'),
+        latency.get('features'),
+        latency.get('inference'),
+        latency.get('total'),
+    )
+
+def _where(since: Optional[float], until: Optional[float], pair: Optional[str]):
+    """WHERE clause and parameters for an indexed time/pair range"""
+    clauses, params = [], []
+    if pair is not None:
+        clauses.append('pair = ?')
+        params.append(pair)
+    if since is not None:
+        clauses.append('timestamp >= ?')
+        params.append(since)
+    if until is not None:
+        clauses.append('timestamp < ?')
+        params.append(until)
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+class PredictionLogReader:
+    """
+    Read-only access to a prediction log database
+
+    Every query opens its own read-only connection, so readers never start
+    a writer thread, change the journal mode or block the service writing
+    the log. PredictionLog adds the writing side.
+    """
+
+    def __init__(self, path: str = DEFAULT_LOG_PATH):
+        """
+        Args:
+            path: SQLite database file (must exist)
+        """
+        if not os.path.exists(path):
+            raise ValueError(f"No prediction log at {path}")
+        self.path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        uri = pathlib.Path(os.path.abspath(self.path)).as_uri() + '?mode=ro'
+        conn = sqlite3.connect(uri, uri=True, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              pair: Optional[str] = None, limit: Optional[int] = 1000) -> List[Dict]:
+        """
+        Predictions in a time range (newest first), served by the indexes
+        """
+        where, params = _where(since, until, pair)
+        sql = f"SELECT * FROM predictions{where} ORDER BY timestamp DESC"
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(int(limit))
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, params)]
+
+    def iter_rows(self, since: Optional[float] = None, until: Optional[float] = None,
+                  pair: Optional[str] = None, chunk_size: int = 1000) -> Iterator[Dict]:
+        """
+        Stream predictions oldest first, chunk_size rows in memory at a time
+        """
+        where, params = _where(since, until, pair)
+        conn = self._connect()
+        try:
+            cursor = conn.execute(f"SELECT * FROM predictions{where} ORDER BY timestamp", params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+        finally:
+            conn.close()
+
+    def aggregate(self, since: Optional[float] = None, until: Optional[float] = None,
+                  pair: Optional[str] = None, bucket_seconds: int = 86400) -> List[Dict]:
+        """
+        Per pair and time bucket: count, forecast mean/min/max, fallback
+        count and mean latencies
+        """
+        where, params = _where(since, until, pair)
+        sql = f"""
+            SELECT pair,
+                   CAST(timestamp / ? AS INTEGER) * ? AS bucket,
+                   COUNT(*) AS predictions,
+                   AVG(predicted_vol) AS mean_vol,
+                   MIN(predicted_vol) AS min_vol,
+                   MAX(predicted_vol) AS max_vol,
+                   SUM(degraded) AS degraded,
+                   AVG(fetch_ms) AS mean_fetch_ms,
+                   AVG(inference_ms) AS mean_inference_ms,
+                   AVG(total_ms) AS mean_total_ms,
+                   MAX(total_ms) AS max_total_ms
+            FROM predictions{where}
+            GROUP BY pair, bucket
+            ORDER BY pair, bucket
+        """
+        with closing(self._connect()) as conn:
+            return [dict(row) for row in conn.execute(sql, [bucket_seconds, bucket_seconds] + params)]
+
+class PredictionLog(PredictionLogReader):
+    """
+    SQLite log of every prediction, written off the request path
+
+    log() only enqueues a row. A background thread drains the queue and
+    inserts rows in batches of up to batch_size per transaction, at least
+    every flush_seconds. If the queue is full the row is dropped and
+    counted, so a slow disk never stalls a request. The database runs in
+    WAL mode, so readers (each with its own connection) don't block the
+    writer.
+    """
+
+    def __init__(self, path: str = DEFAULT_LOG_PATH,
+                 batch_size: int = LOG_BATCH_SIZE,
+                 flush_seconds: float = LOG_FLUSH_SECONDS,
+                 queue_size: int = LOG_QUEUE_SIZE):
+        """
+        Args:
+            path: SQLite database file
+            batch_size: Rows per insert transaction
+            flush_seconds: Longest a queued row waits
+            queue_size: Rows buffered before dropping
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.dropped = 0
+        self.written = 0
+        self._counts_lock = threading.Lock()   # counters change on request and writer threads
+        self._queue = queue.Queue(maxsize=queue_size)
+
+        with closing(self._connect()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, name='prediction-log', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def log(self, result: Dict, timestamp: float):
+        """Queue a make_prediction() result for writing (never blocks)"""
+        try:
+            self._queue.put_nowait(prediction_row(result, timestamp))
+        except queue.Full:
+            self._count(dropped=1)
+
+    def _count(self, written: int = 0, dropped: int = 0):
+        with self._counts_lock:
+            self.written += written
+            self.dropped += dropped
+
+    def _write_loop(self):
+        conn = self._connect()
+        insert = (f"INSERT INTO predictions ({', '.join(LOG_COLUMNS)}) "
+                  f"VALUES ({', '.join('?' * len(LOG_COLUMNS))})")
+        running = True
+        while running:
+            try:
+                batch = [self._queue.get(timeout=self.flush_seconds)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            # None is the shutdown marker from close()
+            running = None not in batch
+            rows = [row for row in batch if row is not None]
+            if rows:
+                try:
+                    with conn:
+                        conn.executemany(insert, rows)
+                    self._count(written=len(rows))
+                except sqlite3.Error as e:
+                    self._count(dropped=len(rows))
+                    print(f"Prediction log write failed: {e}")
+            for _ in batch:
+                self._queue.task_done()
+        conn.close()
+
+    def flush(self):
+        """Block until every queued row is written"""
+        self._queue.join()
+
+    def close(self):
+        """Write what is queued and stop the writer"""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout=10)
@@ -0,0 +1,214 @@
+import hashlib
+import hmac
+import json
+import os
+import time
+from typing import Dict, Optional
+
+from state_file import update_json_state
+
+# LipoVolatilityPredictor stores predictedVolatility as floor(vol * 1e6)
+VOLATILITY_SCALE = 1_000_000
+
+# Publish when the scaled value moved by at least this much (basis points)
+DEFAULT_DEVIATION_BPS = float(os.environ.get('PUBLISH_DEVIATION_BPS', 500))
+
+# Publish at least this often even without movement. isDataFresh() and
+# shouldRebalancePosition() treat data older than 3600s as stale, so the
+# default leaves room for the Functions round trip before that happens.
+DEFAULT_HEARTBEAT_SECONDS = float(os.environ.get('PUBLISH_HEARTBEAT_SECONDS', 3300))
+
+# How long a proposed update holds off further proposals while it waits
+# for on-chain confirmation; after that it is assumed lost and re-proposed
+DEFAULT_PENDING_SECONDS = float(os.environ.get('PUBLISH_PENDING_SECONDS', 300))
+
+# Shared secret the relayer signs confirmations with (HMAC-SHA256 of the
+# request body); confirmations are refused while it is unset
+CONFIRM_SECRET = os.environ.get('PUBLISH_CONFIRM_SECRET', '')
+
+# Signed confirmations older (or further in the future) than this are
+# refused, so a captured request cannot be replayed later
+CONFIRM_MAX_AGE_SECONDS = 300
+
+DEFAULT_STATE_PATH = os.environ.get(
+    'PUBLISH_STATE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'publish_state.json')
+)
+
+def scale_volatility(vol: float) -> int:
+    """Volatility (percent) as the contract's uint256, like checkVolatility's Math.floor(vol * 1e6)"""
+    return int(max(vol, 0.0) * VOLATILITY_SCALE)
+
+def abi_encode_uint256(*values: int) -> bytes:
+    """abi.encode() of uint256 values: 32-byte big-endian words"""
+    out = b''
+    for value in values:
+        if value < 0 or value >= 2 ** 256:
+            raise ValueError(f"Value out of uint256 range: {value}")
+        out += int(value).to_bytes(32, 'big')
+    return out
+
+class ConfirmationRejected(Exception):
+    """Raised for a confirmation that is unsigned, wrongly signed or stale"""
+
+def sign_confirmation(body: bytes, secret: str) -> str:
+    """Hex HMAC-SHA256 of a confirmation body, sent as X-Signature"""
+    return hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+def verify_confirmation(body: bytes, signature: Optional[str],
+                        secret: Optional[str] = None,
+                        now: Optional[float] = None) -> Dict:
+    """
+    Check a signed confirmation and return its JSON payload
+
+    The body must be JSON with scaled_volatility and timestamp (unix
+    seconds, within CONFIRM_MAX_AGE_SECONDS of now), signed with the
+    shared secret (default CONFIRM_SECRET).
+
+    Raises:
+        ConfirmationRejected: No secret configured, bad signature or stale timestamp
+    """
+    secret = CONFIRM_SECRET if secret is None else secret
+    if not secret:
+        raise ConfirmationRejected("Publish confirmation is disabled (PUBLISH_CONFIRM_SECRET is unset)")
+    if not signature or not hmac.compare_digest(sign_confirmation(body, secret), signature):
+        raise ConfirmationRejected("Invalid confirmation signature")
+
+    data = json.loads(body)
+    now = time.time() if now is None else now
+    if abs(now - float(data.get('timestamp', 0))) > CONFIRM_MAX_AGE_SECONDS:
+        raise ConfirmationRejected("Confirmation timestamp is stale")
+    if 'scaled_volatility' not in data:
+        raise ValueError("scaled_volatility is required")
+    return data
+
+class PublishPolicy:
+    """
+    Deviation-and-heartbeat policy for on-chain volatility updates
+
+    A new value is worth publishing when it differs from the last published
+    one by at least deviation_bps, or when the last publish is older than
+    heartbeat seconds. Publishing is two-step: propose() hands out the
+    payload and marks it pending, and confirm() records it as published
+    once the transaction landed, so a failed transaction never counts as
+    the last on-chain value. State lives in a JSON file under an exclusive
+    flock, so all service workers share one view.
+    """
+
+    def __init__(self, deviation_bps: float = DEFAULT_DEVIATION_BPS,
+                 heartbeat: float = DEFAULT_HEARTBEAT_SECONDS,
+                 state_path: str = DEFAULT_STATE_PATH,
+                 pending_seconds: float = DEFAULT_PENDING_SECONDS):
+        """
+        Args:
+            deviation_bps: Relative change that triggers a publish (100 = 1%)
+            heartbeat: Longest time between publishes, in seconds
+            state_path: State file shared by all processes
+            pending_seconds: Longest wait for confirm() of a proposal
+        """
+        self.deviation_bps = deviation_bps
+        self.heartbeat = heartbeat
+        self.state_path = state_path
+        self.pending_seconds = pending_seconds
+
+    def last_published(self) -> Dict:
+        """Last published state ({} before the first publish)"""
+        return update_json_state(self.state_path, lambda state: dict(state))
+
+    def _decide(self, state: Dict, scaled: int, now: float) -> Dict:
+        last = state.get('scaled_volatility')
+        if last is None:
+            return {'publish': True, 'reason': 'initial', 'scaled_volatility': scaled,
+                    'deviation_bps': None, 'seconds_since_publish': None}
+
+        age = now - state['published_at']
+        if last > 0:
+            deviation = abs(scaled - last) / last * 10000
+            moved = deviation >= self.deviation_bps
+        else:
+            # No relative change from zero; any move away from it counts
+            deviation = None if scaled != last else 0.0
+            moved = scaled != last
+
+        if moved:
+            reason = 'deviation'
+        elif age >= self.heartbeat:
+            reason = 'heartbeat'
+        else:
+            reason = 'within_threshold'
+
+        return {'publish': reason != 'within_threshold', 'reason': reason,
+                'scaled_volatility': scaled, 'deviation_bps': deviation,
+                'seconds_since_publish': age}
+
+    def should_publish(self, vol: float, now: Optional[float] = None) -> Dict:
+        """
+        Decide whether vol needs to go on chain, without recording anything
+
+        Returns:
+            Dict with publish (bool), reason ('initial', 'deviation',
+            'heartbeat' or 'within_threshold'), scaled_volatility,
+            deviation_bps (None when undefined) and seconds_since_publish
+        """
+        now = time.time() if now is None else now
+        scaled = scale_volatility(vol)
+        return update_json_state(self.state_path, lambda state: self._decide(state, scaled, now))
+
+    def propose(self, vol: float, now: Optional[float] = None) -> Dict:
+        """
+        Decide, and when publishing mark vol as pending confirmation
+
+        Decision and mark happen under one lock, and a pending proposal holds
+        off further ones (reason 'pending') until it is confirmed or
+        pending_seconds passed, so concurrent callers produce at most one
+        transaction for the same movement.
+
+        Returns:
+            should_publish() result, plus payload (hex abi.encode(uint256))
+            when publish is True
+        """
+        now = time.time() if now is None else now
+        scaled = scale_volatility(vol)
+
+        def update(state):
+            decision = self._decide(state, scaled, now)
+            pending = state.get('pending')
+            if decision['publish'] and pending and now - pending['proposed_at'] < self.pending_seconds:
+                decision.update({'publish': False, 'reason': 'pending',
+                                 'pending_scaled_volatility': pending['scaled_volatility']})
+            if decision['publish']:
+                state['pending'] = {'volatility': vol, 'scaled_volatility': scaled,
+                                    'proposed_at': now}
+                decision['payload'] = '0x' + abi_encode_uint256(scaled).hex()
+            return decision
+
+        return update_json_state(self.state_path, update)
+
+    def confirm(self, scaled: int, now: Optional[float] = None) -> Dict:
+        """
+        Record a value as published once its transaction is confirmed
+
+        Args:
+            scaled: The uint256 value now stored on chain
+            now: Confirmation time (default: now)
+
+        Returns:
+            The recorded state
+        """
+        now = time.time() if now is None else now
+        scaled = int(scaled)
+        if scaled < 0:
+            raise ValueError(f"Invalid scaled volatility: {scaled}")
+
+        def update(state):
+            # The chain value is known now, whichever proposal it came from
+            pending = state.pop('pending', None)
+            if pending and pending['scaled_volatility'] == scaled:
+                vol = pending['volatility']
+            else:
+                vol = scaled / VOLATILITY_SCALE
+            state.update({'volatility': vol, 'scaled_volatility': scaled,
+                          'published_at': now})
+            return dict(state)
+
+        return update_json_state(self.state_path, update)
@@ -0,0 +1,113 @@
+import numpy as np
+from typing import Dict
+
+# Uniswap V3 tick bounds (TickMath.MIN_TICK / MAX_TICK) and price step per tick
+MIN_TICK = -887272
+MAX_TICK = 887272
+TICK_BASE = 1.0001
+
+# Tick spacing of the standard fee tiers (fee in hundredths of a bip)
+FEE_TIER_TICK_SPACING = {
+    100: 1,
+    500: 10,
+    3000: 60,
+    10000: 200,
+}
+
+# Range half-width in standard deviations of the horizon's log-price move
+DEFAULT_WIDTH_SIGMAS = 2.0
+
+def price_to_tick(price) -> np.ndarray:
+    """Fractional tick of a pool price (token1 per token0, raw units)"""
+    return np.log(np.asarray(price, dtype=np.float64)) / np.log(TICK_BASE)
+
+def tick_to_price(tick) -> np.ndarray:
+    """Pool price at a tick"""
+    return TICK_BASE ** np.asarray(tick, dtype=np.float64)
+
+def tick_spacing_for(fee_tier) -> np.ndarray:
+    """
+    Tick spacing of each fee tier, vectorised over an array of tiers
+    """
+    fee_tier = np.asarray(fee_tier, dtype=np.int64)
+    tiers = np.array(sorted(FEE_TIER_TICK_SPACING))
+    spacings = np.array([FEE_TIER_TICK_SPACING[t] for t in tiers])
+
+    idx = np.clip(np.searchsorted(tiers, fee_tier), 0, len(tiers) - 1)
+    unknown = tiers[idx] != fee_tier
+    if unknown.any():
+        raise ValueError(f"Unknown fee tier(s): {sorted(set(fee_tier[unknown].tolist()))}")
+    return spacings[idx]
+
+def recommend_ranges(price, predicted_vol, horizon_days=5,
+                     fee_tier=None, tick_spacing=None,
+                     width_sigmas=DEFAULT_WIDTH_SIGMAS) -> Dict[str, np.ndarray]:
+    """
+    Recommended [tick_lower, tick_upper) for a batch of positions in one pass
+
+    predicted_vol is the model's daily volatility in percent (as in
+    predicted_volatility_5d), so the log-price standard deviation over the
+    horizon is vol / 100 * sqrt(horizon_days). The range covers
+    width_sigmas of it on each side of the current price, widened outwards
+    to the pool's tick spacing and clamped to the usable tick bounds. Every
+    argument may be a scalar or an array of one value per position.
+
+    Args:
+        price: Current pool price (token1 per token0, raw units)
+        predicted_vol: Daily volatility forecast in percent
+        horizon_days: Days the position should stay in range
+        fee_tier: Pool fee (100, 500, 3000, 10000); used when tick_spacing is None
+        tick_spacing: Pool tick spacing, overrides fee_tier
+        width_sigmas: Half-width of the range in standard deviations
+
+    Returns:
+        Dict of arrays: tick_lower, tick_upper, current_tick, tick_spacing,
+        price_lower, price_upper, sigma (horizon log-price std) and
+        width_pct (range width relative to the current price)
+    """
+    if tick_spacing is None:
+        if fee_tier is None:
+            raise ValueError("Either fee_tier or tick_spacing is required")
+        tick_spacing = tick_spacing_for(fee_tier)
+
+    price, vol, horizon, spacing, k = np.broadcast_arrays(
+        np.asarray(price, dtype=np.float64),
+        np.asarray(predicted_vol, dtype=np.float64),
+        np.asarray(horizon_days, dtype=np.float64),
+        np.asarray(tick_spacing, dtype=np.int64),
+        np.asarray(width_sigmas, dtype=np.float64),
+    )
+    if (price <= 0).any():
+        raise ValueError("Prices must be positive")
+    if (spacing <= 0).any():
+        raise ValueError("Tick spacing must be positive")
+
+    sigma = np.maximum(vol, 0.0) / 100 * np.sqrt(np.maximum(horizon, 0.0))
+    current = price_to_tick(price)
+    half_width = k * sigma / np.log(TICK_BASE)
+
+    # Widen outwards to the spacing grid, at least one spacing on each side
+    lower = np.floor((current - half_width) / spacing) * spacing
+    upper = np.ceil((current + half_width) / spacing) * spacing
+    aligned_current = np.floor(current / spacing) * spacing
+    lower = np.minimum(lower, aligned_current)
+    upper = np.maximum(upper, aligned_current + spacing)
+
+    # Usable bounds are the extreme ticks that are multiples of the spacing
+    min_usable = -(-MIN_TICK // spacing) * spacing
+    max_usable = (MAX_TICK // spacing) * spacing
+    lower = np.clip(lower, min_usable, max_usable - spacing).astype(np.int64)
+    upper = np.clip(upper, lower + spacing, max_usable).astype(np.int64)
+
+    price_lower = tick_to_price(lower)
+    price_upper = tick_to_price(upper)
+    return {
+        'tick_lower': lower,
+        'tick_upper': upper,
+        'current_tick': np.floor(current).astype(np.int64),
+        'tick_spacing': spacing,
+        'price_lower': price_lower,
+        'price_upper': price_upper,
+        'sigma': sigma,
+        'width_pct': 100 * (price_upper - price_lower) / price,
+    }
@@ -0,0 +1,157 @@
+import os
+import tempfile
+import time
+from typing import Dict
+
+import requests
+
+from state_file import update_json_state
+
+# Binance request weight of one /api/v3/klines call
+KLINES_WEIGHT = 2
+
+# Priorities: serving may use the whole budget, training only its share of it
+SERVING = "serving"
+TRAINING = "training"
+
+# Request weight per minute all processes on this host allow themselves.
+# Binance bans the whole IP above 6000/min, so keep some headroom.
+DEFAULT_WEIGHT_BUDGET = int(os.environ.get('BINANCE_WEIGHT_BUDGET', 4800))
+DEFAULT_TRAINING_SHARE = float(os.environ.get('BINANCE_TRAINING_SHARE', 0.5))
+DEFAULT_STATE_PATH = os.environ.get(
+    'BINANCE_GOVERNOR_STATE',
+    os.path.join(tempfile.gettempdir(), 'lipo_binance_weight.json')
+)
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot get weight within its allowed wait"""
+
+class BinanceRateGovernor:
+    """
+    Host-wide Binance request-weight governor
+
+    Weight used in the current minute and any ban deadline live in a small
+    JSON file guarded by an exclusive flock, so every process and thread on
+    the host (Flask workers, trainer, predictor) draws from one budget.
+    Binance counts weight per calendar minute; the count is re-synced from
+    the X-MBX-USED-WEIGHT-1M header after every response, and a 429/418
+    blocks everybody until Retry-After has passed.
+
+    Serving callers may spend the whole budget. Training callers stop at
+    training_share of it, which keeps the rest free for serving traffic.
+    """
+
+    def __init__(self, priority: str = SERVING,
+                 weight_budget: int = DEFAULT_WEIGHT_BUDGET,
+                 training_share: float = DEFAULT_TRAINING_SHARE,
+                 state_path: str = DEFAULT_STATE_PATH,
+                 max_wait: float = None):
+        """
+        Args:
+            priority: SERVING or TRAINING
+            weight_budget: Request weight per minute shared by the host
+            training_share: Fraction of the budget training may use
+            state_path: Lock/state file shared by all processes
+            max_wait: Longest acquire() may block before raising
+                      RateLimitExceeded (default: 5s serving, unbounded training)
+        """
+        if priority not in (SERVING, TRAINING):
+            raise ValueError(f"Unknown priority: {priority}")
+
+        self.priority = priority
+        self.weight_budget = weight_budget
+        self.training_share = training_share
+        self.state_path = state_path
+        if max_wait is None:
+            max_wait = 5.0 if priority == SERVING else float('inf')
+        self.max_wait = max_wait
+
+    @property
+    def limit(self) -> int:
+        """Weight per minute this governor's callers may use"""
+        if self.priority == SERVING:
+            return self.weight_budget
+        return int(self.weight_budget * self.training_share)
+
+    def _update_state(self, update) -> Dict:
+        """
+        Apply update(state, now) under the host-wide lock and persist it
+        """
+        def locked(state):
+            now = time.time()
+            minute = int(now // 60)
+            if state.get('minute') != minute:
+                state['minute'] = minute
+                state['used'] = 0
+            state.setdefault('banned_until', 0.0)
+            return update(state, now)
+
+        return update_json_state(self.state_path, locked)
+
+    def acquire(self, weight: int = KLINES_WEIGHT, max_wait: float = None):
+        """
+        Block until weight can be spent within this governor's limit
+
+        Args:
+            weight: Request weight to spend
+            max_wait: Longest wait for this call (default self.max_wait; never more)
+        """
+        limit = self.limit
+        max_wait = self.max_wait if max_wait is None else min(max_wait, self.max_wait)
+
+        def reserve(state, now):
+            if now < state['banned_until']:
+                return state['banned_until'] - now
+            if state['used'] + weight <= limit:
+                state['used'] += weight
+                return 0.0
+            # Budget exhausted until the next minute starts
+            return (state['minute'] + 1) * 60 - now
+
+        waited = 0.0
+        while True:
+            wait = self._update_state(reserve)
+            if wait <= 0:
+                return
+            if waited + wait > max_wait:
+                raise RateLimitExceeded(
+                    f"Binance weight budget exhausted ({self.priority}), "
+                    f"retry in {wait:.1f}s"
+                )
+            time.sleep(wait)
+            waited += wait
+
+    def observe(self, response: requests.Response):
+        """Sync the shared state with the weight headers of a response"""
+        used = response.headers.get('X-MBX-USED-WEIGHT-1M')
+        retry_after = None
+        if response.status_code in (418, 429):
+            retry_after = int(response.headers.get('Retry-After', 60))
+            print(f"Rate limited by Binance ({response.status_code}), pausing {retry_after}s")
+
+        def sync(state, now):
+            if used is not None:
+                state['used'] = max(state['used'], int(used))
+            if retry_after is not None:
+                state['banned_until'] = max(state['banned_until'], now + retry_after)
+
+        self._update_state(sync)
+
+    def get(self, url: str, params: Dict = None, timeout: float = 10,
+            weight: int = KLINES_WEIGHT, max_wait: float = None,
+            stream: bool = False) -> requests.Response:
+        """requests.get() that spends and reports weight through the governor"""
+        self.acquire(weight, max_wait)
+        return self.request(url, params=params, timeout=timeout, stream=stream)
+
+    def request(self, url: str, params: Dict = None, timeout: float = 10,
+                stream: bool = False) -> requests.Response:
+        """
+        requests.get() for weight already acquired, reported through the governor
+
+        Lets a caller with a time budget acquire() first and size the HTTP
+        timeout by what is left after the wait.
+        """
+        response = requests.get(url, params=params, timeout=timeout, stream=stream)
+        self.observe(response)
+        return response
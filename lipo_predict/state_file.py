@@ -0,0 +1,38 @@
+import fcntl
+import json
+from typing import Any, Callable, Dict
+
+def update_json_state(path: str, update: Callable[[Dict], Any]) -> Any:
+    """
+    Apply update(state) to a JSON state file under an exclusive flock
+
+    The file is read, passed to update() as a dict (empty when missing or
+    unreadable), and written back before the lock is released, so every
+    thread and process sharing the path sees one consistent state.
+
+    Args:
+        path: State file, created when missing
+        update: Function that may modify state in place
+
+    Returns:
+        Whatever update() returns
+    """
+    with open(path, 'a+') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0)
+            raw = f.read()
+            try:
+                state = json.loads(raw) if raw else {}
+            except ValueError:
+                state = {}
+
+            result = update(state)
+
+            f.seek(0)
+            f.truncate()
+            json.dump(state, f)
+            f.flush()
+            return result
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
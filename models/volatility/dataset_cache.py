@@ -0,0 +1,133 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from feature_store import FEATURE_COLUMNS, compute_features, features_by_segment, rolling_std
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "DATASET_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset_cache")
+)
+
+def feature_spec(*code_from: Callable, **params) -> Dict:
+    """
+    Everything besides the raw candles that decides the processed arrays
+
+    The source of the feature functions is part of the spec, so editing the
+    feature definition invalidates old entries without a manual version bump.
+
+    Args:
+        code_from: Further functions whose source decides the arrays (the
+                   build and split functions passed to cached_dataset())
+        params: Parameters those functions are called with
+    """
+    functions = (compute_features, features_by_segment, rolling_std) + code_from
+    code = "".join(inspect.getsource(f) for f in functions)
+    return {
+        "features": FEATURE_COLUMNS,
+        "feature_code": hashlib.sha256(code.encode()).hexdigest(),
+        **params,
+    }
+
+def dataset_key(candles: Dict[str, pd.DataFrame], spec: Dict,
+                columns: Tuple[str, ...] = ("Date", "Open")) -> str:
+    """
+    Content hash of the input tables and the processing spec
+
+    The tables must be what build() actually reads (the raw candles, or
+    the feature store table when training from the store), or the key says
+    nothing about the arrays it names.
+
+    Args:
+        candles: Name -> DataFrame (e.g. {'LINKUSDT': link, 'ETHUSDT': eth})
+        spec: Feature and split parameters, see feature_spec()
+        columns: Columns the dataset is built from
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps(spec, sort_keys=True, default=str).encode())
+    for name in sorted(candles):
+        df = candles[name]
+        digest.update(name.encode())
+        for column in columns:
+            values = df[column]
+            if column == "Date":
+                values = pd.to_datetime(values).astype("int64")
+            digest.update(np.ascontiguousarray(values.to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()[:32]
+
+def _entry_path(cache_dir: str, key: str) -> str:
+    return os.path.join(cache_dir, f"{key}.npz")
+
+def load_dataset(key: str, cache_dir: str = DEFAULT_CACHE_DIR) -> Optional[Dict[str, np.ndarray]]:
+    """
+    Cached arrays for a key (X, Y, dates, cut), or None on a miss
+    """
+    path = _entry_path(cache_dir, key)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as entry:
+        return {name: entry[name] for name in entry.files}
+
+def save_dataset(key: str, arrays: Dict[str, np.ndarray], spec: Dict,
+                 cache_dir: str = DEFAULT_CACHE_DIR):
+    """
+    Store a processed dataset and a readable description of how it was built
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = _entry_path(cache_dir, key)
+
+    # Write under a temporary name so readers never see a partial entry
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+    meta = {
+        "key": key,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "spec": spec,
+        "shapes": {name: list(np.shape(a)) for name, a in arrays.items()},
+    }
+    with open(os.path.join(cache_dir, f"{key}.json"), "w") as f:
+        json.dump(meta, f, indent=2, default=str)
+
+def cached_dataset(candles: Dict[str, pd.DataFrame], build: Callable,
+                   split: Callable, spec: Dict,
+                   cache_dir: Optional[str] = DEFAULT_CACHE_DIR,
+                   columns: Tuple[str, ...] = ("Date", "Open")):
+    """
+    Processed train/test arrays, built only when the inputs changed
+
+    Args:
+        candles: DataFrames build() reads, see dataset_key()
+        build: No-argument function returning (X, Y, dates) from exactly
+               those DataFrames
+        split: Function (X, Y, dates) -> (X_train, X_test, Y_train, Y_test)
+               returning views, as split_multi_pair_dataset() does
+        spec: Feature and split parameters, see feature_spec()
+        cache_dir: Cache directory, None to always build
+        columns: Columns of candles that are hashed
+
+    Returns:
+        X_train, X_test, Y_train, Y_test, key
+    """
+    key = dataset_key(candles, spec, columns)
+    entry = load_dataset(key, cache_dir) if cache_dir else None
+
+    if entry is not None:
+        print(f"Dataset cache hit ({key})")
+        X, Y, cut = entry["X"], entry["Y"], int(entry["cut"])
+        return X[:cut], X[cut:], Y[:cut], Y[cut:], key
+
+    print(f"Dataset cache miss ({key}), processing...")
+    X, Y, dates = build()
+    X_train, X_test, Y_train, Y_test = split(X, Y, dates)
+    if cache_dir:
+        save_dataset(key, {"X": X, "Y": Y, "dates": dates, "cut": np.int64(len(X_train))},
+                     spec, cache_dir)
+    return X_train, X_test, Y_train, Y_test, key
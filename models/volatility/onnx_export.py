@@ -0,0 +1,185 @@
+import os
+import shutil
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import onnx
+import onnxruntime as ort
+import pandas as pd
+import torch
+import torch.nn as nn
+from onnxruntime.quantization import QuantType, quantize_dynamic
+
+DEFAULT_OPSET = 17
+
+# onnxruntime 1.17 pinned by lipo_predict reads IR versions up to 9
+MAX_IR_VERSION = 9
+
+# Largest allowed |onnx - torch| on the test set, in volatility percentage points
+PARITY_TOLERANCE = {
+    "fp32": 1e-4,
+    "optimized": 1e-4,
+    "int8": 0.1,
+}
+
+def export_fp32(model: nn.Module, sample_input: torch.Tensor, onnx_file_path: str,
+                opset_version: int = DEFAULT_OPSET,
+                output_names: Sequence[str] = ("output",)):
+    """
+    Export a model to a single self-contained fp32 ONNX file with a dynamic batch axis
+    """
+    model.eval()
+    dynamic_axes = {"input": {0: "batch_size"}}
+    dynamic_axes.update({name: {0: "batch_size"} for name in output_names})
+
+    torch.onnx.export(
+        model,
+        sample_input,
+        onnx_file_path,
+        export_params=True,
+        opset_version=opset_version,
+        do_constant_folding=True,
+        input_names=["input"],
+        output_names=list(output_names),
+        dynamic_axes=dynamic_axes,
+    )
+
+    # Some exporters write weights to a side file, annotate shapes that later
+    # rewrites (quantization) disagree with, and stamp an IR version newer
+    # than the serving runtime reads. Save one plain file the server can load.
+    exported = onnx.load(onnx_file_path)
+    del exported.graph.value_info[:]
+    exported.ir_version = min(exported.ir_version, MAX_IR_VERSION)
+    onnx.save_model(exported, onnx_file_path, save_as_external_data=False)
+    data_path = onnx_file_path + ".data"
+    if os.path.exists(data_path):
+        os.remove(data_path)
+
+def optimize_onnx(src_path: str, dst_path: str):
+    """
+    Save onnxruntime's fused/constant-folded graph
+
+    EXTENDED rather than ALL keeps the saved graph free of layout
+    transformations specific to this machine's CPU.
+    """
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED
+    options.optimized_model_filepath = dst_path
+    ort.InferenceSession(src_path, options, providers=["CPUExecutionProvider"])
+
+def quantize_int8(src_path: str, dst_path: str):
+    """
+    Dynamic int8 quantization of the weights (activations quantized at run time)
+    """
+    quantize_dynamic(src_path, dst_path, weight_type=QuantType.QInt8)
+
+def _run_all(session: ort.InferenceSession, X: np.ndarray) -> np.ndarray:
+    """All outputs of a session side by side as one (batch, n_outputs) array"""
+    input_name = session.get_inputs()[0].name
+    return np.hstack(session.run(None, {input_name: X}))
+
+def benchmark_latency(session: ort.InferenceSession, X: np.ndarray,
+                      batch_sizes: Sequence[int] = (1, 64, 4096),
+                      repeats: int = 50) -> Dict[int, float]:
+    """
+    Median per-call latency in milliseconds for each batch size
+    """
+    input_name = session.get_inputs()[0].name
+    latencies = {}
+    for batch_size in batch_sizes:
+        batch = np.ascontiguousarray(np.resize(X, (batch_size, X.shape[1])), dtype=np.float32)
+        for _ in range(5):
+            session.run(None, {input_name: batch})
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            session.run(None, {input_name: batch})
+            timings.append(time.perf_counter() - start)
+        latencies[batch_size] = 1000 * float(np.median(timings))
+    return latencies
+
+def export_onnx_variants(model: nn.Module, X_test, save_path: str = "crypto_vol_model",
+                         opset_version: int = DEFAULT_OPSET,
+                         output_names: Sequence[str] = ("output",),
+                         batch_sizes: Sequence[int] = (1, 64, 4096),
+                         select_batch_size: int = 1,
+                         tolerance: Optional[Dict[str, float]] = None,
+                         report_path: Optional[str] = "onnx_export_report.csv") -> pd.DataFrame:
+    """
+    Export fp32, optimized and int8 variants, verify them and keep the fastest
+
+    Every variant is compared with the torch model on X_test, and fails if
+    its largest absolute error is above its tolerance. Each variant is then
+    timed at every batch size. The passing variant with the lowest latency
+    at select_batch_size (single rows, like the API serves) is copied to
+    save_path + '.onnx'. The variant files are kept next to it.
+
+    Args:
+        model: Trained torch model (returning one tensor or a tuple of tensors)
+        X_test: Held-out features used for parity and benchmarking
+        save_path: Output path without extension
+        opset_version: ONNX opset for the fp32 export
+        output_names: ONNX output names
+        batch_sizes: Batch sizes to benchmark
+        select_batch_size: Batch size whose latency decides the winner
+        tolerance: Per-variant max abs error (default PARITY_TOLERANCE)
+        report_path: CSV file for the comparison, None to skip
+    """
+    tolerance = {**PARITY_TOLERANCE, **(tolerance or {})}
+    if isinstance(X_test, (pd.DataFrame, pd.Series)):
+        X_test = X_test.to_numpy()
+    X_test = np.ascontiguousarray(X_test, dtype=np.float32)
+
+    model.eval()
+    with torch.no_grad():
+        reference = model(torch.from_numpy(X_test))
+        if isinstance(reference, (tuple, list)):
+            reference = torch.cat(list(reference), dim=1)
+        reference = reference.numpy()
+
+    paths = {
+        "fp32": f"{save_path}.fp32.onnx",
+        "optimized": f"{save_path}.opt.onnx",
+        "int8": f"{save_path}.int8.onnx",
+    }
+    export_fp32(model, torch.from_numpy(X_test[:1]), paths["fp32"], opset_version, output_names)
+    optimize_onnx(paths["fp32"], paths["optimized"])
+    quantize_int8(paths["fp32"], paths["int8"])
+
+    rows = []
+    for variant, path in paths.items():
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        max_error = float(np.max(np.abs(_run_all(session, X_test) - reference)))
+        passed = max_error <= tolerance[variant]
+        latencies = benchmark_latency(session, X_test, batch_sizes)
+
+        row = {
+            "variant": variant,
+            "path": path,
+            "size_kb": os.path.getsize(path) / 1024,
+            "max_abs_error": max_error,
+            "passed": passed,
+        }
+        row.update({f"latency_ms_b{b}": latencies[b] for b in batch_sizes})
+        rows.append(row)
+
+        print("{:9s} max_err={:.2e} {} ".format(variant, max_error, "PASS" if passed else "FAIL")
+              + " ".join(f"b{b}={latencies[b]:.3f}ms" for b in batch_sizes))
+
+    report = pd.DataFrame(rows)
+    passing = report[report["passed"]]
+    if passing.empty:
+        raise ValueError("No ONNX variant matched the torch model within tolerance")
+
+    best = passing.sort_values(f"latency_ms_b{select_batch_size}").iloc[0]
+    report["selected"] = report["variant"] == best["variant"]
+
+    onnx_file_path = save_path + ".onnx"
+    shutil.copyfile(best["path"], onnx_file_path)
+    print(f"Selected {best['variant']} variant, saved to {onnx_file_path}.")
+
+    if report_path:
+        report.to_csv(report_path, index=False)
+        print(f"Saved export report to {report_path}")
+    return report
@@ -4,7 +4,15 @@ import onnxruntime as ort
 import requests
 import time
 import datetime
-from typing import Dict, Tuple
+import os
+import sys
+from typing import Dict, Optional, Tuple
+
+# Modules shared with the prediction service
+import service_modules  # noqa: F401
+from rate_limit import BinanceRateGovernor, SERVING
+from feature_store import FEATURE_COLUMNS, FeatureStore, compute_features
+from model_outputs import classify_volatility, parse_output_horizons, volatility_levels
 
 class VolatilityPredictor:
     """
@@ -20,7 +28,9 @@ class VolatilityPredictor:
         self.session = None
         self.input_name = None
         self.output_name = None
+        self.output_horizons = {}
         self.current_pair = None
+        self.governor = BinanceRateGovernor(priority=SERVING)
         self._load_model()
     
     def _load_model(self):
@@ -29,6 +39,9 @@ class VolatilityPredictor:
             self.session = ort.InferenceSession(self.model_path)
             self.input_name = self.session.get_inputs()[0].name
             self.output_name = self.session.get_outputs()[0].name
+            
+            # Multi-horizon models name their outputs vol_1d, vol_5d, ...
+            self.output_horizons = parse_output_horizons([o.name for o in self.session.get_outputs()])
             print(f"Loaded ONNX model: {self.model_path}")
         except Exception as e:
             print(f"Failed to load model: {e}")
@@ -53,7 +66,7 @@ class VolatilityPredictor:
         }
         
         try:
-            response = requests.get(self.base_url, params=params)
+            response = self.governor.get(self.base_url, params=params)
             response.raise_for_status()
             data = response.json()
             
@@ -134,22 +147,13 @@ class VolatilityPredictor:
         # Calculate price ratio
         df['price'] = df['ETH'] / df['CRYPTO']
         
-        # Calculate returns
-        returns = 100 * df['price'].pct_change().dropna()
-        
-        if len(returns) < 10:
-            raise ValueError("Insufficient returns data")
-        
-        # Calculate features (last 5 days)
-        recent_returns = returns.tail(10)  # Get last 10 returns for rolling calc
+        # Same feature definition as training (see feature_store.py)
+        features = compute_features(df['price'].to_numpy())[-1:].astype(np.float32)
         
-        realized_vol = recent_returns.rolling(5).std().iloc[-1]
-        returns_squared = recent_returns.iloc[-1] ** 2
-        
-        if pd.isna(realized_vol) or pd.isna(returns_squared):
+        if not np.isfinite(features).all():
             raise ValueError("NaN in features")
         
-        features = np.array([[realized_vol, returns_squared]], dtype=np.float32)
+        realized_vol, returns_squared = features[0]
         
         print(f"Features calculated:")
         print(f"   Realized Vol: {realized_vol:.6f}")
@@ -165,20 +169,23 @@ class VolatilityPredictor:
             raise ValueError("Model not loaded")
         
         try:
-            # Predict
-            prediction = self.session.run(
-                [self.output_name], 
-                {self.input_name: features}
-            )[0]
+            # Predict (all horizons in one call)
+            names = list(self.output_horizons)
+            outputs = self.session.run(names, {self.input_name: features})
+            horizon_vols = {
+                self.output_horizons[name]: float(value[0][0])
+                for name, value in zip(names, outputs)
+            }
             
-            predicted_vol = float(prediction[0][0])
+            predicted_vol = horizon_vols.get('5d', float(outputs[0][0][0]))
             
             # Calculate additional metrics
             annual_vol = predicted_vol * np.sqrt(252)
-            vol_level = self._classify_volatility(predicted_vol)
+            vol_level = classify_volatility(predicted_vol)
             
             result = {
                 'predicted_volatility_5d': predicted_vol,
+                'predicted_volatility': horizon_vols,
                 'annualized_volatility': annual_vol,
                 'volatility_level': vol_level,
                 'trading_pair': self.current_pair,
@@ -196,17 +203,6 @@ class VolatilityPredictor:
             print(f"Prediction error: {e}")
             raise
     
-    def _classify_volatility(self, vol: float) -> str:
-        """Classify volatility level"""
-        if vol < 2:
-            return "LOW"
-        elif vol < 5:
-            return "MODERATE" 
-        elif vol < 10:
-            return "HIGH"
-        else:
-            return "EXTREME"
-    
     def predict_live(self) -> Dict:
         """
         Get live prediction using latest exchange data
@@ -232,6 +228,95 @@ class VolatilityPredictor:
             print(f"Live prediction failed: {e}")
             raise
     
+    def predict_replay(self, crypto_csv: str = "link_data.csv",
+                       eth_csv: str = "eth_data.csv",
+                       store_pair: Optional[str] = None,
+                       output_path: Optional[str] = "replay_predictions.csv") -> pd.DataFrame:
+        """
+        Predict every historical day offline in one batched model call
+        
+        Features for all days come from one compute_features() pass over the
+        stored candles (or from the feature store), and the model runs once
+        on the whole matrix. Each row has the prediction made with that day's
+        features and, where it has happened already, the realized volatility
+        the prediction targets, so the model can be checked without network
+        access.
+        
+        Args:
+            crypto_csv: Candle CSV of the crypto leg
+            eth_csv: Candle CSV of ETH
+            store_pair: Read features from the feature store for this pair
+                        (e.g. 'LINKUSDT/ETHUSDT') instead of the CSVs
+            output_path: CSV file for the predictions table, None to skip
+        
+        Returns:
+            DataFrame with Date, features, predicted_vol_<h>, realized_vol_<h>
+            and volatility_level per day
+        """
+        if self.session is None:
+            raise ValueError("Model not loaded")
+        
+        start = time.perf_counter()
+        if store_pair:
+            stored = FeatureStore().read(store_pair, '1d')
+            dates = stored['Date'].to_numpy()
+            features = stored[FEATURE_COLUMNS].to_numpy(dtype=np.float64)
+            self.current_pair = store_pair
+        else:
+            crypto = pd.read_csv(crypto_csv, usecols=['Date', 'Open'], parse_dates=['Date'])
+            eth = pd.read_csv(eth_csv, usecols=['Date', 'Open'], parse_dates=['Date'])
+            df = pd.merge(crypto, eth, on='Date', suffixes=('_crypto', '_eth'))
+            df = df.dropna().sort_values('Date')
+            dates = df['Date'].to_numpy()
+            features = compute_features((df['Open_eth'] / df['Open_crypto']).to_numpy())
+            self.current_pair = f"{os.path.basename(crypto_csv)}/{os.path.basename(eth_csv)}"
+        
+        valid = np.isfinite(features).all(axis=1)
+        if not valid.any():
+            raise ValueError("Insufficient history for replay")
+        
+        # One model call for every day
+        batch = np.ascontiguousarray(features[valid], dtype=np.float32)
+        names = list(self.output_horizons)
+        outputs = self.session.run(names, {self.input_name: batch})
+        
+        table = pd.DataFrame({'Date': dates[valid]})
+        for k, column in enumerate(FEATURE_COLUMNS):
+            table[column] = batch[:, k]
+        
+        realized_vol = features[:, 0]
+        for name, values in zip(names, outputs):
+            horizon = self.output_horizons[name]
+            table[f'predicted_vol_{horizon}'] = values[:, 0]
+            
+            # Realized vol `horizon` candles later (NaN until it happens)
+            days = int(horizon.rstrip('d'))
+            realized = np.full(len(realized_vol), np.nan)
+            realized[:-days] = realized_vol[days:]
+            table[f'realized_vol_{horizon}'] = realized[valid]
+        
+        main_horizon = '5d' if '5d' in self.output_horizons.values() else self.output_horizons[names[0]]
+        predicted = table[f'predicted_vol_{main_horizon}'].to_numpy()
+        table['volatility_level'] = volatility_levels(predicted)
+        
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {len(table)} days for {self.current_pair} in {elapsed:.2f}s")
+        
+        scored = table.dropna(subset=[f'realized_vol_{main_horizon}'])
+        if len(scored):
+            errors = scored[f'predicted_vol_{main_horizon}'] - scored[f'realized_vol_{main_horizon}']
+            realized_level = volatility_levels(scored[f'realized_vol_{main_horizon}'])
+            print(f"{main_horizon} MAE: {errors.abs().mean():.4f}  "
+                  f"RMSE: {np.sqrt((errors ** 2).mean()):.4f}  "
+                  f"level hit rate: {(scored['volatility_level'].to_numpy() == realized_level).mean():.2%} "
+                  f"({len(scored)} days)")
+        
+        if output_path:
+            table.to_csv(output_path, index=False)
+            print(f"Saved replay predictions to {output_path}")
+        
+        return table
+    
     def _display_results(self, result: Dict):
         """Display results nicely"""
         print("\n" + "="*70)
@@ -239,6 +324,9 @@ class VolatilityPredictor:
         print("="*70)
         print(f"Trading Pair: {result['trading_pair']}")
         print(f"5-Day Volatility: {result['predicted_volatility_5d']:.4f}%")
+        for horizon, vol in result['predicted_volatility'].items():
+            if horizon != '5d':
+                print(f"{horizon} Volatility: {vol:.4f}%")
         print(f"Annualized Volatility: {result['annualized_volatility']:.2f}%")
         print(f"Risk Level: {result['volatility_level']}")
         print(f"Data Source: {result['data_source']}")
@@ -283,9 +371,25 @@ def test_crypto_prediction():
         return None
 
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Crypto volatility predictor")
+    parser.add_argument("--replay", action="store_true",
+                        help="Predict every historical day from stored candles (offline)")
+    parser.add_argument("--crypto-csv", default="link_data.csv")
+    parser.add_argument("--eth-csv", default="eth_data.csv")
+    parser.add_argument("--store-pair", help="Replay from the feature store, e.g. LINKUSDT/ETHUSDT")
+    parser.add_argument("--output", default="replay_predictions.csv")
+    args = parser.parse_args()
+    
     print("Crypto Volatility Predictor")
     print("="*50)
     
+    if args.replay:
+        predictor = VolatilityPredictor("crypto_vol_model.onnx")
+        predictor.predict_replay(args.crypto_csv, args.eth_csv, args.store_pair, args.output)
+        sys.exit(0)
+    
     result = test_crypto_prediction()
     
     if result:
@@ -293,4 +397,4 @@ if __name__ == "__main__":
         print(f"Expected volatility: {result['predicted_volatility_5d']:.4f}%")
         print(f"Risk level: {result['volatility_level']}")
     else:
-        print("Prediction failed")
\ No newline at end of file
+        print("Prediction failed")
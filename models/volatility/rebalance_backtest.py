@@ -0,0 +1,215 @@
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+# Range engine and IL pricing shared with the prediction service
+import service_modules  # noqa: F401
+from ranges import FEE_TIER_TICK_SPACING, recommend_ranges
+from il_simulator import impermanent_loss, position_value
+
+from prediction_test import VolatilityPredictor
+
+# shouldRebalancePosition() fires above predictedVolatility 200000, i.e. a
+# forecast of 0.2 in the percent units the Functions source scales by 1e6
+CONTRACT_VOL_THRESHOLD = 200000 / 1e6
+
+# The contract's configurable volatilityThresholds, set in basis points
+# (500 = 5%), as predicted_volatility_5d percent. shouldRebalancePosition()
+# does not read them yet; they are swept as the candidates for it.
+CONTRACT_LEVEL_THRESHOLDS = {
+    "LOW": 500 / 100,
+    "MEDIUM": 1000 / 100,
+    "HIGH": 2000 / 100,
+}
+
+# Parameters swept by default (thresholds in predicted_volatility_5d units)
+DEFAULT_GRID = {
+    "vol_threshold": [CONTRACT_VOL_THRESHOLD, 2.0, 3.0,
+                      *CONTRACT_LEVEL_THRESHOLDS.values(), np.inf],
+    "width_sigmas": [1.0, 1.5, 2.0, 3.0],
+    "cooldown_days": [1, 3, 7],
+    "out_of_range": [True, False],
+}
+
+# Daily price, predicted volatility and costs of the current worker, set by _init_worker
+_DATA = None
+
+def backtest_thresholds(price: np.ndarray, predicted_vol: np.ndarray,
+                        vol_threshold: float = CONTRACT_VOL_THRESHOLD,
+                        width_sigmas: float = 2.0, cooldown_days: int = 1,
+                        out_of_range: bool = True, horizon_days: float = 5,
+                        fee_tier: int = 3000, daily_fee_pct: float = 0.01,
+                        gas_cost_pct: float = 0.05) -> Dict[str, float]:
+    """
+    Replay one rebalancing rule over daily prices and volatility forecasts
+
+    A position is opened on the first day with the range recommend_ranges()
+    gives for that day's forecast. It is re-centred (new range from the
+    current forecast) on the first day, at least cooldown_days later, on
+    which the forecast is above vol_threshold (the contract's rule) or, with
+    out_of_range, the price has left the range. Trigger masks are computed
+    for all days at once, and the replay jumps from one rebalance to the
+    next instead of stepping through days.
+
+    Returns are relative to holding the tokens and are all simple returns
+    on the position value, summed without compounding: fees accrue on days
+    in range at daily_fee_pct (full-range pool yield) times the range's
+    capital efficiency, IL is booked per range, and each rebalance costs
+    gas_cost_pct plus a swap of half the position at the pool fee.
+
+    Args:
+        price: Daily pool price (e.g. ETH / CRYPTO)
+        predicted_vol: Forecast made on each day, in percent
+        vol_threshold: Forecast above which the rule rebalances
+        width_sigmas: Range half-width, see recommend_ranges()
+        cooldown_days: Minimum days between rebalances
+        out_of_range: Also rebalance when the price leaves the range
+        horizon_days: Horizon the ranges are sized for
+        fee_tier: Pool fee tier (tick spacing and swap cost)
+        daily_fee_pct: Fee yield per day of a full-range position, in percent
+        gas_cost_pct: Gas per rebalance, in percent of position value
+    """
+    price = np.asarray(price, dtype=np.float64)
+    predicted_vol = np.asarray(predicted_vol, dtype=np.float64)
+    n_days = len(price)
+    swap_cost = 0.5 * fee_tier / 1e6
+    cooldown = max(1, int(cooldown_days))
+
+    vol_trigger = predicted_vol > vol_threshold
+    fees = il = costs = 0.0
+    days_in_range = n_rebalances = 0
+
+    t0 = 0
+    while t0 < n_days - 1:
+        rng = recommend_ranges(price[t0], predicted_vol[t0], horizon_days,
+                               tick_spacing=FEE_TIER_TICK_SPACING[fee_tier],
+                               width_sigmas=width_sigmas)
+        lower, upper = float(rng["price_lower"]), float(rng["price_upper"])
+
+        # Next trigger day after the cooldown, over all remaining days at once
+        start = t0 + cooldown
+        trigger = vol_trigger[start:]
+        if out_of_range:
+            trigger = trigger | (price[start:] < lower) | (price[start:] >= upper)
+        t1 = start + int(np.argmax(trigger)) if trigger.any() else n_days - 1
+        t1 = min(t1, n_days - 1)
+
+        held = price[t0 + 1:t1 + 1]
+        in_range = np.count_nonzero((held >= lower) & (held < upper))
+        efficiency = 2 * np.sqrt(price[t0]) / position_value(price[t0], lower, upper)
+
+        fees += in_range * daily_fee_pct / 100 * efficiency
+        il += float(impermanent_loss(price[t0], price[t1], lower, upper))
+        days_in_range += in_range
+        if t1 < n_days - 1:
+            n_rebalances += 1
+            costs += gas_cost_pct / 100 + swap_cost
+        t0 = t1
+
+    years = (n_days - 1) / 365
+    net = fees + il - costs
+    return {
+        "rebalances": n_rebalances,
+        "time_in_range": days_in_range / max(n_days - 1, 1),
+        "fees_pct": 100 * fees,
+        "il_pct": 100 * il,
+        "costs_pct": 100 * costs,
+        "net_pct": 100 * net,
+        "net_annual_pct": 100 * net / years if years > 0 else np.nan,
+    }
+
+def build_grid(grid: Optional[Dict[str, Sequence]] = None):
+    """All parameter combinations of a grid (default DEFAULT_GRID)"""
+    grid = grid or DEFAULT_GRID
+    keys = list(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+def _init_worker(data):
+    """Share the replayed series with the worker once"""
+    global _DATA
+    _DATA = data
+
+def _run_config(config_id: int, params: Dict) -> Dict:
+    """Backtest one parameter combination in a worker"""
+    price, predicted_vol, settings = _DATA
+    return {"config": config_id, **params,
+            **backtest_thresholds(price, predicted_vol, **params, **settings)}
+
+def sweep_thresholds(price: np.ndarray, predicted_vol: np.ndarray,
+                     grid: Optional[Dict[str, Sequence]] = None,
+                     max_workers: Optional[int] = None,
+                     results_path: Optional[str] = "rebalance_sweep.csv",
+                     **settings) -> pd.DataFrame:
+    """
+    Backtest every combination of a parameter grid in parallel
+
+    Args:
+        price, predicted_vol: Daily series, see backtest_thresholds()
+        grid: Parameter name -> values (default DEFAULT_GRID)
+        max_workers: Worker processes (default: all cores)
+        results_path: CSV file for the ranked results, None to skip
+        **settings: Fixed backtest_thresholds() arguments (fee_tier, gas_cost_pct, ...)
+    """
+    configs = build_grid(grid)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(configs))
+    print(f"Sweeping {len(configs)} rebalancing rules on {max_workers} workers...")
+
+    price = np.ascontiguousarray(price, dtype=np.float64)
+    predicted_vol = np.ascontiguousarray(predicted_vol, dtype=np.float64)
+
+    start = time.perf_counter()
+    context = multiprocessing.get_context("spawn")
+    results = []
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                             initializer=_init_worker,
+                             initargs=((price, predicted_vol, settings),)) as pool:
+        futures = [pool.submit(_run_config, k, params) for k, params in enumerate(configs)]
+        for future in as_completed(futures):
+            results.append(future.result())
+
+    report = pd.DataFrame(results).sort_values("net_pct", ascending=False).reset_index(drop=True)
+    print(f"Sweep finished in {time.perf_counter() - start:.1f}s")
+
+    best = report.iloc[0]
+    print("Best rule: vol_threshold={} width_sigmas={} cooldown_days={} out_of_range={} "
+          "-> net {:.2f}% ({:.2f}%/yr, {} rebalances)".format(
+              best["vol_threshold"], best["width_sigmas"], best["cooldown_days"],
+              best["out_of_range"], best["net_pct"], best["net_annual_pct"], best["rebalances"]))
+
+    contract = report[report["vol_threshold"] == CONTRACT_VOL_THRESHOLD]
+    if len(contract):
+        print(f"Best rule with the current contract threshold: net {contract['net_pct'].iloc[0]:.2f}%")
+    for level, threshold in CONTRACT_LEVEL_THRESHOLDS.items():
+        rules = report[report["vol_threshold"] == threshold]
+        if len(rules):
+            print(f"Best rule with the contract's {level} threshold ({threshold:g}%): "
+                  f"net {rules['net_pct'].iloc[0]:.2f}%")
+
+    if results_path:
+        report.to_csv(results_path, index=False)
+        print(f"Saved sweep results to {results_path}")
+    return report
+
+def main():
+    """
+    Sweep rebalancing rules over the stored LINK/ETH history and model replay
+    """
+    predictor = VolatilityPredictor("crypto_vol_model.onnx")
+    replay = predictor.predict_replay("link_data.csv", "eth_data.csv", output_path=None)
+
+    crypto = pd.read_csv("link_data.csv", usecols=["Date", "Open"], parse_dates=["Date"])
+    eth = pd.read_csv("eth_data.csv", usecols=["Date", "Open"], parse_dates=["Date"])
+    prices = pd.merge(crypto, eth, on="Date", suffixes=("_crypto", "_eth"))
+    prices["price"] = prices["Open_eth"] / prices["Open_crypto"]
+    series = pd.merge(replay[["Date", "predicted_vol_5d"]], prices[["Date", "price"]], on="Date")
+
+    return sweep_thresholds(series["price"].to_numpy(), series["predicted_vol_5d"].to_numpy())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+import itertools
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import torch
+
+from train import (
+    build_model,
+    build_multi_pair_dataset,
+    evaluate_rmse,
+    init_worker,
+    load_price_csv,
+    save_model_to_onnx,
+    split_multi_pair_dataset,
+    train_volatility_model,
+    worker_data,
+)
+
+# Hyperparameters sampled for each candidate
+SEARCH_SPACE = {
+    "epochs": [100, 200, 400],
+    "batch_size": [64, 128, 256, 512],
+    "hidden_sizes": [(64, 32), (128, 64), (256, 128), (128, 64, 32)],
+    "lr": [1e-3, 3e-3, 1e-2],
+    "optimizer_name": ["rmsprop", "adam", "sgd"],
+}
+
+def build_candidates(n_candidates: int = 16, seed: int = 0) -> List[Dict]:
+    """
+    Sample distinct candidates from SEARCH_SPACE (the full grid if it is smaller)
+    """
+    keys = list(SEARCH_SPACE)
+    grid = list(itertools.product(*(SEARCH_SPACE[k] for k in keys)))
+    random.Random(seed).shuffle(grid)
+    return [dict(zip(keys, values)) for values in grid[:n_candidates]]
+
+def _train_candidate(candidate_id: int, params: Dict, seed: int) -> Dict:
+    """Train one candidate in a worker process and score it on the validation split"""
+    torch.manual_seed(seed + candidate_id)
+    X_fit, X_val, Y_fit, Y_val = worker_data()
+
+    start = time.perf_counter()
+    model = train_volatility_model(
+        X_fit, X_val, Y_fit, Y_val,
+        checkpoint_path=None,
+        verbose=False,
+        **params
+    )
+    return {
+        "candidate": candidate_id,
+        **params,
+        "VAL_RMSE": evaluate_rmse(model, X_val, Y_val),
+        "train_seconds": time.perf_counter() - start,
+        "state_dict": model.state_dict(),
+    }
+
+def search_hyperparameters(
+    X_train,
+    X_test,
+    Y_train,
+    Y_test,
+    n_candidates: int = 16,
+    max_workers: Optional[int] = None,
+    threads_per_worker: int = 1,
+    leaderboard_path: str = "search_leaderboard.csv",
+    export_path: Optional[str] = "crypto_vol_model",
+    seed: int = 0,
+    val_fraction: float = 0.2,
+) -> pd.DataFrame:
+    """
+    Train independent candidates in parallel and export the best one
+
+    Each candidate is a fresh model trained in its own process with
+    train_volatility_model() on the training data minus its last
+    val_fraction, and ranked by RMSE on that held-out tail (VAL_RMSE). The
+    test set is never seen during the search: only the winner is scored on
+    it (DL_RMSE), then exported with save_model_to_onnx(). The leaderboard
+    is written to leaderboard_path.
+
+    Args:
+        X_train, X_test, Y_train, Y_test: Arrays from split_multi_pair_dataset()
+            (DataFrames from process_crypto_data() work too)
+        n_candidates: Number of configurations to try
+        max_workers: Worker processes (default: cores // threads_per_worker)
+        threads_per_worker: Torch threads in each worker
+        leaderboard_path: CSV file for the ranked results
+        export_path: ONNX path (without extension) for the winner, None to skip
+        seed: Seed for candidate sampling and model initialisation
+        val_fraction: Tail of the training data used to rank candidates
+    """
+    candidates = build_candidates(n_candidates, seed)
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    print(f"Searching {len(candidates)} candidates on {max_workers} workers "
+          f"({threads_per_worker} thread(s) each)...")
+
+    # Spawned workers avoid forking a process that already started OpenMP threads
+    context = multiprocessing.get_context("spawn")
+    n_val = max(1, int(len(X_train) * val_fraction))
+    data = (X_train[:-n_val], X_train[-n_val:], Y_train[:-n_val], Y_train[-n_val:])
+
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                             initializer=init_worker,
+                             initargs=(threads_per_worker, data)) as pool:
+        futures = {
+            pool.submit(_train_candidate, i, params, seed): i
+            for i, params in enumerate(candidates)
+        }
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Candidate {futures[future]} failed: {e}")
+                continue
+            print("Candidate {:3d}: VAL_RMSE={:.6f} ({:.1f}s)".format(
+                result["candidate"], result["VAL_RMSE"], result["train_seconds"]))
+            results.append(result)
+
+    if not results:
+        raise ValueError("All search candidates failed")
+
+    print(f"Search finished in {time.perf_counter() - start:.1f}s")
+
+    states = {r["candidate"]: r.pop("state_dict") for r in results}
+    leaderboard = pd.DataFrame(results).sort_values("VAL_RMSE").reset_index(drop=True)
+
+    # Test RMSE of the winner only, so the test set plays no part in selection
+    best = leaderboard.iloc[0]
+    model = build_model(np.shape(X_train)[1], tuple(best["hidden_sizes"]),
+                        n_outputs=np.shape(Y_train)[1] if np.ndim(Y_train) > 1 else 1)
+    model.load_state_dict(states[best["candidate"]])
+    test_rmse = evaluate_rmse(model, X_test, Y_test)
+    leaderboard["DL_RMSE"] = np.nan
+    leaderboard.loc[0, "DL_RMSE"] = test_rmse
+    print(f"Best candidate {best['candidate']}: VAL_RMSE={best['VAL_RMSE']:.6f} "
+          f"test DL_RMSE={test_rmse:.6f}")
+
+    leaderboard.to_csv(leaderboard_path, index=False)
+    print(f"Saved leaderboard to {leaderboard_path}")
+
+    if export_path:
+        save_model_to_onnx(model, X_train, export_path)
+
+    return leaderboard
+
+def main():
+    """
+    Run a search on the stored LINK/ETH data
+    """
+    link = load_price_csv("link_data.csv")
+    eth = load_price_csv("eth_data.csv")
+    X, Y, _, dates = build_multi_pair_dataset({"LINKUSDT": link}, eth)
+    X_train, X_test, Y_train, Y_test = split_multi_pair_dataset(X, Y, dates)
+    return search_hyperparameters(X_train, X_test, Y_train, Y_test)
+
+if __name__ == "__main__":
+    main()
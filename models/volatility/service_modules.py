@@ -0,0 +1,19 @@
+"""
+Import path of the prediction service modules (lipo_predict/) shared with training
+
+The training scripts reuse the service's rate governor, feature definition,
+closed-form estimators and range/IL math instead of copies of them. Import
+this module before any of those:
+
+    import service_modules  # noqa: F401
+    from feature_store import compute_features
+"""
+import os
+import sys
+
+LIPO_PREDICT_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'lipo_predict')
+)
+
+if LIPO_PREDICT_DIR not in sys.path:
+    sys.path.insert(0, LIPO_PREDICT_DIR)
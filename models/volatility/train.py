@@ -1,4 +1,5 @@
 import datetime
+import json
 import numpy as np
 import pandas as pd
 import torch
@@ -6,16 +7,120 @@ import torch.nn as nn
 import torch.optim as optim
 import requests
 import time
-from typing import Optional, Tuple
+import os
+import resource
+import tracemalloc
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
 from sklearn.metrics import mean_squared_error as mse
 
+# Modules shared with the prediction service
+import service_modules  # noqa: F401
+from rate_limit import BinanceRateGovernor, RateLimitExceeded, TRAINING
+from onnx_export import DEFAULT_OPSET, export_fp32, export_onnx_variants
+from feature_store import FEATURE_COLUMNS, FEATURE_WINDOW, FeatureStore, compute_features, rolling_std
+from dataset_cache import cached_dataset, feature_spec
+from model_outputs import horizon_output_names
+from closed_form import (
+    ewma_variance_series,
+    fit_garch,
+    garch_variance_series,
+    garman_klass_volatility,
+    pair_range_volatility,
+)
+
+# Candle length in milliseconds for each Binance kline interval
+INTERVAL_MS = {
+    '1m': 60 * 1000,
+    '3m': 3 * 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '2h': 2 * 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '6h': 6 * 60 * 60 * 1000,
+    '8h': 8 * 60 * 60 * 1000,
+    '12h': 12 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+    '3d': 3 * 24 * 60 * 60 * 1000,
+    '1w': 7 * 24 * 60 * 60 * 1000,
+}
+
+# Retries of a failed page in download_many(), with exponential backoff
+PAGE_RETRIES = 5
+RETRY_BACKOFF_SECONDS = 1.0
+
+KLINE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_asset_volume', 'number_of_trades',
+    'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
+]
+
 class CryptoDataLoader:
     """
     Download crypto data from exchange API - much more reliable than yfinance
     """
     
-    def __init__(self):
+    def __init__(self, limiter: Optional[BinanceRateGovernor] = None):
         self.base_url = "https://api.binance.com/api/v3/klines"
+        self.limiter = limiter or BinanceRateGovernor(priority=TRAINING)
+    
+    def _request_klines(self, params: Dict, retries: int = 0) -> list:
+        """
+        Rate-limited klines request, returns the raw JSON rows
+        
+        Args:
+            params: Query parameters
+            retries: Extra attempts after a rate limit (429/418, RateLimitExceeded),
+                     server error or network failure, backing off exponentially
+        """
+        for attempt in range(retries + 1):
+            try:
+                response = self.limiter.get(self.base_url, params=params, timeout=10)
+                response.raise_for_status()
+                return response.json()
+            except (RateLimitExceeded, requests.exceptions.RequestException) as e:
+                response = getattr(e, 'response', None)
+                status = response.status_code if response is not None else None
+                # Other client errors (bad symbol, bad range) won't succeed on retry
+                if attempt == retries or (status is not None and status < 500 and status not in (418, 429)):
+                    raise
+                delay = RETRY_BACKOFF_SECONDS * 2 ** attempt
+                if response is not None and response.headers.get('Retry-After'):
+                    delay = max(delay, float(response.headers['Retry-After']))
+                print(f"Klines request failed ({e}), retrying in {delay:.0f}s")
+                time.sleep(delay)
+    
+    @staticmethod
+    def _klines_to_frame(data: list) -> pd.DataFrame:
+        """
+        Convert raw klines rows to a Date/Open/High/Low/Close/Volume frame
+        """
+        # Convert to DataFrame
+        df = pd.DataFrame(data, columns=KLINE_COLUMNS)
+        
+        # Convert timestamp to datetime
+        df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+        
+        # Convert price columns to float
+        price_cols = ['open', 'high', 'low', 'close', 'volume']
+        for col in price_cols:
+            df[col] = df[col].astype(float)
+        
+        # Rename columns to match your format
+        df = df.rename(columns={
+            'timestamp': 'Date',
+            'open': 'Open',
+            'high': 'High', 
+            'low': 'Low',
+            'close': 'Close',
+            'volume': 'Volume'
+        })
+        
+        # Keep only necessary columns
+        return df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
         
     def get_crypto_data(self, symbol: str, interval: str = "1d", 
                         start_time: Optional[int] = None, 
@@ -46,41 +151,12 @@ class CryptoDataLoader:
         print(f"Downloading {symbol} from exchange...")
         
         try:
-            response = requests.get(self.base_url, params=params)
-            response.raise_for_status()
-            
-            data = response.json()
+            data = self._request_klines(params)
             
             if not data:
                 raise ValueError(f"No data returned for {symbol}")
             
-            # Convert to DataFrame
-            df = pd.DataFrame(data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_asset_volume', 'number_of_trades',
-                'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-            ])
-            
-            # Convert timestamp to datetime
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            
-            # Convert price columns to float
-            price_cols = ['open', 'high', 'low', 'close', 'volume']
-            for col in price_cols:
-                df[col] = df[col].astype(float)
-            
-            # Rename columns to match your format
-            df = df.rename(columns={
-                'timestamp': 'Date',
-                'open': 'Open',
-                'high': 'High', 
-                'low': 'Low',
-                'close': 'Close',
-                'volume': 'Volume'
-            })
-            
-            # Keep only necessary columns
-            df = df[['Date', 'Open', 'High', 'Low', 'Close', 'Volume']]
+            df = self._klines_to_frame(data)
             
             print(f"Downloaded {len(df)} data points for {symbol}")
             return df
@@ -92,73 +168,357 @@ class CryptoDataLoader:
             print(f"Error processing {symbol}: {e}")
             raise
     
-    def get_historical_data(self, symbol: str, days_back: int = 1000) -> pd.DataFrame:
+    def get_historical_data(self, symbol: str, days_back: int = 1000,
+                            interval: str = "1d",
+                            max_workers: int = 1) -> pd.DataFrame:
         """
         Get historical data for specified number of days
         
         Args:
             symbol: Trading pair (e.g., 'LINKUSDT')
             days_back: Number of days to go back
+            interval: Time interval ('1d', '1h', '4h', etc.)
+            max_workers: Fetch pages concurrently when greater than 1
         """
+        if max_workers > 1:
+            return self.download_many([symbol], [interval], days_back,
+                                      max_workers=max_workers)[(symbol, interval)]
         
         # Calculate timestamps
         end_time = int(time.time() * 1000)  # Current time in milliseconds
         start_time = end_time - (days_back * 24 * 60 * 60 * 1000)  # days_back ago
         
+        all_data = self._fetch_range(symbol, start_time, end_time, interval)
+        
+        if not all_data:
+            raise ValueError(f"No data retrieved for {symbol}")
+        
+        # Combine all batches
+        combined_df = pd.concat(all_data, ignore_index=True)
+        
+        # Remove duplicates and sort
+        combined_df = combined_df.drop_duplicates(subset=['Date']).sort_values('Date')
+        combined_df = combined_df.reset_index(drop=True)
+        
+        print(f"Total {len(combined_df)} records for {symbol}")
+        return combined_df
+    
+    def _fetch_range(self, symbol: str, start_time: int, end_time: int,
+                     interval: str = "1d") -> List[pd.DataFrame]:
+        """
+        Fetch every candle between start_time and end_time (inclusive, ms)
+        
+        Each page is retried with backoff (PAGE_RETRIES); a page that still
+        fails raises, so callers never mistake a partial range for a
+        complete one. Pages without candles (before the listing, exchange
+        outages) are skipped.
+        
+        Returns the list of downloaded batches, empty when the range has no candles.
+        """
+        step = INTERVAL_MS[interval]
+        
         all_data = []
         current_start = start_time
         
         # API limits to 1000 records per request, so we might need multiple requests
         while current_start < end_time:
-            current_end = min(current_start + (999 * 24 * 60 * 60 * 1000), end_time)
+            current_end = min(current_start + 999 * step, end_time)
             
             try:
-                batch_data = self.get_crypto_data(
-                    symbol=symbol,
-                    start_time=current_start,
-                    end_time=current_end,
-                    limit=1000
-                )
-                
-                if len(batch_data) == 0:
-                    break
-                    
-                all_data.append(batch_data)
-                current_start = current_end + 1
-                
-                # Be nice to API
-                time.sleep(0.1)
-                
+                data = self._request_klines({
+                    'symbol': symbol,
+                    'interval': interval,
+                    'startTime': current_start,
+                    'endTime': current_end,
+                    'limit': 1000
+                }, retries=PAGE_RETRIES)
             except Exception as e:
                 print(f"Failed to get batch starting at {current_start}: {e}")
-                break
+                raise
+            
+            if data:
+                all_data.append(self._klines_to_frame(data))
+            current_start = current_end + 1
         
-        if not all_data:
-            raise ValueError(f"No data retrieved for {symbol}")
+        return all_data
+    
+    def _fetch_page(self, symbol: str, interval: str, page_start: int,
+                    page_end: int, checkpoint_path: Optional[str]) -> pd.DataFrame:
+        """
+        Fetch one page of candles, reusing or writing its checkpoint file
+        """
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            return pd.read_csv(checkpoint_path, parse_dates=['Date'])
         
-        # Combine all batches
-        combined_df = pd.concat(all_data, ignore_index=True)
+        data = self._request_klines({
+            'symbol': symbol,
+            'interval': interval,
+            'startTime': page_start,
+            'endTime': page_end,
+            'limit': 1000
+        }, retries=PAGE_RETRIES)
+        df = self._klines_to_frame(data)
         
-        # Remove duplicates and sort
-        combined_df = combined_df.drop_duplicates(subset=['Date']).sort_values('Date')
+        if checkpoint_path:
+            # Write then rename so an interrupted run never leaves half a page
+            tmp_path = checkpoint_path + ".tmp"
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, checkpoint_path)
+        return df
+    
+    def download_many(self, symbols: List[str], intervals: List[str] = ("1d",),
+                      days_back: int = 1000, max_workers: int = 8,
+                      checkpoint_dir: Optional[str] = None) -> Dict[Tuple[str, str], pd.DataFrame]:
+        """
+        Download several symbols and intervals with pages fetched concurrently
+        
+        Every (symbol, interval) range is split into 1000-candle pages aligned
+        to a fixed grid, and all pages go to one thread pool. Request weight
+        is governed by self.limiter, the host-wide Binance budget, and a page
+        that is rate limited or fails transiently is retried with exponential
+        backoff (PAGE_RETRIES). With checkpoint_dir set, each completed page
+        is saved there and skipped on the next run, so an interrupted backfill
+        resumes where it stopped; the page holding the current, still-open
+        candle is never checkpointed.
+        
+        Args:
+            symbols: Trading pairs (e.g., ['LINKUSDT', 'ETHUSDT'])
+            intervals: Time intervals ('1d', '1h', '4h', etc.)
+            days_back: Number of days to go back
+            max_workers: Number of concurrent requests
+            checkpoint_dir: Directory for resumable page checkpoints
+        
+        Returns:
+            Dict mapping (symbol, interval) to its combined DataFrame
+        """
+        now = int(time.time() * 1000)
+        start_time = now - (days_back * 24 * 60 * 60 * 1000)
+        
+        if checkpoint_dir:
+            os.makedirs(checkpoint_dir, exist_ok=True)
+        
+        # Plan pages on a fixed grid so boundaries match between runs
+        tasks = []
+        for symbol in symbols:
+            for interval in intervals:
+                page_span = 1000 * INTERVAL_MS[interval]
+                page_start = (start_time // page_span) * page_span
+                while page_start <= now:
+                    page_end = page_start + page_span - 1
+                    checkpoint_path = None
+                    if checkpoint_dir and page_end < now:
+                        checkpoint_path = os.path.join(
+                            checkpoint_dir, f"{symbol}_{interval}_{page_start}.csv"
+                        )
+                    tasks.append((symbol, interval, page_start, page_end, checkpoint_path))
+                    page_start += page_span
+        
+        print(f"Downloading {len(tasks)} pages for {len(symbols)} symbol(s) "
+              f"x {len(intervals)} interval(s) with {max_workers} workers...")
+        
+        pages = {}
+        failures = []
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = {pool.submit(self._fetch_page, *task): task for task in tasks}
+            for future in as_completed(futures):
+                symbol, interval, page_start = futures[future][:3]
+                try:
+                    pages[(symbol, interval, page_start)] = future.result()
+                except Exception as e:
+                    print(f"Failed page {symbol} {interval} at {page_start}: {e}")
+                    failures.append((symbol, interval, page_start))
+        
+        if failures:
+            raise ValueError(
+                f"{len(failures)} of {len(tasks)} pages failed"
+                + (", rerun to resume from checkpoints" if checkpoint_dir else "")
+            )
+        
+        start_date = pd.to_datetime(start_time, unit='ms')
+        results = {}
+        for symbol in symbols:
+            for interval in intervals:
+                frames = [
+                    pages[key] for key in sorted(pages)
+                    if key[:2] == (symbol, interval) and len(pages[key]) > 0
+                ]
+                if not frames:
+                    raise ValueError(f"No data retrieved for {symbol} {interval}")
+                
+                combined_df = pd.concat(frames, ignore_index=True)
+                combined_df = combined_df[combined_df['Date'] >= start_date]
+                combined_df = combined_df.drop_duplicates(subset=['Date']).sort_values('Date')
+                combined_df = combined_df.reset_index(drop=True)
+                
+                print(f"Total {len(combined_df)} records for {symbol} {interval}")
+                results[(symbol, interval)] = combined_df
+        
+        return results
+    
+    def sync_historical_data(self, symbol: str, csv_path: str,
+                             days_back: int = 1000,
+                             interval: str = "1d") -> pd.DataFrame:
+        """
+        Incrementally bring a stored candle CSV up to date
+        
+        Only the candles missing from csv_path are downloaded: everything
+        after the newest stored candle, plus any holes inside the stored
+        history (or before it, back to days_back). The newest stored candle
+        is fetched again because it may have been saved while still open.
+        Ranges that come back without candles (before the listing, exchange
+        outages) are remembered next to the CSV and not requested again. If
+        any fetch fails the CSV is left untouched and the error is raised.
+        Falls back to a full get_historical_data() when nothing is stored.
+        
+        Args:
+            symbol: Trading pair (e.g., 'LINKUSDT')
+            csv_path: CSV file holding previously downloaded candles
+            days_back: Number of days the stored history should cover
+            interval: Time interval ('1d', '1h', '4h', etc.)
+        """
+        if not os.path.exists(csv_path):
+            print(f"No stored data for {symbol}, downloading full history...")
+            df = self.get_historical_data(symbol, days_back=days_back, interval=interval)
+            df.to_csv(csv_path, index=False)
+            return df
+        
+        stored = pd.read_csv(csv_path, parse_dates=['Date'])
+        if len(stored) == 0:
+            os.remove(csv_path)
+            return self.sync_historical_data(symbol, csv_path, days_back, interval)
+        
+        step = INTERVAL_MS[interval]
+        now = int(time.time() * 1000)
+        window_start = now - (days_back * 24 * 60 * 60 * 1000)
+        stored_ms = to_epoch_ms(stored['Date'])
+        
+        holes = find_gaps(stored_ms, interval)
+        if stored_ms[0] - window_start >= step:
+            holes.insert(0, (window_start, int(stored_ms[0]) - 1))
+        
+        # Holes already known to have no candles are not requested again
+        empty_path = csv_path + ".empty.json"
+        known_empty = load_empty_ranges(empty_path)
+        holes = [hole for hole in holes if not range_covered(hole, known_empty)]
+        
+        fetched = []
+        found_empty = []
+        for range_start, range_end in holes:
+            batches = self._fetch_range(symbol, range_start, range_end, interval)
+            if batches:
+                fetched.extend(batches)
+            else:
+                found_empty.append((range_start, range_end))
+        fetched.extend(self._fetch_range(symbol, int(stored_ms[-1]), now, interval))
+        
+        if found_empty:
+            save_empty_ranges(empty_path, known_empty + found_empty)
+        
+        new_rows = sum(len(batch) for batch in fetched)
+        print(f"Synced {symbol}: {len(holes)} gap(s) ({len(found_empty)} without candles), "
+              f"{new_rows} candles fetched")
+        
+        # Fresh candles win over stored ones (the last stored candle may be partial)
+        combined_df = pd.concat([stored] + fetched, ignore_index=True)
+        combined_df = combined_df.drop_duplicates(subset=['Date'], keep='last').sort_values('Date')
         combined_df = combined_df.reset_index(drop=True)
         
+        combined_df.to_csv(csv_path, index=False)
         print(f"Total {len(combined_df)} records for {symbol}")
         return combined_df
 
-def download_crypto_data():
+def to_epoch_ms(dates: pd.Series) -> np.ndarray:
+    """
+    Convert a datetime column to epoch milliseconds
+    """
+    return dates.values.astype('datetime64[ms]').astype(np.int64)
+
+def find_gaps(timestamps_ms: np.ndarray, interval: str = "1d") -> List[Tuple[int, int]]:
+    """
+    Find holes in a sorted series of candle open times
+    
+    Returns (start_ms, end_ms) ranges covering the missing candles.
+    """
+    step = INTERVAL_MS[interval]
+    diffs = np.diff(timestamps_ms)
+    holes = np.nonzero(diffs > step)[0]
+    return [
+        (int(timestamps_ms[i]) + step, int(timestamps_ms[i + 1]) - 1)
+        for i in holes
+    ]
+
+def load_empty_ranges(path: str) -> List[Tuple[int, int]]:
+    """
+    (start_ms, end_ms) ranges known to have no candles, [] when none recorded
+    """
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return [tuple(r) for r in json.load(f)]
+
+def save_empty_ranges(path: str, ranges: List[Tuple[int, int]]):
+    """
+    Record ranges without candles so later syncs skip them
+    """
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump([list(r) for r in ranges], f)
+    os.replace(tmp_path, path)
+
+def range_covered(candidate: Tuple[int, int], ranges: List[Tuple[int, int]]) -> bool:
+    """
+    True if candidate lies inside one of ranges
+    
+    The hole before the first stored candle starts later on every run
+    (it begins days_back before now), so containment, not equality, is
+    what makes it match the range recorded on an earlier run.
+    """
+    return any(start <= candidate[0] and candidate[1] <= end for start, end in ranges)
+
+def download_crypto_data(incremental: bool = True, max_workers: int = 8,
+                         checkpoint_dir: Optional[str] = None):
     """
-    Download LINK and ETH data from exchange
+    Download LINK (or the first alternative that works) and ETH data from exchange
+    
+    Args:
+        incremental: Only fetch candles missing from the existing CSV files
+                     instead of re-downloading the full history
+        max_workers: Concurrent requests for a full re-download
+        checkpoint_dir: Directory for resumable page checkpoints (full
+                        re-download only)
+    
+    Returns:
+        crypto and ETH DataFrames, and the crypto symbol actually downloaded
     """
     loader = CryptoDataLoader()
     
+    # A full re-download fetches both symbols' pages in one concurrent pass
+    prefetched = {}
+    if not incremental:
+        try:
+            prefetched = loader.download_many(
+                ["LINKUSDT", "ETHUSDT"], ["1d"], days_back=2000,
+                max_workers=max_workers, checkpoint_dir=checkpoint_dir
+            )
+        except Exception as e:
+            print(f"Concurrent download failed: {e}")
+    
+    def fetch(symbol: str, csv_path: str) -> pd.DataFrame:
+        if incremental:
+            return loader.sync_historical_data(symbol, csv_path, days_back=2000)
+        df = prefetched.get((symbol, "1d"))
+        if df is None:
+            df = loader.get_historical_data(symbol, days_back=2000, max_workers=max_workers)
+        df.to_csv(csv_path, index=False)
+        return df
+    
     # Download data
     print("Starting crypto data download...")
     
     try:
         # LINK/USDT data
-        link = loader.get_historical_data("LINKUSDT", days_back=2000)
-        link.to_csv("link_data.csv", index=False)
+        link = fetch("LINKUSDT", "link_data.csv")
+        crypto_symbol = "LINKUSDT"
         print("Saved LINK data to link_data.csv")
         
     except Exception as e:
@@ -172,8 +532,8 @@ def download_crypto_data():
         for alt_symbol in alternatives:
             try:
                 print(f"Trying {alt_symbol}...")
-                link = loader.get_historical_data(alt_symbol, days_back=2000)
-                link.to_csv(f"{alt_symbol.lower()}_data.csv", index=False)
+                link = fetch(alt_symbol, f"{alt_symbol.lower()}_data.csv")
+                crypto_symbol = alt_symbol
                 print(f"Saved {alt_symbol} data")
                 break
             except Exception as alt_e:
@@ -185,15 +545,14 @@ def download_crypto_data():
     
     try:
         # ETH/USDT data
-        eth = loader.get_historical_data("ETHUSDT", days_back=2000)
-        eth.to_csv("eth_data.csv", index=False)
+        eth = fetch("ETHUSDT", "eth_data.csv")
         print("Saved ETH data to eth_data.csv")
         
     except Exception as e:
         print(f"Failed to download ETH data: {e}")
         raise
     
-    return link, eth
+    return link, eth, crypto_symbol
 
 def process_crypto_data(link: pd.DataFrame, eth: pd.DataFrame):
     """
@@ -265,91 +624,489 @@ def process_crypto_data(link: pd.DataFrame, eth: pd.DataFrame):
     
     return X_train, X_test, Y_train, Y_test
 
+@contextmanager
+def track_peak_memory(label: str):
+    """
+    Print peak NumPy/Python allocations and process peak RSS for a block
+    
+    tracemalloc sees NumPy buffers; torch tensors allocated by torch itself
+    only show up in the RSS figure.
+    """
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _, peak = tracemalloc.get_traced_memory()
+        if not already_tracing:
+            tracemalloc.stop()
+        # ru_maxrss is in kilobytes on Linux
+        peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        print(f"[{label}] peak allocations {peak / 2**20:.1f} MiB, "
+              f"process peak RSS {peak_rss:.1f} MiB, {time.perf_counter() - start:.2f}s")
+
+def load_price_csv(csv_path: str, price_col: str = "Open") -> pd.DataFrame:
+    """
+    Read only Date and one float32 price column from a stored candle CSV
+    """
+    return pd.read_csv(csv_path, usecols=['Date', price_col],
+                       dtype={price_col: np.float32}, parse_dates=['Date'])
+
+def build_multi_pair_dataset(crypto_data: Dict[str, pd.DataFrame],
+                             eth_data,
+                             window: int = 5,
+                             horizon: int = 5,
+                             price_col: str = "Open",
+                             horizons: Optional[Tuple[int, ...]] = None):
+    """
+    Build features and targets for many ETH / CRYPTO pairs in one pass
+    
+    Prices are aligned on Date into a (dates x pairs) matrix and every
+    feature is computed column-wise with NumPy, so adding pairs adds
+    columns instead of another round of DataFrame merges. Per pair the
+    output matches process_crypto_data(): realized_vol is the rolling std of
+    the last `window` percentage returns of ETH / CRYPTO, returns_squared is
+    the latest return squared, and the target is realized_vol `horizon`
+    candles ahead.
+    
+    Args:
+        crypto_data: Symbol -> candle DataFrame (e.g. {'LINKUSDT': link})
+        eth_data: ETH candles shared by every pair, or a dict with one ETH
+                  leg per symbol
+        window: Rolling window for realized volatility
+        horizon: Candles ahead for the target
+        price_col: Price column used for returns
+        horizons: Several target horizons at once (overrides horizon), for
+                  train_multi_horizon_model()
+    
+    Returns (samples in time-major order: by date, then pair):
+        X: float32 (n_samples, 2) [realized_vol, returns_squared]
+        Y: float32 (n_samples,) target volatility, or
+           (n_samples, len(horizons)) when horizons is given
+        pair_ids: int16 (n_samples,) position of the symbol in crypto_data
+        dates: datetime64 (n_samples,) candle date of each sample
+    """
+    symbols = list(crypto_data)
+    crypto = pd.concat(
+        {sym: df.set_index('Date')[price_col] for sym, df in crypto_data.items()},
+        axis=1
+    )
+    if isinstance(eth_data, dict):
+        eth = pd.concat(
+            {sym: eth_data[sym].set_index('Date')[price_col] for sym in symbols},
+            axis=1
+        )
+    else:
+        eth_leg = eth_data.set_index('Date')[price_col]
+        eth = pd.concat({sym: eth_leg for sym in symbols}, axis=1)
+    
+    crypto, eth = crypto.align(eth, join='inner')
+    crypto = crypto.sort_index()
+    eth = eth.loc[crypto.index]
+    
+    price = eth[symbols].to_numpy(dtype=np.float64) / crypto[symbols].to_numpy(dtype=np.float64)
+    dates = crypto.index.to_numpy()[1:]
+    
+    # Shared with serving (feature_store.compute_features), so no train/serve skew
+    features = compute_features(price, window)[1:]
+    del price
+    realized_vol = features[:, 0]
+    returns_squared = features[:, 1]
+    
+    target_horizons = horizons if horizons is not None else (horizon,)
+    targets = np.full((len(target_horizons),) + realized_vol.shape, np.nan)
+    for k, h in enumerate(target_horizons):
+        targets[k, :-h] = realized_vol[h:]
+    
+    valid = (np.isfinite(realized_vol) & np.isfinite(returns_squared)
+             & np.isfinite(targets).all(axis=0))
+    
+    # Time-major order makes any date cut a contiguous slice (see
+    # split_multi_pair_dataset), so splits are views rather than copies
+    t_idx, p_idx = np.nonzero(valid)
+    n = len(t_idx)
+    
+    # Fill preallocated float32 buffers column by column
+    X = np.empty((n, 2), dtype=np.float32)
+    X[:, 0] = realized_vol[valid]
+    X[:, 1] = returns_squared[valid]
+    del features, realized_vol, returns_squared
+    
+    Y = np.empty((n, len(target_horizons)), dtype=np.float32)
+    for k in range(len(target_horizons)):
+        Y[:, k] = targets[k][valid]
+    del targets
+    if horizons is None:
+        Y = Y[:, 0].copy()
+    
+    print(f"Built {n} samples for {len(symbols)} pair(s)")
+    return X, Y, p_idx.astype(np.int16), dates[t_idx]
+
+def split_multi_pair_dataset(X: np.ndarray, Y: np.ndarray, dates: np.ndarray,
+                             test_days: int = 252):
+    """
+    Time-based split of a pooled dataset: the last test_days dates are test
+    
+    Samples from build_multi_pair_dataset() are sorted by date, so the
+    split is a single cut and the returned arrays are views, not copies.
+    The test period is capped at a quarter of the dates.
+    
+    Returns:
+        X_train, X_test, Y_train, Y_test
+    """
+    unique_dates = np.unique(dates)
+    n = min(test_days, len(unique_dates) // 4)
+    if n < 1:
+        raise ValueError(f"Need at least 4 dates to split into train and test, got {len(unique_dates)}")
+    cut = int(np.searchsorted(dates, unique_dates[-n]))
+    
+    print(f"Training set: {cut} samples")
+    print(f"Test set: {len(dates) - cut} samples")
+    
+    return X[:cut], X[cut:], Y[:cut], Y[cut:]
+
+def benchmark_closed_form(link: pd.DataFrame, eth: pd.DataFrame,
+                          horizon: int = 5, window: int = 5,
+                          test_days: int = 252) -> Dict[str, float]:
+    """
+    Test RMSE of the closed-form estimators on the same target as the model
+    
+    Scores EWMA (RiskMetrics), GARCH(1,1) fitted on the training period, and
+    a Garman-Klass pair estimate built from both legs' OHLC candles against
+    realized_vol `horizon` candles ahead over the last test_days, in the
+    DL_RMSE units printed by train_volatility_model().
+    """
+    cols = ['Date', 'Open', 'High', 'Low', 'Close']
+    df = pd.merge(link[cols], eth[cols], on='Date', suffixes=('_crypto', '_eth'))
+    df = df.dropna().sort_values('Date').reset_index(drop=True)
+    
+    price = df['Open_eth'].to_numpy() / df['Open_crypto'].to_numpy()
+    ret = 100 * (price[1:] / price[:-1] - 1)
+    
+    realized_vol = rolling_std(ret, window)
+    target = np.full_like(realized_vol, np.nan)
+    target[:-horizon] = realized_vol[horizon:]
+    
+    n = min(test_days, len(ret) // 4)
+    if n < 1 or len(ret) - n - horizon < 1:
+        raise ValueError(f"Not enough candles to benchmark: {len(ret)} returns for horizon {horizon}")
+    test = np.arange(len(ret) - n - horizon, len(ret) - horizon)
+    
+    legs = {}
+    for leg in ('crypto', 'eth'):
+        gk = garman_klass_volatility(df[f'Open_{leg}'], df[f'High_{leg}'],
+                                     df[f'Low_{leg}'], df[f'Close_{leg}'], window)
+        legs[leg] = (gk[1:], 100 * np.diff(np.log(df[f'Close_{leg}'].to_numpy())))
+    
+    garch_params = fit_garch(ret[:test[0]])
+    forecasts = {
+        'EWMA': np.sqrt(ewma_variance_series(ret)),
+        'GARCH(1,1)': np.sqrt(garch_variance_series(ret, garch_params, horizon)),
+        'Garman-Klass pair': pair_range_volatility(
+            legs['eth'][0], legs['crypto'][0], legs['eth'][1], legs['crypto'][1], window
+        ),
+    }
+    
+    scores = {}
+    for name, forecast in forecasts.items():
+        ok = np.isfinite(forecast[test]) & np.isfinite(target[test])
+        scores[name] = float(np.sqrt(mse(target[test][ok] / 100, forecast[test][ok] / 100)))
+        print("Benchmark {} RMSE:{:.6f}".format(name, scores[name]))
+    return scores
+
+def _as_float32(data) -> np.ndarray:
+    """
+    Contiguous float32 view of a DataFrame/Series/array (no copy if already one)
+    """
+    if isinstance(data, (pd.DataFrame, pd.Series)):
+        data = data.to_numpy()
+    return np.ascontiguousarray(data, dtype=np.float32)
+
+# Optimizers selectable by name in train_volatility_model()
+OPTIMIZERS = {
+    "rmsprop": optim.RMSprop,
+    "adam": optim.Adam,
+    "sgd": optim.SGD,
+}
+
+def build_model(n_features: int, hidden_sizes: Tuple[int, ...] = (128, 64),
+                n_outputs: int = 1) -> nn.Sequential:
+    """
+    Feed-forward ReLU network (default: original 128-64 architecture)
+    
+    With n_outputs > 1 the hidden layers form a trunk shared by all outputs.
+    """
+    layers = []
+    width = n_features
+    for hidden in hidden_sizes:
+        layers += [nn.Linear(width, hidden), nn.ReLU()]
+        width = hidden
+    layers.append(nn.Linear(width, n_outputs))
+    return nn.Sequential(*layers)
+
+# Arrays shipped once to each process of a parallel search or backtest
+_WORKER_DATA = None
+
+def init_worker(threads_per_worker: int, data):
+    """
+    ProcessPoolExecutor initializer: keep the shared arrays and cap torch threads
+    
+    torch is already imported when this runs, so OMP_NUM_THREADS would have
+    no effect; torch.set_num_threads() is what limits intra-op threads.
+    """
+    global _WORKER_DATA
+    torch.set_num_threads(threads_per_worker)
+    _WORKER_DATA = data
+
+def worker_data():
+    """Arrays passed to init_worker() in this process"""
+    return _WORKER_DATA
+
+def evaluate_rmse(model: nn.Module, X_test, Y_test) -> float:
+    """
+    Test RMSE in the original DL_RMSE units (volatility / 100)
+    """
+    model.eval()
+    with torch.no_grad():
+        DL_predict = model(torch.from_numpy(_as_float32(X_test))).numpy()
+    return float(np.sqrt(mse(_as_float32(Y_test).ravel() / 100, DL_predict.ravel() / 100)))
+
 def train_volatility_model(
     X_train: pd.DataFrame,
     X_test: pd.DataFrame,
     Y_train: pd.DataFrame,
     Y_test: pd.DataFrame,
+    epochs: int = 400,
+    batch_size: int = 256,
+    val_fraction: float = 0.1,
+    patience: int = 25,
+    checkpoint_path: Optional[str] = "crypto_vol_model.pt",
+    log_every: int = 10,
+    hidden_sizes: Tuple[int, ...] = (128, 64),
+    lr: Optional[float] = None,
+    optimizer_name: str = "rmsprop",
+    verbose: bool = True,
 ):
     """
-    Train PyTorch model
+    Train PyTorch model with shuffled mini-batches and early stopping
+    
+    The last val_fraction of the (chronological) training set is held out
+    for validation. Training stops once validation loss has not improved
+    for `patience` epochs, and the best weights are restored (and saved to
+    checkpoint_path) before the test RMSE is reported.
+    
+    Args:
+        X_train, X_test, Y_train, Y_test: DataFrames or float arrays; a 2-D
+            Y trains one output per column
+        epochs: Maximum number of epochs
+        batch_size: Samples per optimizer step
+        val_fraction: Tail of the training set used for validation
+        patience: Epochs without validation improvement before stopping
+        checkpoint_path: Where to save the best state_dict (None to skip)
+        log_every: Print progress every this many epochs
+        hidden_sizes: Widths of the hidden layers
+        lr: Learning rate (None for the optimizer's default)
+        optimizer_name: One of OPTIMIZERS
+        verbose: Print progress
     """
-    # Use same architecture as original
-    model = nn.Sequential(
-        nn.Linear(X_train.shape[1], 128),
-        nn.ReLU(),
-        nn.Linear(128, 64),
-        nn.ReLU(),
-        nn.Linear(64, 1),
-    )
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    
+    # Float32 tensors sharing memory with the input arrays
+    X_all = torch.from_numpy(_as_float32(X_train))
+    y_all = torch.from_numpy(_as_float32(Y_train).reshape(len(X_all), -1))
     
-    # Same loss and optimizer as original
+    n_val = max(1, int(len(X_all) * val_fraction))
+    X_fit, y_fit = X_all[:-n_val], y_all[:-n_val]
+    X_val, y_val = X_all[-n_val:].to(device), y_all[-n_val:].to(device)
+    n_fit = len(X_fit)
+    
+    # Batches are gathered straight into pinned buffers, which allows
+    # asynchronous copies to the GPU (fancy indexing alone would produce a
+    # new pageable tensor). loss.item() syncs every step, so a buffer is
+    # never refilled while its previous copy is still in flight.
+    pinned = device.type == "cuda"
+    if pinned:
+        x_buffer = torch.empty((batch_size, X_fit.shape[1]), pin_memory=True)
+        y_buffer = torch.empty((batch_size, y_fit.shape[1]), pin_memory=True)
+    
+    model = build_model(X_all.shape[1], hidden_sizes, n_outputs=y_all.shape[1]).to(device)
+    
+    # Same loss as original, RMSprop by default
     criterion = nn.MSELoss()
-    optimizer = optim.RMSprop(model.parameters())
+    optimizer_kwargs = {} if lr is None else {"lr": lr}
+    if optimizer_name == "sgd" and lr is None:
+        optimizer_kwargs["lr"] = 1e-3  # SGD has no default learning rate
+    optimizer = OPTIMIZERS[optimizer_name](model.parameters(), **optimizer_kwargs)
+    
+    log = print if verbose else (lambda *args, **kwargs: None)
     
-    # Convert data to PyTorch tensors
-    X_tensor = torch.tensor(X_train.values, dtype=torch.float32)
-    y_tensor = torch.tensor(Y_train.values.reshape(-1, 1), dtype=torch.float32)
-    X_test_tensor = torch.tensor(X_test.values, dtype=torch.float32)
+    log(f"Training on {n_fit} samples, validating on {n_val} "
+          f"(batch size {batch_size}, device {device.type})")
     
-    # Training loop
-    epochs_trial = np.arange(100, 400, 4)
-    batch_trial = np.arange(100, 400, 4)
-    DL_pred = []
-    DL_RMSE = []
+    best_loss = float('inf')
+    best_state = None
+    best_epoch = 0
+    train_start = time.perf_counter()
     
-    for i, j, k in zip(range(4), epochs_trial, batch_trial):
-        for epoch in range(j):
+    for epoch in range(1, epochs + 1):
+        epoch_start = time.perf_counter()
+        model.train()
+        permutation = torch.randperm(n_fit)
+        running_loss = 0.0
+        
+        for start in range(0, n_fit, batch_size):
+            idx = permutation[start:start + batch_size]
+            if pinned:
+                xb = torch.index_select(X_fit, 0, idx, out=x_buffer[:len(idx)])
+                yb = torch.index_select(y_fit, 0, idx, out=y_buffer[:len(idx)])
+                xb, yb = xb.to(device, non_blocking=True), yb.to(device, non_blocking=True)
+            else:
+                xb, yb = X_fit[idx], y_fit[idx]
+            
             optimizer.zero_grad()
-            outputs = model(X_tensor)
-            loss = criterion(outputs, y_tensor)
+            loss = criterion(model(xb), yb)
             loss.backward()
             optimizer.step()
+            running_loss += loss.item() * len(idx)
         
+        model.eval()
         with torch.no_grad():
-            DL_predict = model(X_test_tensor).numpy()
-            DL_RMSE.append(
-                np.sqrt(mse(Y_test.values / 100, DL_predict.flatten() / 100))
-            )
-            DL_pred.append(DL_predict)
-            print("DL_RMSE_{}:{:.6f}".format(i + 1, DL_RMSE[i]))
+            val_loss = criterion(model(X_val), y_val).item()
+        epoch_time = time.perf_counter() - epoch_start
+        
+        if val_loss < best_loss:
+            best_loss = val_loss
+            best_epoch = epoch
+            best_state = {k: v.detach().clone() for k, v in model.state_dict().items()}
+            if checkpoint_path:
+                torch.save(best_state, checkpoint_path)
+        
+        if epoch % log_every == 0 or epoch == 1:
+            log("Epoch {:4d}: train_loss={:.4f} val_loss={:.4f} "
+                  "{:.3f}s/epoch {:,.0f} samples/s".format(
+                      epoch, running_loss / n_fit, val_loss,
+                      epoch_time, n_fit / epoch_time))
+        
+        if epoch - best_epoch >= patience:
+            log(f"Early stopping at epoch {epoch} (best epoch {best_epoch})")
+            break
+    
+    total_time = time.perf_counter() - train_start
+    log("Trained {} epochs in {:.1f}s ({:,.0f} samples/s), best val_loss={:.4f}".format(
+        epoch, total_time, epoch * n_fit / total_time, best_loss))
+    if best_state is None:
+        raise ValueError(f"Training diverged: validation loss was not finite in any of {epoch} epochs")
+    if checkpoint_path:
+        log(f"Best checkpoint saved to {checkpoint_path}")
+    
+    model.load_state_dict(best_state)
+    model = model.cpu().eval()
+    
+    DL_RMSE = evaluate_rmse(model, X_test, Y_test)
+    log("DL_RMSE:{:.6f}".format(DL_RMSE))
     
     return model
 
 def save_model_to_onnx(
-    model: nn.Module, X_train: pd.DataFrame, save_path="crypto_vol_model"
+    model: nn.Module, X_train: pd.DataFrame, save_path="crypto_vol_model",
+    opset_version: int = DEFAULT_OPSET,
 ):
     """
-    Save model to ONNX format
-    """
-    # Ensure the model is in evaluation mode
-    model.eval()
+    Save model to ONNX format (single fp32 file)
     
-    # Dummy input matching the input size
-    sample_input = torch.randn(
-        1, X_train.shape[1]
-    )  # Replace 1 with the batch size you'd like to use
+    See onnx_export.export_onnx_variants() for the verified and benchmarked
+    fp32/optimized/int8 export used by main().
+    """
+    # Trace with a real training row rather than random noise
+    sample_input = torch.from_numpy(_as_float32(X_train)[:1])
     
     # Specify the path to save the ONNX model
     onnx_file_path = save_path + ".onnx"
     
-    torch.onnx.export(
-        model,
-        sample_input,
-        onnx_file_path,
-        export_params=True,
-        opset_version=10,
-        do_constant_folding=True,
-        input_names=["input"],
-        output_names=["output"],
-        dynamic_axes={
-            "input": {0: "batch_size"},
-            "output": {0: "batch_size"},
-        },
-    )
+    export_fp32(model, sample_input, onnx_file_path, opset_version)
     
     print(f"Saved serialized ONNX model to {onnx_file_path}.")
 
+class _NamedOutputs(nn.Module):
+    """
+    Export wrapper returning each output column as its own ONNX output
+    """
+    
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+    
+    def forward(self, x):
+        out = self.model(x)
+        return tuple(out[:, k:k + 1] for k in range(out.shape[1]))
+
+def train_multi_horizon_model(X_train, X_test, Y_train, Y_test,
+                              horizons: Tuple[int, ...] = (1, 5, 14, 30),
+                              **train_kwargs):
+    """
+    Train one network predicting volatility at several horizons
+    
+    Y_* hold one column per horizon (build_multi_pair_dataset(horizons=...)).
+    The hidden layers are shared, so every horizon comes out of one forward
+    pass. Extra keyword arguments go to train_volatility_model().
+    """
+    train_kwargs.setdefault("checkpoint_path", "crypto_vol_model_multi.pt")
+    model = train_volatility_model(X_train, X_test, Y_train, Y_test, **train_kwargs)
+    
+    with torch.no_grad():
+        predictions = model(torch.from_numpy(_as_float32(X_test))).numpy()
+    Y_test = _as_float32(Y_test)
+    for k, h in enumerate(horizons):
+        rmse = np.sqrt(mse(Y_test[:, k] / 100, predictions[:, k] / 100))
+        print("DL_RMSE_{}d:{:.6f}".format(h, rmse))
+    
+    return model
+
+def save_multi_horizon_onnx(model: nn.Module, X_test,
+                            horizons: Tuple[int, ...] = (1, 5, 14, 30),
+                            save_path="crypto_vol_model") -> pd.DataFrame:
+    """
+    Export a multi-horizon model with one named output per horizon
+    
+    Goes through export_onnx_variants(), so the saved file is the fastest
+    variant that matches the torch outputs on X_test.
+    """
+    output_names = horizon_output_names(horizons)
+    report = export_onnx_variants(_NamedOutputs(model), X_test, save_path,
+                                  output_names=output_names)
+    print(f"Saved multi-horizon ONNX model ({', '.join(output_names)}) to {save_path}.onnx.")
+    return report
+
+def main_multi_horizon(horizons: Tuple[int, ...] = (1, 5, 14, 30)):
+    """
+    Train and export the joint multi-horizon model
+    """
+    print(f"Starting multi-horizon model training ({horizons})...")
+    print("="*60)
+    
+    link, eth, crypto_symbol = download_crypto_data()
+    
+    def build():
+        X, Y, _, dates = build_multi_pair_dataset({crypto_symbol: link}, eth, horizons=horizons)
+        return X, Y, dates
+    
+    spec = feature_spec(build_multi_pair_dataset, split_multi_pair_dataset,
+                        pairs=[crypto_symbol], interval="1d", window=FEATURE_WINDOW,
+                        horizons=list(horizons), test_days=252)
+    X_train, X_test, Y_train, Y_test, _ = cached_dataset(
+        {crypto_symbol: link, "ETHUSDT": eth}, build,
+        lambda X, Y, dates: split_multi_pair_dataset(X, Y, dates, test_days=spec["test_days"]),
+        spec
+    )
+    
+    model = train_multi_horizon_model(X_train, X_test, Y_train, Y_test, horizons)
+    save_multi_horizon_onnx(model, X_test, horizons, "crypto_vol_model")
+    
+    return model, X_train, X_test, Y_train, Y_test
+
 def main():
     """
     Main function for crypto volatility model training
@@ -359,22 +1116,55 @@ def main():
     
     try:
         # Download data from exchange
-        link, eth = download_crypto_data()
+        link, eth, crypto_symbol = download_crypto_data()
+        
+        # Same pair name as serving uses for the symbol that was fetched
+        pair = f"{crypto_symbol}/ETHUSDT"
         
-        # Process data
-        X_train, X_test, Y_train, Y_test = process_crypto_data(link, eth)
+        with track_peak_memory("features"):
+            # Add features for new candles to the store shared with serving
+            store = FeatureStore()
+            prices = pd.merge(link[["Date", "Open"]], eth[["Date", "Open"]],
+                              on="Date", suffixes=("_crypto", "_eth")).dropna()
+            added = store.update(pair, "1d", prices["Date"],
+                                 prices["Open_eth"] / prices["Open_crypto"])
+            print(f"Feature store: {added} new candles for {pair}")
+            
+            # The arrays come from the store table, so that table is what the
+            # cache key hashes; an unchanged table and spec reuse the cached
+            # arrays (train/test are views)
+            table = store.read(pair, "1d")
+            # The spec values are what the build and split are called with,
+            # and their source is hashed along with the feature code
+            spec = feature_spec(FeatureStore.training_arrays, split_multi_pair_dataset,
+                                pair=pair, interval="1d", window=FEATURE_WINDOW,
+                                horizon=5, test_days=252)
+            X_train, X_test, Y_train, Y_test, _ = cached_dataset(
+                {pair: table},
+                lambda: store.training_arrays(pair, spec["interval"], horizon=spec["horizon"]),
+                lambda X, Y, dates: split_multi_pair_dataset(X, Y, dates, test_days=spec["test_days"]),
+                spec, columns=("Date", "price", *FEATURE_COLUMNS)
+            )
         
-        # Train model
-        model = train_volatility_model(X_train, X_test, Y_train, Y_test)
+        # Train model (tensors share memory with the arrays above)
+        with track_peak_memory("training"):
+            model = train_volatility_model(X_train, X_test, Y_train, Y_test)
         
-        # Save model
-        save_model_to_onnx(model, X_train, "crypto_vol_model")
+        # Compare against the closed-form estimators used as serving fallback
+        benchmark_closed_form(link, eth)
+        
+        # Export fp32/optimized/int8 variants, keep the fastest that matches torch
+        export_onnx_variants(model, X_test, "crypto_vol_model")
         
         print("\nTraining completed successfully!")
         print("Files created:")
         print("   • link_data.csv (or alternative crypto)")
         print("   • eth_data.csv") 
-        print("   • crypto_vol_model.onnx")
+        print("   • dataset_cache/<key>.npz (processed arrays)")
+        print("   • crypto_vol_model.pt (best training checkpoint)")
+        print("   • crypto_vol_model.onnx (selected variant)")
+        print("   • crypto_vol_model.{fp32,opt,int8}.onnx")
+        print("   • onnx_export_report.csv")
         
         return model, X_train, X_test, Y_train, Y_test
         
@@ -385,4 +1175,14 @@ def main():
         return None
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Train the crypto volatility model")
+    parser.add_argument("--horizons", type=int, nargs="+",
+                        help="Train one multi-horizon model, e.g. --horizons 1 5 14 30")
+    args = parser.parse_args()
+    
+    if args.horizons:
+        main_multi_horizon(tuple(args.horizons))
+    else:
+        main()
\ No newline at end of file
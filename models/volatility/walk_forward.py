@@ -0,0 +1,191 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import torch
+
+from train import (
+    build_multi_pair_dataset,
+    init_worker,
+    load_price_csv,
+    train_volatility_model,
+    worker_data,
+)
+from model_outputs import LEVEL_NAMES, VOLATILITY_LEVELS
+
+def make_folds(dates: np.ndarray, n_folds: int = 8, test_days: int = 63,
+               mode: str = "expanding", train_days: int = 504,
+               gap_days: int = 5) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Walk-forward (train, test) sample indices over the last n_folds * test_days dates
+
+    Args:
+        dates: Date of every sample (several pairs may share a date)
+        n_folds: Number of consecutive test windows
+        test_days: Dates per test window
+        mode: 'expanding' trains on all earlier dates, 'rolling' on the last
+              train_days of them
+        train_days: Training window length in rolling mode
+        gap_days: Dates dropped between train and test so targets that look
+                  ahead (realized vol `horizon` candles later) don't leak
+    """
+    if mode not in ("expanding", "rolling"):
+        raise ValueError(f"Unknown walk-forward mode: {mode}")
+
+    unique_dates = np.unique(dates)
+    date_pos = np.searchsorted(unique_dates, dates)
+    first_test = len(unique_dates) - n_folds * test_days
+    if first_test - gap_days < 100:
+        raise ValueError(f"Not enough history for {n_folds} folds of {test_days} days")
+
+    folds = []
+    for k in range(n_folds):
+        test_start = first_test + k * test_days
+        test_end = test_start + test_days
+        train_end = test_start - gap_days
+        train_start = 0 if mode == "expanding" else max(0, train_end - train_days)
+
+        train_idx = np.nonzero((date_pos >= train_start) & (date_pos < train_end))[0]
+        test_idx = np.nonzero((date_pos >= test_start) & (date_pos < test_end))[0]
+        folds.append((train_idx, test_idx))
+    return folds
+
+def batched_predict(model: torch.nn.Module, X: np.ndarray, batch_size: int = 4096) -> np.ndarray:
+    """
+    Run inference in fixed-size batches without building autograd graphs
+    """
+    model.eval()
+    out = np.empty(len(X), dtype=np.float32)
+    with torch.no_grad():
+        for start in range(0, len(X), batch_size):
+            batch = torch.from_numpy(X[start:start + batch_size])
+            out[start:start + batch_size] = model(batch).numpy().ravel()
+    return out
+
+def forecast_metrics(y_true: np.ndarray, y_pred: np.ndarray) -> Dict[str, float]:
+    """
+    RMSE, QLIKE and volatility-bucket hit rates
+
+    RMSE is in the DL_RMSE units used by train.py (volatility / 100). QLIKE
+    is computed on variances (vol squared). Hit rate is the share of samples
+    whose predicted LOW/MODERATE/HIGH/EXTREME bucket matches the realized
+    one, overall and per realized bucket.
+    """
+    y_true = y_true.astype(np.float64)
+    y_pred = y_pred.astype(np.float64)
+
+    metrics = {"RMSE": float(np.sqrt(np.mean(((y_true - y_pred) / 100) ** 2)))}
+
+    eps = 1e-8
+    ratio = np.maximum(y_true ** 2, eps) / np.maximum(y_pred ** 2, eps)
+    metrics["QLIKE"] = float(np.mean(ratio - np.log(ratio) - 1))
+
+    true_bucket = np.digitize(y_true, VOLATILITY_LEVELS)
+    pred_bucket = np.digitize(y_pred, VOLATILITY_LEVELS)
+    hits = true_bucket == pred_bucket
+    metrics["hit_rate"] = float(hits.mean())
+    for b, name in enumerate(LEVEL_NAMES):
+        in_bucket = true_bucket == b
+        metrics[f"hit_rate_{name}"] = float(hits[in_bucket].mean()) if in_bucket.any() else np.nan
+    return metrics
+
+def _run_fold(fold: int, train_idx: np.ndarray, test_idx: np.ndarray,
+              train_kwargs: Dict) -> Dict:
+    """Retrain on one fold's window and score its test window"""
+    X, Y, dates = worker_data()
+    torch.manual_seed(fold)
+
+    start = time.perf_counter()
+    model = train_volatility_model(
+        X[train_idx], X[test_idx], Y[train_idx], Y[test_idx],
+        checkpoint_path=None, verbose=False, **train_kwargs
+    )
+    predictions = batched_predict(model, X[test_idx])
+
+    return {
+        "fold": fold,
+        "train_start": dates[train_idx[0]],
+        "test_start": dates[test_idx[0]],
+        "test_end": dates[test_idx[-1]],
+        "train_samples": len(train_idx),
+        "test_samples": len(test_idx),
+        **forecast_metrics(Y[test_idx], predictions),
+        "seconds": time.perf_counter() - start,
+    }
+
+def walk_forward_evaluate(X: np.ndarray, Y: np.ndarray, dates: np.ndarray,
+                          n_folds: int = 8, test_days: int = 63,
+                          mode: str = "expanding", train_days: int = 504,
+                          gap_days: int = 5, max_workers: Optional[int] = None,
+                          threads_per_worker: int = 1,
+                          results_path: Optional[str] = "walk_forward_results.csv",
+                          **train_kwargs) -> pd.DataFrame:
+    """
+    Walk-forward backtest of the volatility model
+
+    Folds slice the same precomputed feature arrays (see
+    build_multi_pair_dataset()), so nothing is rebuilt between folds. Each
+    fold retrains a fresh model in its own process.
+
+    Args:
+        X, Y, dates: Feature matrix, targets and sample dates
+        n_folds, test_days, mode, train_days, gap_days: See make_folds()
+        max_workers: Worker processes (default: cores // threads_per_worker)
+        threads_per_worker: Torch threads in each worker
+        results_path: CSV file for per-fold metrics, None to skip
+        **train_kwargs: Passed to train_volatility_model() (epochs, batch_size, ...)
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    Y = np.ascontiguousarray(Y, dtype=np.float32)
+    folds = make_folds(dates, n_folds, test_days, mode, train_days, gap_days)
+
+    if max_workers is None:
+        max_workers = max(1, (os.cpu_count() or 1) // threads_per_worker)
+    max_workers = min(max_workers, len(folds))
+
+    print(f"Walk-forward ({mode}): {len(folds)} folds of {test_days} days "
+          f"on {max_workers} workers...")
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                             initializer=init_worker,
+                             initargs=(threads_per_worker, (X, Y, dates))) as pool:
+        futures = [
+            pool.submit(_run_fold, k, train_idx, test_idx, train_kwargs)
+            for k, (train_idx, test_idx) in enumerate(folds)
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            print("Fold {:2d} ({} to {}): RMSE={:.6f} QLIKE={:.4f} hit_rate={:.2%}".format(
+                result["fold"], pd.Timestamp(result["test_start"]).date(),
+                pd.Timestamp(result["test_end"]).date(),
+                result["RMSE"], result["QLIKE"], result["hit_rate"]))
+            results.append(result)
+
+    report = pd.DataFrame(results).sort_values("fold").reset_index(drop=True)
+    print(f"Walk-forward finished in {time.perf_counter() - start:.1f}s")
+    print("Mean RMSE={:.6f} QLIKE={:.4f} hit_rate={:.2%}".format(
+        report["RMSE"].mean(), report["QLIKE"].mean(), report["hit_rate"].mean()))
+
+    if results_path:
+        report.to_csv(results_path, index=False)
+        print(f"Saved fold metrics to {results_path}")
+    return report
+
+def main():
+    """
+    Walk-forward backtest on the stored LINK/ETH data
+    """
+    link = load_price_csv("link_data.csv")
+    eth = load_price_csv("eth_data.csv")
+    X, Y, _, dates = build_multi_pair_dataset({"LINKUSDT": link}, eth)
+    return walk_forward_evaluate(X, Y, dates)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The service and training modules are flat scripts imported by name
+sys.path.insert(0, os.path.join(ROOT, 'lipo_predict'))
+sys.path.insert(0, os.path.join(ROOT, 'models', 'volatility'))
+
+# Keep state files written at import time (main.py) out of the repo
+_STATE_DIR = tempfile.mkdtemp(prefix='lipo_tests_')
+for name, filename in [('FEATURE_STORE_DIR', 'feature_store'),
+                       ('HISTORY_PATH', 'prediction_history.npz'),
+                       ('PREDICTION_LOG_PATH', 'predictions.db'),
+                       ('PUBLISH_STATE_PATH', 'publish_state.json'),
+                       ('BINANCE_GOVERNOR_STATE', 'binance_weight.json'),
+                       ('DATASET_CACHE_DIR', 'dataset_cache')]:
+    os.environ.setdefault(name, os.path.join(_STATE_DIR, filename))
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from accuracy_monitor import MIN_SAMPLES, AccuracyMonitor, RollingErrorStats
+from feature_store import FeatureStore
+from model_outputs import volatility_levels
+
+DAY = 24 * 60 * 60
+PAIR = 'LINKUSDT/ETHUSDT'
+
+def test_rolling_stats_match_window_recomputation():
+    rng = np.random.default_rng(0)
+    predicted = rng.uniform(0.5, 12, 500)
+    realized = predicted + rng.normal(0.2, 1.0, 500)
+
+    stats = RollingErrorStats(window=60)
+    for t, (p, r) in enumerate(zip(predicted, realized)):
+        stats.add(p, r, t)
+
+    error = (predicted - realized)[-60:]
+    snapshot = stats.snapshot()
+    assert snapshot['samples'] == 60 and snapshot['matured_total'] == 500
+    assert snapshot['mae'] == pytest.approx(np.abs(error).mean())
+    assert snapshot['rmse'] == pytest.approx(np.sqrt((error ** 2).mean()))
+    assert snapshot['bias'] == pytest.approx(error.mean())
+    assert snapshot['reference_mae'] == pytest.approx(np.abs(predicted - realized).mean())
+    hits = volatility_levels(predicted[-60:]) == volatility_levels(realized[-60:])
+    assert snapshot['level_hit_rate'] == pytest.approx(hits.mean())
+
+def test_drift_alarms_need_enough_samples():
+    stats = RollingErrorStats(window=50)
+    for t in range(MIN_SAMPLES - 1):
+        stats.add(5.0, 3.0, t)
+    assert not stats.snapshot(baseline_mae=0.5)['drift']
+
+    stats.add(5.0, 3.0, MIN_SAMPLES)
+    snapshot = stats.snapshot(baseline_mae=0.5)
+    assert snapshot['mae_drift'] and snapshot['drift']
+
+def test_bias_alarm_on_one_sided_errors():
+    rng = np.random.default_rng(1)
+    stats = RollingErrorStats(window=100)
+    for t in range(100):
+        stats.add(3.0 + rng.normal(1.0, 0.1), 3.0, t)
+    snapshot = stats.snapshot(baseline_mae=10.0)
+    assert snapshot['bias_drift'] and not snapshot['mae_drift']
+
+def test_monitor_joins_forecasts_with_realized_values():
+    monitor = AccuracyMonitor(horizon=5, candle_seconds=DAY, window=10)
+    monitor.record_prediction(PAIR, 0, 4.0)
+    monitor.record_prediction(PAIR, DAY, 5.0)
+
+    # Candle 5 realizes the forecast made on candle 0
+    assert not monitor.observe_realized(PAIR, 4 * DAY, 3.0)
+    assert monitor.observe_realized(PAIR, 5 * DAY, 3.0)
+    assert not monitor.observe_realized(PAIR, 5 * DAY, 3.0)
+
+    metrics = monitor.metrics()[PAIR]
+    assert metrics['samples'] == 1 and metrics['mae'] == pytest.approx(1.0)
+    assert metrics['pending'] == 1
+
+    # Skipping past a forecast's target drops it
+    assert not monitor.observe_realized(PAIR, 8 * DAY, 3.0)
+    assert monitor.metrics()[PAIR]['pending'] == 0
+    assert not monitor.observe_realized(PAIR, 9 * DAY, float('nan'))
+
+def test_candles_written_by_another_store_mature_forecasts(tmp_path):
+    worker = FeatureStore(str(tmp_path))
+    trainer = FeatureStore(str(tmp_path))
+    dates = pd.date_range('2024-01-01', periods=30)
+    price = np.exp(np.cumsum(np.random.default_rng(2).normal(0, 0.02, 30)))
+
+    worker.update(PAIR, '1d', dates[:20], price[:20])
+    monitor = AccuracyMonitor(horizon=5, candle_seconds=DAY, window=10)
+    forecast_at = int(dates[19].timestamp())
+    monitor.record_prediction(PAIR, forecast_at, 4.0)
+    monitor.record_prediction(PAIR, int(dates[29].timestamp()), 4.0)
+
+    # The trainer stores the target candle first; the worker adds nothing
+    trainer.update(PAIR, '1d', dates, price)
+    assert worker.update(PAIR, '1d', dates, price) == 0
+
+    table = worker.read(PAIR, '1d')
+    timestamps = table['Date'].to_numpy().astype('datetime64[s]').astype(np.int64)
+    assert monitor.mature(PAIR, timestamps, table['realized_vol'].to_numpy()) == 1
+
+    metrics = monitor.metrics()[PAIR]
+    realized = table['realized_vol'].iloc[24]
+    assert metrics['samples'] == 1 and metrics['mae'] == pytest.approx(abs(4.0 - realized))
+    assert metrics['pending'] == 1   # the newest forecast's target is not stored yet
+    assert monitor.mature(PAIR, timestamps, table['realized_vol'].to_numpy()) == 0
@@ -0,0 +1,134 @@
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from admission import AdmissionController, Deadline, DeadlineExceeded, Overloaded
+
+def test_deadline_caps_timeouts_and_expires():
+    deadline = Deadline(0.2)
+    assert deadline.timeout(10, 'fetch') <= 0.2
+    assert deadline.timeout(0.05, 'fetch') == 0.05
+    time.sleep(0.25)
+    assert deadline.expired and deadline.remaining() == 0.0
+    with pytest.raises(DeadlineExceeded):
+        deadline.timeout(10, 'fetch')
+
+def hold_slots(controller, n):
+    """Occupy n slots until the returned event is set"""
+    release, started = threading.Event(), threading.Barrier(n + 1)
+
+    def worker():
+        with controller.admit():
+            started.wait()
+            release.wait()
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    started.wait()
+    return release, threads
+
+def test_rejects_when_queue_is_full():
+    controller = AdmissionController(max_concurrent=1, max_queue=0, queue_seconds=1.0)
+    release, threads = hold_slots(controller, 1)
+    try:
+        started = time.monotonic()
+        with pytest.raises(Overloaded):
+            with controller.admit():
+                pass
+        assert time.monotonic() - started < 0.5   # rejected without waiting
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+    assert controller.stats()['rejected'] == 1
+    assert controller.retry_after() >= 1
+
+def test_queued_request_gives_up_after_queue_seconds():
+    controller = AdmissionController(max_concurrent=1, max_queue=1, queue_seconds=0.1)
+    release, threads = hold_slots(controller, 1)
+    try:
+        with pytest.raises(Overloaded):
+            with controller.admit():
+                pass
+    finally:
+        release.set()
+        for thread in threads:
+            thread.join()
+
+    # A slot frees up again once the holder leaves
+    with controller.admit() as deadline:
+        assert not deadline.expired
+    stats = controller.stats()
+    assert stats['running'] == 0 and stats['waiting'] == 0 and stats['admitted'] == 2
+
+def test_expired_deadline_falls_back_to_closed_form(monkeypatch):
+    main = pytest.importorskip('main')
+    dates = pd.date_range('2024-01-01', periods=40)
+    rng = np.random.default_rng(0)
+    crypto = pd.DataFrame({'Date': dates, 'Open': np.exp(np.cumsum(rng.normal(0, 0.03, 40)))})
+    eth = pd.DataFrame({'Date': dates, 'Open': np.full(40, 2000.0)})
+
+    deadline = Deadline(0.05)
+
+    def slow_fetch(days, deadline):
+        time.sleep(0.1)
+        return crypto, eth, 'LINKUSDT/ETHUSDT'
+
+    def no_inference(*args):
+        raise AssertionError("inference ran after the deadline")
+
+    monkeypatch.setattr(main, 'get_crypto_pair_data', slow_fetch)
+    monkeypatch.setattr(main, 'make_prediction', no_inference)
+    result = main.run_prediction(30, deadline)
+
+    assert result['degraded'] and result['fallback_reason'] == 'deadline'
+    assert np.isfinite(result['predicted_volatility_5d'])
+
+class TricklingResponse:
+    """Stand-in for a streamed response whose body arrives slowly"""
+
+    def __init__(self, chunks, delay):
+        self.chunks, self.delay, self.closed = chunks, delay, False
+
+    def iter_content(self, size):
+        for chunk in self.chunks:
+            time.sleep(self.delay)
+            yield chunk
+
+    def close(self):
+        self.closed = True
+
+def test_slow_body_is_abandoned_at_the_deadline():
+    main = pytest.importorskip('main')
+    response = TricklingResponse([b'x'] * 100, delay=0.02)
+    with pytest.raises(DeadlineExceeded):
+        main.read_body(response, Deadline(0.1), 'fetching LINKUSDT')
+    assert response.closed
+
+    assert main.read_body(TricklingResponse([b'[', b']'], 0.0), Deadline(1.0), 'fetch') == b'[]'
+
+def test_http_timeout_shrinks_by_the_governor_wait(monkeypatch, tmp_path):
+    main = pytest.importorskip('main')
+    import rate_limit
+    from state_file import update_json_state
+
+    governor = rate_limit.BinanceRateGovernor(state_path=str(tmp_path / 'weight.json'))
+    governor.acquire(0)
+    update_json_state(governor.state_path,
+                      lambda state: state.update(banned_until=time.time() + 0.3))
+    monkeypatch.setattr(main, 'governor', governor)
+
+    timeouts = []
+
+    def fake_get(url, params=None, timeout=None, stream=False):
+        timeouts.append(timeout)
+        raise rate_limit.requests.exceptions.ConnectionError("offline")
+
+    monkeypatch.setattr(rate_limit.requests, 'get', fake_get)
+    with pytest.raises(Exception):
+        main.get_crypto_data('LINKUSDT', 30, Deadline(1.0))
+    assert timeouts and timeouts[0] <= 0.75
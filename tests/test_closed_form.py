@@ -0,0 +1,141 @@
+import numpy as np
+import pytest
+
+from closed_form import (
+    _garch_nll, ewma_variance, ewma_variance_series, fallback_volatility, fit_garch,
+    garch_variance_forecast, garch_variance_series, garman_klass_volatility,
+    parkinson_volatility,
+)
+
+def random_returns(n=300, seed=0):
+    return np.random.default_rng(seed).normal(0, 2.0, n)
+
+def garch_returns(n=2000, params=(0.1, 0.1, 0.85), seed=0):
+    """Returns simulated from a GARCH(1,1) process"""
+    omega, alpha, beta = params
+    rng = np.random.default_rng(seed)
+    h = omega / (1 - alpha - beta)
+    out = np.empty(n)
+    for t in range(n):
+        out[t] = np.sqrt(h) * rng.standard_normal()
+        h = omega + alpha * out[t] ** 2 + beta * h
+    return out
+
+def loop_garch_nll(r2, omega, alpha, beta, var0):
+    h, nll = var0, 0.0
+    for x in r2:
+        nll += np.log(h) + x / h
+        h = omega + alpha * x + beta * h
+    return 0.5 * nll
+
+def test_ewma_variance_matches_loop():
+    r = random_returns()
+    lam = 0.94
+    num = den = 0.0
+    for t, x in enumerate(r):
+        weight = lam ** (len(r) - 1 - t)
+        num += weight * x ** 2
+        den += weight
+    assert ewma_variance(r, lam) == pytest.approx(num / den, rel=1e-12)
+
+    # Column-wise on (time x pairs)
+    pairs = np.column_stack([r, random_returns(seed=1)])
+    np.testing.assert_allclose(ewma_variance(pairs, lam),
+                               [ewma_variance(pairs[:, 0], lam), ewma_variance(pairs[:, 1], lam)])
+
+def test_ewma_variance_series_matches_loop():
+    r = random_returns()
+    var = np.mean(r[:20] ** 2)
+    expected = []
+    for x in r:
+        var = 0.94 * var + 0.06 * x ** 2
+        expected.append(var)
+    np.testing.assert_allclose(ewma_variance_series(r), expected, rtol=1e-12)
+
+def test_vectorised_likelihood_matches_loop():
+    r2 = random_returns() ** 2
+    omega = np.array([0.1, 0.2, 0.05])
+    alpha = np.array([0.05, 0.1, 0.2])
+    beta = np.array([0.9, 0.8, 0.75])
+    var0 = r2.mean()
+    expected = [loop_garch_nll(r2, o, a, b, var0) for o, a, b in zip(omega, alpha, beta)]
+    np.testing.assert_allclose(_garch_nll(r2, omega, alpha, beta, var0), expected, rtol=1e-12)
+
+def test_garch_grid_fit_matches_brute_force():
+    r = garch_returns()
+    r2 = (r - r.mean()) ** 2
+    var = r2.mean()
+
+    # Same grid as fit_garch's first pass, searched one candidate at a time
+    best, best_nll = None, np.inf
+    for persistence in np.linspace(0.80, 0.999, 10):
+        for alpha in np.linspace(0.01, 0.30, 10):
+            if alpha >= persistence:
+                continue
+            nll = loop_garch_nll(r2, var * (1 - persistence), alpha, persistence - alpha, var)
+            if nll < best_nll:
+                best, best_nll = (var * (1 - persistence), alpha, persistence - alpha), nll
+
+    np.testing.assert_allclose(fit_garch(r, grid=10, refinements=0), best, rtol=1e-12)
+
+    # Refining the grid never does worse, and lands near the true parameters
+    omega, alpha, beta = fit_garch(r, grid=10, refinements=2)
+    assert loop_garch_nll(r2, omega, alpha, beta, var) <= best_nll
+    assert alpha == pytest.approx(0.1, abs=0.05)
+    assert alpha + beta == pytest.approx(0.95, abs=0.05)
+
+def test_garch_variance_matches_loop():
+    r = garch_returns(500)
+    params = omega, alpha, beta = (0.1, 0.1, 0.85)
+    centred = r - r.mean()
+    h = centred.var()
+    one_step = []
+    for x in centred:
+        h = omega + alpha * x ** 2 + beta * h
+        one_step.append(h)
+
+    np.testing.assert_allclose(garch_variance_series(r, params, horizon=1), one_step, rtol=1e-12)
+
+    # Multi-step forecasts revert to the long-run variance
+    long_run = omega / (1 - alpha - beta)
+    expected = [long_run + (alpha + beta) ** k * (one_step[-1] - long_run) for k in range(5)]
+    np.testing.assert_allclose(garch_variance_forecast(r, params, horizon=5), expected, rtol=1e-12)
+    assert garch_variance_series(r, params, horizon=5)[-1] == pytest.approx(np.mean(expected))
+
+# Every candle: high 2% above low, close 1% above open
+OHLC = {
+    'open': np.full(8, 100.0),
+    'high': np.full(8, 100.0 * np.exp(0.015)),
+    'low': np.full(8, 100.0 * np.exp(-0.005)),
+    'close': np.full(8, 100.0 * np.exp(0.01)),
+}
+
+def test_parkinson_on_fixture():
+    vol = parkinson_volatility(OHLC['high'], OHLC['low'], window=5)
+    assert np.isnan(vol[:4]).all()
+    np.testing.assert_allclose(vol[4:], 100 * 0.02 / np.sqrt(4 * np.log(2)))
+
+def test_garman_klass_on_fixture():
+    vol = garman_klass_volatility(OHLC['open'], OHLC['high'], OHLC['low'], OHLC['close'], window=5)
+    assert np.isnan(vol[:4]).all()
+    expected = 100 * np.sqrt(0.5 * 0.02 ** 2 - (2 * np.log(2) - 1) * 0.01 ** 2)
+    np.testing.assert_allclose(vol[4:], expected)
+
+def test_fallback_method_switch():
+    r = garch_returns(300)
+    assert fallback_volatility(r, 'ewma') == pytest.approx(np.sqrt(ewma_variance(r)))
+
+    params = fit_garch(r, grid=15, refinements=1)
+    expected = np.sqrt(garch_variance_forecast(r, params, 5).mean())
+    assert fallback_volatility(r, 'garch', horizon=5) == pytest.approx(expected)
+
+    with pytest.raises(ValueError):
+        fallback_volatility(r, 'parkinson')
+
+def test_fallback_ignores_missing_returns():
+    r = random_returns(50)
+    gappy = np.concatenate([[np.nan], r[:20], [np.inf], r[20:]])
+    assert fallback_volatility(gappy) == pytest.approx(fallback_volatility(r))
+
+    with pytest.raises(ValueError):
+        fallback_volatility([1.0, np.nan, 2.0, 0.5, np.nan])
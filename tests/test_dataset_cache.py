@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dataset_cache import cached_dataset, dataset_key, feature_spec
+from feature_store import FEATURE_COLUMNS, FeatureStore
+
+PAIR = 'LINKUSDT/ETHUSDT'
+STORE_COLUMNS = ('Date', 'price', *FEATURE_COLUMNS)
+
+def candles(n=30, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({'Date': pd.date_range('2024-01-01', periods=n),
+                         'Open': np.exp(np.cumsum(rng.normal(0, 0.02, n)))})
+
+def test_key_depends_on_candles_and_spec():
+    spec = feature_spec(window=5, horizon=5)
+    key = dataset_key({'LINKUSDT': candles()}, spec)
+
+    assert dataset_key({'LINKUSDT': candles()}, spec) == key
+    assert dataset_key({'LINKUSDT': candles(seed=1)}, spec) != key
+    assert dataset_key({'LINKUSDT': candles(31)}, spec) != key
+    assert dataset_key({'LINKUSDT': candles()}, feature_spec(window=5, horizon=3)) != key
+
+def test_spec_hashes_build_and_split_source():
+    def split(X, Y, dates):
+        return X[:8], X[8:], Y[:8], Y[8:]
+
+    def other_split(X, Y, dates):
+        return X[:9], X[9:], Y[:9], Y[9:]
+
+    base = feature_spec(window=5)
+    with_split = feature_spec(split, window=5)
+    assert with_split['feature_code'] != base['feature_code']
+    assert feature_spec(other_split, window=5)['feature_code'] != with_split['feature_code']
+    assert feature_spec(FeatureStore.training_arrays, split, window=5)['feature_code'] \
+        != with_split['feature_code']
+
+def test_key_follows_store_contents(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    data = candles(40)
+    spec = feature_spec(pair=PAIR, window=5)
+
+    store.update(PAIR, '1d', data['Date'][:30], data['Open'][:30])
+    key = dataset_key({PAIR: store.read(PAIR, '1d')}, spec, STORE_COLUMNS)
+
+    # Candles merged in from elsewhere (a backfill, another run) change the key
+    store.update(PAIR, '1d', data['Date'], data['Open'])
+    grown = dataset_key({PAIR: store.read(PAIR, '1d')}, spec, STORE_COLUMNS)
+    assert grown != key
+
+    corrected = data['Open'].to_numpy().copy()
+    corrected[10] *= 1.01
+    store.update(PAIR, '1d', data['Date'], corrected)
+    assert dataset_key({PAIR: store.read(PAIR, '1d')}, spec, STORE_COLUMNS) not in (key, grown)
+
+def test_cached_dataset_builds_once(tmp_path):
+    calls = []
+
+    def build():
+        calls.append(1)
+        X = np.arange(20, dtype=np.float32).reshape(10, 2)
+        return X, X[:, 0], pd.date_range('2024-01-01', periods=10).to_numpy()
+
+    def split(X, Y, dates):
+        return X[:8], X[8:], Y[:8], Y[8:]
+
+    spec = feature_spec(window=5)
+    first = cached_dataset({'LINKUSDT': candles()}, build, split, spec, str(tmp_path))
+    second = cached_dataset({'LINKUSDT': candles()}, build, split, spec, str(tmp_path))
+
+    assert len(calls) == 1
+    assert first[-1] == second[-1]
+    for a, b in zip(first[:4], second[:4]):
+        np.testing.assert_array_equal(a, b)
+
+    cached_dataset({'LINKUSDT': candles(seed=1)}, build, split, spec, str(tmp_path))
+    assert len(calls) == 2
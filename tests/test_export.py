@@ -0,0 +1,77 @@
+import csv
+import functools
+import io
+import json
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import export
+from export import EXPORT_COLUMNS, export_records, pa, stream_export
+from feature_store import FeatureStore
+from prediction_log import PredictionLog, PredictionLogReader
+
+PAIR = 'LINKUSDT/ETHUSDT'
+
+def prediction(predicted, **extra):
+    return {'predicted_volatility_5d': 2.5, 'predicted_volatility': predicted,
+            'trading_pair': PAIR, 'features': {'realized_vol': float('nan'), 'returns_squared': 0.1},
+            'degraded': False, 'candle_timestamp': 1700000000, **extra}
+
+def records():
+    return [prediction({'5d': 2.5}),
+            prediction({'1d': 1.0, '5d': 2.5, '14d': float('inf')}, latency_ms={'total': 12.0})]
+
+def test_ndjson_lines_are_strict_json():
+    lines = ''.join(stream_export(records(), 'ndjson')).splitlines()
+    parsed = [json.loads(line, parse_constant=pytest.fail) for line in lines]
+    assert parsed[0]['features']['realized_vol'] is None
+    assert parsed[1]['predicted_volatility'] == {'1d': 1.0, '5d': 2.5, '14d': None}
+
+def test_csv_has_fixed_columns_for_every_row():
+    text = ''.join(stream_export(records(), 'csv'))
+    rows = list(csv.DictReader(io.StringIO(text)))
+
+    assert list(rows[0]) == [name for name, _ in EXPORT_COLUMNS['predictions']]
+    assert len(rows) == 2
+    # Horizons the first record lacks are not dropped from later ones
+    assert json.loads(rows[1]['predicted_volatility']) == {'1d': 1.0, '5d': 2.5, '14d': None}
+    assert rows[0]['features.realized_vol'] == ''
+    assert rows[1]['latency_ms.total'] == '12.0' and rows[0]['latency_ms.total'] == ''
+
+def test_empty_csv_export_is_header_only():
+    text = ''.join(stream_export([], 'csv', 'features'))
+    assert text.strip() == ','.join(name for name, _ in EXPORT_COLUMNS['features'])
+
+@pytest.mark.skipif(pa is None, reason="pyarrow not installed")
+def test_arrow_schema_comes_from_the_result_shape():
+    data = b''.join(stream_export(records(), 'arrow'))
+    table = pa.ipc.open_stream(data).read_all()
+    assert table.schema.names == [name for name, _ in EXPORT_COLUMNS['predictions']]
+    assert table.column('features.realized_vol').null_count == 2
+    assert table.column('latency_ms.total').to_pylist() == [None, 12.0]
+
+def test_feature_export_uses_iso_timestamps(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    dates = pd.date_range('2024-01-01', periods=10)
+    store.update(PAIR, '1d', dates, np.linspace(1.0, 1.2, 10))
+
+    lines = ''.join(stream_export(export_records('features', store=store, pair=PAIR),
+                                  'ndjson', 'features')).splitlines()
+    first = json.loads(lines[0])
+    assert first['date'] == '2024-01-01T00:00:00'
+    assert first['realized_vol'] is None
+    assert len(lines) == 10
+
+def test_prediction_export_reads_without_a_writer(tmp_path, monkeypatch):
+    log = PredictionLog(str(tmp_path / 'predictions.db'))
+    log.log({'predicted_volatility_5d': 2.0, 'trading_pair': PAIR}, timestamp=1000)
+    log.close()
+    monkeypatch.setattr(export, 'PredictionLogReader', functools.partial(PredictionLogReader, log.path))
+
+    threads = threading.active_count()
+    lines = ''.join(stream_export(export_records('predictions'), 'ndjson')).splitlines()
+    assert json.loads(lines[0])['predicted_volatility_5d'] == 2.0
+    assert threading.active_count() == threads
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from feature_store import FEATURE_COLUMNS, FeatureStore, compute_features
+
+PAIR = 'LINKUSDT/ETHUSDT'
+
+@pytest.fixture
+def store(tmp_path):
+    return FeatureStore(str(tmp_path))
+
+def random_prices(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+def stored_features(store):
+    return store.read(PAIR, '1d')[FEATURE_COLUMNS].to_numpy()
+
+def test_update_appends_new_candles(store):
+    dates = pd.date_range('2024-01-01', periods=40)
+    price = random_prices(40)
+
+    assert store.update(PAIR, '1d', dates[:30], price[:30]) == 30
+    assert store.update(PAIR, '1d', dates[25:], price[25:]) == 10
+    assert store.update(PAIR, '1d', dates, price) == 0
+
+    np.testing.assert_allclose(stored_features(store), compute_features(price))
+
+def test_backfill_merges_older_history(store):
+    dates = pd.date_range('2024-01-01', periods=40)
+    price = random_prices(40)
+
+    store.update(PAIR, '1d', dates[30:], price[30:])
+    assert store.update(PAIR, '1d', dates, price) == 30
+
+    table = store.read(PAIR, '1d')
+    assert len(table) == 40
+    assert table['Date'].is_monotonic_increasing
+    np.testing.assert_allclose(stored_features(store), compute_features(price))
+
+    # Persisted, not only cached
+    np.testing.assert_allclose(stored_features(FeatureStore(store.root)), compute_features(price))
+
+def test_changed_price_recomputes_affected_windows(store):
+    dates = pd.date_range('2024-01-01', periods=40)
+    price = random_prices(40)
+    store.update(PAIR, '1d', dates, price)
+
+    corrected = price.copy()
+    corrected[20] *= 1.1
+    assert store.update(PAIR, '1d', dates[15:25], corrected[15:25]) == 0
+    np.testing.assert_allclose(stored_features(store), compute_features(corrected))
+
+def test_windows_do_not_span_gaps(store):
+    before = pd.date_range('2024-01-01', periods=20)
+    after = pd.date_range('2024-02-01', periods=10)
+    price = random_prices(30)
+
+    store.update(PAIR, '1d', before, price[:20])
+    store.update(PAIR, '1d', after, price[20:])
+
+    features = stored_features(store)
+    np.testing.assert_allclose(features[20:], compute_features(price[20:]))
+    assert np.isnan(features[20:25, 0]).all()
+
+    # Filling the gap makes the series contiguous again
+    gap = pd.date_range('2024-01-21', '2024-01-31')
+    gap_price = np.linspace(price[19], price[20], len(gap) + 2)[1:-1]
+    assert store.update(PAIR, '1d', gap, gap_price) == len(gap)
+    np.testing.assert_allclose(stored_features(store),
+                               compute_features(np.concatenate([price[:20], gap_price, price[20:]])),
+                               atol=1e-8)
+
+def test_latest_requires_warm_window(store):
+    dates = pd.date_range('2024-01-01', periods=3)
+    store.update(PAIR, '1d', dates, random_prices(3))
+    with pytest.raises(ValueError):
+        store.latest(PAIR, '1d')
+
+def test_training_target_does_not_cross_gaps(store):
+    before = pd.date_range('2024-01-01', periods=60)
+    after = pd.date_range('2024-04-01', periods=60)
+    store.update(PAIR, '1d', before.append(after), random_prices(120))
+
+    X, Y, dates = store.training_arrays(PAIR, '1d', horizon=5)
+    dates = pd.DatetimeIndex(dates)
+    table = store.read(PAIR, '1d').set_index('Date')
+    for date, y in zip(dates, Y):
+        assert y == pytest.approx(table.loc[date + pd.Timedelta(days=5), 'realized_vol'], rel=1e-6)
+
+    # Rows before the gap are kept, but the last 5 have no candle 5 days ahead
+    assert (dates <= before[-6]).any()
+    assert not ((dates > before[-6]) & (dates <= before[-1])).any()
+    assert dates[-1] == after[-6]
@@ -0,0 +1,56 @@
+import numpy as np
+
+from history import PredictionHistory, iter_records
+
+def record(t, pair='LINKUSDT/ETHUSDT'):
+    return {'timestamp': float(t), 'candle_timestamp': int(t), 'pair': pair,
+            'predicted_vol': t / 10, 'engine': 'onnx'}
+
+def timestamps(segments):
+    return [r['timestamp'] for r in iter_records(segments)]
+
+def test_buffer_wraps_and_keeps_newest_rows():
+    history = PredictionHistory(capacity=5, path=None)
+    for t in range(12):
+        history.append(record(t))
+
+    assert len(history) == 5
+    segments = history.query()
+    assert len(segments) == 2   # the range wraps around the end of the array
+    assert timestamps(segments) == [7.0, 8.0, 9.0, 10.0, 11.0]
+
+    assert timestamps(history.query(since=8, until=11)) == [8.0, 9.0, 10.0]
+    assert timestamps(history.query(limit=3)) == [9.0, 10.0, 11.0]
+    assert timestamps(history.query(until=7)) == []
+
+def test_pair_filter_and_limit():
+    history = PredictionHistory(capacity=6, path=None)
+    for t in range(10):
+        history.append(record(t, 'UNIUSDT/ETHUSDT' if t % 2 else 'LINKUSDT/ETHUSDT'))
+    assert timestamps(history.query(pair='UNIUSDT/ETHUSDT')) == [5.0, 7.0, 9.0]
+    assert timestamps(history.query(pair='UNIUSDT/ETHUSDT', limit=2)) == [7.0, 9.0]
+
+def test_query_results_survive_later_appends():
+    history = PredictionHistory(capacity=3, path=None)
+    for t in range(3):
+        history.append(record(t))
+    segments = history.query()
+    for t in range(3, 6):
+        history.append(record(t))
+    assert timestamps(segments) == [0.0, 1.0, 2.0]
+
+def test_snapshot_round_trip_and_single_writer(tmp_path):
+    path = str(tmp_path / 'history.npz')
+    history = PredictionHistory(capacity=4, path=path, persist_seconds=0)
+    for t in range(6):
+        history.append(record(t))
+
+    # A second instance loads the snapshot but does not write it
+    other = PredictionHistory(capacity=4, path=path)
+    assert timestamps(other.query()) == [2.0, 3.0, 4.0, 5.0]
+    other.append(record(99))
+    other.persist()
+
+    reloaded = PredictionHistory(capacity=2, path=path)
+    assert timestamps(reloaded.query()) == [4.0, 5.0]
+    assert np.isclose(reloaded.query()[0]['predicted_vol'][0], 0.4)
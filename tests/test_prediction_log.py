@@ -0,0 +1,95 @@
+import json
+import sqlite3
+import threading
+from contextlib import closing
+
+import pytest
+
+from prediction_log import PredictionLog, PredictionLogReader
+
+PAIR = 'LINKUSDT/ETHUSDT'
+DAY = 86400
+
+def result(vol, pair=PAIR, degraded=False, total_ms=10.0):
+    return {'predicted_volatility_5d': vol, 'predicted_volatility': {'5d': vol},
+            'trading_pair': pair, 'features': {'realized_vol': 1.0, 'returns_squared': 0.5},
+            'volatility_level': 'LOW', 'engine': 'ewma' if degraded else 'onnx',
+            'degraded': degraded, 'candle_timestamp': 0,
+            'latency_ms': {'fetch': 1.0, 'features': 1.0, 'inference': 1.0, 'total': total_ms}}
+
+@pytest.fixture
+def log(tmp_path):
+    log = PredictionLog(str(tmp_path / 'predictions.db'), batch_size=3, flush_seconds=0.05)
+    yield log
+    log.close()
+
+def test_rows_are_written_in_batches(log):
+    for k in range(7):
+        log.log(result(1.0 + k), timestamp=1000 + k)
+    log.flush()
+
+    assert log.written == 7 and log.dropped == 0
+    rows = log.query()
+    assert [row['timestamp'] for row in rows] == [1006 - k for k in range(7)]
+    assert json.loads(rows[0]['predicted_json']) == {'5d': 7.0}
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    log = PredictionLog(str(tmp_path / 'predictions.db'), queue_size=2)
+    log.close()   # no writer draining the queue
+    for k in range(5):
+        log.log(result(1.0), timestamp=k)
+    assert log.dropped == 3
+
+def test_counters_are_exact_under_concurrency(tmp_path):
+    log = PredictionLog(str(tmp_path / 'predictions.db'), queue_size=1)
+    log.close()
+    log.log(result(1.0), timestamp=0)
+
+    def spam():
+        for k in range(2000):
+            log.log(result(1.0), timestamp=k)
+
+    threads = [threading.Thread(target=spam) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert log.dropped == 8000
+
+def test_query_filters_by_time_and_pair(log):
+    for k in range(6):
+        log.log(result(1.0, pair=PAIR if k % 2 else 'UNIUSDT/ETHUSDT'), timestamp=1000 + k)
+    log.flush()
+
+    assert [r['timestamp'] for r in log.query(since=1002, until=1005)] == [1004, 1003, 1002]
+    assert [r['timestamp'] for r in log.query(pair=PAIR, limit=2)] == [1005, 1003]
+    assert [r['timestamp'] for r in log.iter_rows(pair=PAIR, chunk_size=1)] == [1001, 1003, 1005]
+
+def test_aggregate_per_pair_and_bucket(log):
+    log.log(result(1.0, total_ms=10.0), timestamp=DAY + 1)
+    log.log(result(3.0, degraded=True, total_ms=30.0), timestamp=DAY + 2)
+    log.log(result(5.0), timestamp=2 * DAY + 1)
+    log.log(result(7.0, pair='UNIUSDT/ETHUSDT'), timestamp=DAY + 3)
+    log.flush()
+
+    buckets = log.aggregate(bucket_seconds=DAY)
+    assert [(b['pair'], b['bucket'], b['predictions']) for b in buckets] == [
+        (PAIR, DAY, 2), (PAIR, 2 * DAY, 1), ('UNIUSDT/ETHUSDT', DAY, 1)]
+    first = buckets[0]
+    assert first['mean_vol'] == pytest.approx(2.0)
+    assert (first['min_vol'], first['max_vol'], first['degraded']) == (1.0, 3.0, 1)
+    assert first['mean_total_ms'] == pytest.approx(20.0) and first['max_total_ms'] == 30.0
+
+def test_reader_is_read_only(log):
+    log.log(result(2.0), timestamp=1000)
+    log.flush()
+
+    reader = PredictionLogReader(log.path)
+    assert [r['predicted_vol'] for r in reader.query()] == [2.0]
+    assert not hasattr(reader, '_writer')
+    with pytest.raises(sqlite3.OperationalError):
+        with closing(reader._connect()) as conn:
+            conn.execute('DELETE FROM predictions')
+
+    with pytest.raises(ValueError):
+        PredictionLogReader(log.path + '.missing')
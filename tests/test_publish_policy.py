@@ -0,0 +1,83 @@
+import json
+import time
+
+import pytest
+
+from publish_policy import (
+    ConfirmationRejected, PublishPolicy, abi_encode_uint256, scale_volatility,
+    sign_confirmation, verify_confirmation
+)
+
+@pytest.fixture
+def policy(tmp_path):
+    return PublishPolicy(deviation_bps=500, heartbeat=3300,
+                         state_path=str(tmp_path / 'state.json'), pending_seconds=300)
+
+def test_first_value_is_published(policy):
+    decision = policy.propose(2.5, now=1000)
+    assert decision['publish'] and decision['reason'] == 'initial'
+    assert decision['payload'] == '0x' + abi_encode_uint256(2_500_000).hex()
+
+def test_decision_by_deviation_and_heartbeat(policy):
+    policy.confirm(scale_volatility(2.0), now=1000)
+
+    assert policy.should_publish(2.05, now=1100)['reason'] == 'within_threshold'
+    moved = policy.should_publish(2.2, now=1100)
+    assert moved['reason'] == 'deviation' and moved['deviation_bps'] == pytest.approx(1000)
+    assert policy.should_publish(2.05, now=1000 + 3300)['reason'] == 'heartbeat'
+
+def test_deviation_from_zero_is_json_safe(policy):
+    policy.confirm(0, now=1000)
+    decision = policy.should_publish(1.0, now=1100)
+    assert decision['publish'] and decision['deviation_bps'] is None
+    json.dumps(decision, allow_nan=False)
+
+def test_publish_recorded_only_on_confirm(policy):
+    first = policy.propose(2.0, now=1000)
+    assert first['publish']
+    assert 'scaled_volatility' not in policy.last_published()
+
+    # Unconfirmed proposal holds off duplicates until it expires
+    assert policy.propose(2.0, now=1100)['reason'] == 'pending'
+    assert policy.propose(2.0, now=1300)['publish']
+
+    state = policy.confirm(first['scaled_volatility'], now=1400)
+    assert state['published_at'] == 1400 and 'pending' not in state
+    assert policy.propose(2.0, now=1500)['reason'] == 'within_threshold'
+
+def signed(payload, secret='s3cret'):
+    body = json.dumps(payload).encode()
+    return body, sign_confirmation(body, secret)
+
+def test_confirmation_needs_a_valid_fresh_signature():
+    body, signature = signed({'scaled_volatility': 2_000_000, 'timestamp': 1000})
+    assert verify_confirmation(body, signature, 's3cret', now=1010)['scaled_volatility'] == 2_000_000
+
+    with pytest.raises(ConfirmationRejected):
+        verify_confirmation(body, signature, '', now=1010)              # not configured
+    with pytest.raises(ConfirmationRejected):
+        verify_confirmation(body, None, 's3cret', now=1010)             # unsigned
+    with pytest.raises(ConfirmationRejected):
+        verify_confirmation(body, signature, 'other', now=1010)         # wrong secret
+    with pytest.raises(ConfirmationRejected):
+        verify_confirmation(body, signature, 's3cret', now=1000 + 3600)  # replayed later
+    tampered = body.replace(b'2000000', b'9000000')
+    with pytest.raises(ConfirmationRejected):
+        verify_confirmation(tampered, signature, 's3cret', now=1010)
+
+def test_confirm_endpoint_rejects_unsigned_requests(monkeypatch, policy):
+    main = pytest.importorskip('main')
+    import publish_policy
+    monkeypatch.setattr(publish_policy, 'CONFIRM_SECRET', 's3cret')
+    monkeypatch.setattr(main, 'publish_policy', policy)
+    client = main.app.test_client()
+
+    body, signature = signed({'scaled_volatility': 2_000_000, 'timestamp': time.time()})
+    forged = client.post('/publish/confirm', data=body, content_type='application/json')
+    assert forged.status_code == 401
+    assert 'scaled_volatility' not in policy.last_published()
+
+    confirmed = client.post('/publish/confirm', data=body, content_type='application/json',
+                            headers={'X-Signature': signature})
+    assert confirmed.status_code == 200
+    assert policy.last_published()['scaled_volatility'] == 2_000_000
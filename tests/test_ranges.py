@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+
+import il_simulator
+from il_simulator import impermanent_loss, position_value, simulate_impermanent_loss
+from ranges import price_to_tick, recommend_ranges, tick_spacing_for, tick_to_price
+
+def test_ranges_align_to_tick_spacing():
+    price = np.array([1500.0, 0.05, 1.0])
+    result = recommend_ranges(price, predicted_vol=[3.0, 5.0, 0.0], fee_tier=[3000, 500, 100])
+
+    spacing = tick_spacing_for([3000, 500, 100])
+    np.testing.assert_array_equal(result['tick_spacing'], spacing)
+    assert (result['tick_lower'] % spacing == 0).all()
+    assert (result['tick_upper'] % spacing == 0).all()
+    assert (result['price_lower'] <= price).all() and (price < result['price_upper']).all()
+
+    # Zero volatility still leaves one spacing on each side of the price
+    assert result['tick_upper'][2] - result['tick_lower'][2] >= spacing[2]
+
+def test_range_covers_requested_sigmas():
+    result = recommend_ranges(2000.0, predicted_vol=4.0, horizon_days=5, tick_spacing=1)
+    sigma = 0.04 * np.sqrt(5)
+    assert result['sigma'][()] == pytest.approx(sigma)
+    assert np.log(2000.0 / result['price_lower']) == pytest.approx(2 * sigma, abs=1e-4)
+    assert np.log(result['price_upper'] / 2000.0) == pytest.approx(2 * sigma, abs=1e-4)
+
+def test_tick_price_round_trip():
+    ticks = np.array([-1000, 0, 12345])
+    np.testing.assert_allclose(price_to_tick(tick_to_price(ticks)), ticks)
+    with pytest.raises(ValueError):
+        tick_spacing_for(2500)
+
+def test_impermanent_loss_matches_full_range_formula():
+    ratio = np.array([0.5, 1.0, 2.0, 4.0])
+    il = impermanent_loss(1.0, ratio, 1e-12, 1e12)
+    np.testing.assert_allclose(il, 2 * np.sqrt(ratio) / (1 + ratio) - 1, atol=1e-6)
+
+def test_concentrated_position_is_one_token_outside_range():
+    # Below the range: all token0, value moves with the price
+    below = position_value(np.array([0.25, 0.5]), 1.0, 4.0)
+    np.testing.assert_allclose(below / below[0], [1.0, 2.0])
+    # Above the range: all token1, value is flat
+    above = position_value(np.array([5.0, 10.0]), 1.0, 4.0)
+    np.testing.assert_allclose(above, above[0])
+    # Concentration deepens the loss for the same move
+    assert impermanent_loss(1.0, 1.5, 0.8, 1.25) < impermanent_loss(1.0, 1.5, 1e-6, 1e6) < 0
+
+def test_simulation_chunks_stay_within_memory_bound(monkeypatch):
+    sizes = []
+    simulate_chunk = il_simulator._simulate_chunk
+
+    def recording(seed, n_paths, log_lower, *args):
+        n_steps = args[-1]
+        sizes.append(len(log_lower) * n_paths * n_steps)
+        return simulate_chunk(seed, n_paths, log_lower, *args)
+
+    monkeypatch.setattr(il_simulator, '_simulate_chunk', recording)
+    n_positions = 50
+    result = simulate_impermanent_loss(
+        np.ones(n_positions), 0.9, 1.1, 3.0, horizon_days=5, n_paths=64,
+        max_chunk_elements=1000
+    )
+    assert max(sizes) <= 1000
+    assert sum(sizes) == n_positions * 64 * 5 * il_simulator.DEFAULT_STEPS_PER_DAY
+    assert result['expected_il_pct'].shape == (n_positions,)
+    assert (result['expected_il_pct'] <= 0).all()
+
+def test_breakeven_is_infinite_when_never_in_range():
+    result = simulate_impermanent_loss([1.0, 1.0], [1.5, 0.9], [2.0, 1.1], 0.0, n_paths=10)
+    assert result['time_in_range'][0] == 0.0
+    assert np.isinf(result['breakeven_daily_fee_pct'][0])
+    assert np.isfinite(result['breakeven_daily_fee_pct'][1])
@@ -0,0 +1,110 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import rate_limit
+from rate_limit import SERVING, TRAINING, BinanceRateGovernor, RateLimitExceeded
+
+# 10s into a calendar minute
+START = 16667 * 60 + 10.0
+
+class FakeClock:
+    """time.time()/time.sleep() where sleeping only advances the clock"""
+
+    def __init__(self, now):
+        self.now = now
+        self.slept = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock(START)
+    monkeypatch.setattr(rate_limit, 'time', clock)
+    return clock
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / 'binance_weight.json')
+
+def governor(state_path, priority=SERVING, **kwargs):
+    kwargs.setdefault('weight_budget', 10)
+    kwargs.setdefault('training_share', 0.5)
+    return BinanceRateGovernor(priority, state_path=state_path, **kwargs)
+
+def read_state(state_path):
+    with open(state_path) as f:
+        return json.load(f)
+
+def response(status_code=200, **headers):
+    return SimpleNamespace(status_code=status_code, headers=headers)
+
+def test_training_stops_at_its_share(clock, state_path):
+    training = governor(state_path, TRAINING, max_wait=1.0)
+    assert training.limit == 5
+
+    training.acquire(2)
+    training.acquire(2)
+    with pytest.raises(RateLimitExceeded):
+        training.acquire(2)
+
+    # Serving draws from the same file and still has the rest of the budget
+    governor(state_path).acquire(2)
+    assert read_state(state_path)['used'] == 6
+
+def test_training_waits_for_next_minute(clock, state_path):
+    training = governor(state_path, TRAINING)
+    for _ in range(3):
+        training.acquire(2)
+
+    assert clock.slept == [50.0]
+    assert read_state(state_path)['used'] == 2
+
+def test_serving_gives_up_after_max_wait(clock, state_path):
+    serving = governor(state_path, max_wait=5.0)
+    for _ in range(5):
+        serving.acquire(2)
+
+    with pytest.raises(RateLimitExceeded):
+        serving.acquire(2)
+    # A per-call max_wait can shorten the wait but never extend it
+    with pytest.raises(RateLimitExceeded):
+        serving.acquire(2, max_wait=120.0)
+    assert clock.slept == []
+
+def test_observe_resyncs_used_weight(clock, state_path):
+    serving = governor(state_path, max_wait=0.0)
+    serving.acquire(2)
+
+    serving.observe(response(**{'X-MBX-USED-WEIGHT-1M': '9'}))
+    assert read_state(state_path)['used'] == 9
+    with pytest.raises(RateLimitExceeded):
+        serving.acquire(2)
+
+    # A stale, lower count never frees weight already spent
+    serving.observe(response(**{'X-MBX-USED-WEIGHT-1M': '3'}))
+    assert read_state(state_path)['used'] == 9
+
+@pytest.mark.parametrize('status_code, headers, pause', [
+    (429, {'Retry-After': '30'}, 30),
+    (418, {}, 60),
+])
+def test_ban_blocks_every_priority(clock, state_path, status_code, headers, pause):
+    serving = governor(state_path, max_wait=5.0)
+    serving.observe(response(status_code, **headers))
+    assert read_state(state_path)['banned_until'] == START + pause
+
+    with pytest.raises(RateLimitExceeded):
+        serving.acquire(2)
+    with pytest.raises(RateLimitExceeded):
+        governor(state_path, TRAINING, max_wait=5.0).acquire(2)
+
+    # An unbounded caller sleeps out the ban and then gets its weight
+    governor(state_path, TRAINING).acquire(2)
+    assert clock.now >= START + pause
@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from train import split_multi_pair_dataset
+
+def dataset(n_dates, pairs=2):
+    dates = np.repeat(pd.date_range('2024-01-01', periods=n_dates).to_numpy(), pairs)
+    X = np.arange(len(dates) * 2, dtype=np.float32).reshape(-1, 2)
+    return X, X[:, 0].copy(), dates
+
+def test_split_keeps_last_dates_for_test():
+    X, Y, dates = dataset(40)
+    X_train, X_test, Y_train, Y_test = split_multi_pair_dataset(X, Y, dates, test_days=5)
+    assert len(X_test) == 10 and len(X_train) == 70
+    assert dates[len(X_train) - 1] < dates[len(X_train)]
+    assert np.shares_memory(X_train, X)
+
+def test_test_period_is_capped_at_a_quarter():
+    X, Y, dates = dataset(8)
+    X_train, X_test, _, _ = split_multi_pair_dataset(X, Y, dates, test_days=252)
+    assert len(X_test) == 4 and len(X_train) == 12
+
+def test_too_few_dates_raise():
+    X, Y, dates = dataset(3)
+    with pytest.raises(ValueError):
+        split_multi_pair_dataset(X, Y, dates)
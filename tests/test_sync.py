@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from train import CryptoDataLoader
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+class FakeExchange:
+    """Klines endpoint over a fixed set of daily open times"""
+
+    def __init__(self, open_times):
+        self.open_times = np.asarray(open_times, dtype=np.int64)
+        self.requests = []
+        self.fail = False
+
+    def __call__(self, params, retries=0):
+        self.requests.append((params['startTime'], params['endTime']))
+        if self.fail:
+            raise ConnectionError("exchange down")
+        times = self.open_times[(self.open_times >= params['startTime'])
+                                & (self.open_times <= params['endTime'])][:params['limit']]
+        return [[int(t), '1', '1', '1', '1', '1', int(t) + DAY_MS - 1, '0', 0, '0', '0', '0']
+                for t in times]
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    today = int(time.time() * 1000) // DAY_MS * DAY_MS
+    # Listed 100 days ago, with an exchange outage of 5 days
+    listed = np.arange(today - 100 * DAY_MS, today + 1, DAY_MS)
+    outage = (listed >= today - 60 * DAY_MS) & (listed < today - 55 * DAY_MS)
+    exchange = FakeExchange(listed[~outage])
+
+    loader = CryptoDataLoader()
+    monkeypatch.setattr(loader, '_request_klines', exchange)
+
+    # Stored history with the tail missing
+    csv_path = str(tmp_path / 'link_data.csv')
+    stored = loader._klines_to_frame(exchange({'startTime': 0, 'endTime': today - 10 * DAY_MS,
+                                               'limit': 1000}))
+    stored.to_csv(csv_path, index=False)
+    exchange.requests.clear()
+    return loader, exchange, csv_path, today
+
+def test_sync_fetches_tail_and_remembers_empty_ranges(setup):
+    loader, exchange, csv_path, today = setup
+
+    df = loader.sync_historical_data('LINKUSDT', csv_path, days_back=200)
+    assert df['Date'].iloc[-1] == pd.to_datetime(today, unit='ms')
+    assert len(df) == 101 - 5
+    first_requests = len(exchange.requests)
+    assert first_requests > 1   # pre-listing window, the outage and the tail
+
+    # Only the tail is requested again
+    exchange.requests.clear()
+    loader.sync_historical_data('LINKUSDT', csv_path, days_back=200)
+    assert len(exchange.requests) == 1
+
+def test_failed_fetch_leaves_csv_untouched(setup):
+    loader, exchange, csv_path, _ = setup
+    before = open(csv_path).read()
+
+    exchange.fail = True
+    with pytest.raises(ConnectionError):
+        loader.sync_historical_data('LINKUSDT', csv_path, days_back=200)
+    assert open(csv_path).read() == before
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+main = pytest.importorskip('main')
+
+SYMBOLS = ['ETHUSDT', 'LINKUSDT', 'UNIUSDT']
+
+def fake_fetch(symbol, days, deadline=None):
+    rng = np.random.default_rng(SYMBOLS.index(symbol))
+    dates = pd.date_range('2024-01-01', periods=30)
+    return pd.DataFrame({'Date': dates, 'Open': np.exp(np.cumsum(rng.normal(0, 0.03, 30)))})
+
+class FakeSession:
+    def __init__(self, fail=False):
+        self.fail = fail
+
+    def run(self, names, feeds):
+        if self.fail:
+            raise RuntimeError("input shape mismatch")
+        features = next(iter(feeds.values()))
+        return [features[:, :1] * 2]
+
+@pytest.fixture(autouse=True)
+def fetch(monkeypatch):
+    monkeypatch.setattr(main, 'get_crypto_data', fake_fetch)
+    monkeypatch.setattr(main, 'input_name', 'input')
+    monkeypatch.setattr(main, 'output_horizons', {'output': '5d'})
+
+def test_matrix_uses_model_for_every_pair(monkeypatch):
+    monkeypatch.setattr(main, 'session', FakeSession())
+    result = main.volatility_matrix(SYMBOLS)
+
+    assert result['engine'] == 'onnx' and not result['degraded']
+    assert len(result['pairs']) == 3
+    for pair in result['pairs']:
+        assert pair['predicted_volatility_5d'] == pytest.approx(2 * pair['realized_volatility'], rel=1e-6)
+    matrix = np.array(result['predicted_matrix'])
+    np.testing.assert_allclose(matrix, matrix.T)
+
+def test_matrix_falls_back_when_inference_fails(monkeypatch):
+    monkeypatch.setattr(main, 'session', FakeSession(fail=True))
+    result = main.volatility_matrix(SYMBOLS)
+
+    assert result['engine'] == 'ewma' and result['degraded']
+    assert 'input shape mismatch' in result['fallback_reason']
+    assert all(np.isfinite(p['predicted_volatility_5d']) for p in result['pairs'])
+
+def test_matrix_endpoint_degrades_instead_of_failing(monkeypatch):
+    monkeypatch.setattr(main, 'session', FakeSession(fail=True))
+    response = main.app.test_client().get('/volatility/matrix?symbols=' + ','.join(SYMBOLS))
+    assert response.status_code == 200
+    assert response.get_json()['matrix']['engine'] == 'ewma'